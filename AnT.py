@@ -1,11 +1,28 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox, Toplevel, Text, Button
+import tkinter.font as tkfont
+from tkinter import filedialog, messagebox, simpledialog, Toplevel, Text, Button
 from PIL import Image, ImageTk, ImageDraw
 import json
 import os
-import uuid
-import random
-import string
+import bisect
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from ant_autosave import Autosaver, read_journal
+from ant_history import EditHistory
+from ant_image import DEFAULT_BUDGET, ImageBufferCache, SourceImage, image_nbytes
+from ant_metrics import FrameMonitor, Instrumentation, SessionProfiler, timed
+from ant_io import IMAGE_EXTENSIONS, find_image_for_json
+from ant_model import AnnotationDocument, Connection, Node
+from ant_scheduler import FrameScheduler
+from ant_search import SearchIndex, refresh_index
+from ant_session import DocumentSession, model_nbytes
+from ant_store import STORE_NAME, document_key, store_for
+from ant_sync import DEFAULT_HOST, DEFAULT_PORT, SyncClient, SyncError
+from ant_stream import count_nodes
 
 # Define a custom multi-line text input dialog
 class MultiLineInputDialog:
@@ -52,14 +69,849 @@ class MultiLineInputDialog:
     def show(self):
         self.dialog.wait_window()
         return self.result
-    
+
+
+class SearchDialog:
+    """데이터셋 검색 창 (모달이 아님). 입력할 때마다 search(query)로 검색하고, 결과를 더블 클릭하거나 Enter를 누르면
+    on_open(hit)을 호출한다."""
+
+    def __init__(self, parent, search, on_open):
+        self.search = search
+        self.on_open = on_open
+        self.hits = []
+
+        self.dialog = Toplevel(parent)
+        self.dialog.title("Search Dataset")
+        self.dialog.transient(parent)
+
+        self.entry = tk.Entry(self.dialog, width=60)
+        self.entry.pack(fill=tk.X, padx=10, pady=(10, 5))
+        self.entry.bind("<KeyRelease>", self.update_results)
+        self.entry.bind("<Return>", lambda event: self.open_selected())
+        self.entry.bind("<Down>", lambda event: self.listbox.focus_set())
+        self.entry.focus_set()
+
+        self.status_label = tk.Label(self.dialog, text="", fg="gray", anchor="w")
+        self.status_label.pack(fill=tk.X, padx=10)
+
+        list_frame = tk.Frame(self.dialog)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(5, 10))
+        self.listbox = tk.Listbox(list_frame, width=100, height=25, activestyle="dotbox")
+        scrollbar = tk.Scrollbar(list_frame, command=self.listbox.yview)
+        self.listbox.config(yscrollcommand=scrollbar.set)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.bind("<Double-1>", lambda event: self.open_selected())
+        self.listbox.bind("<Return>", lambda event: self.open_selected())
+
+    def exists(self):
+        return bool(self.dialog.winfo_exists())
+
+    def lift(self):
+        self.dialog.deiconify()
+        self.dialog.lift()
+        self.entry.focus_set()
+
+    def set_status(self, text):
+        self.status_label.config(text=text)
+
+    def update_results(self, event=None):
+        self.hits = self.search(self.entry.get())
+        self.listbox.delete(0, tk.END)
+        if self.hits:
+            self.listbox.insert(tk.END, *[self.format_hit(hit) for hit in self.hits])
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+
+    def format_hit(self, hit):
+        if hit.kind == "file":
+            return f"{hit.name}  [File: {hit.file_name}]"
+        if hit.kind == "connection":
+            return f"{hit.name}  Connection({hit.item_id or hit.position}): {hit.text or ''} [Type: {hit.type}]"
+        return f"{hit.name}  Node({hit.item_id}): {hit.text or ''}"
+
+    def open_selected(self):
+        selection = self.listbox.curselection()
+        if selection and selection[0] < len(self.hits):
+            self.on_open(self.hits[selection[0]])
+        return "break"
+
+
+
+def read_annotation_document(json_path, canvas_width):
+    """JSON과 대응 이미지를 읽어 편집기에 바로 넣을 수 있는 문서 dict로 변환 (Tk를 사용하지 않음).
+
+    워커 스레드에서 호출할 수 있다. 좌표가 없는 노드는 이미지 영역 안에 배치하고, 이미지가 없으면 canvas_width 폭 안에 배치한다.
+    문서는 폴더의 저장소(ant_store.store_for)에서 읽는다.
+    """
+    store = store_for(os.path.dirname(os.path.abspath(json_path)))
+    signature = store.signature(json_path)
+
+    # 이미지 파일을 찾아 표시용 해상도로 디코딩 (원본 해상도는 확대할 때 피라미드가 따로 읽음)
+    image_path = find_image_for_json(json_path)
+    image = SourceImage(image_path) if image_path else None
+
+    # JSON 저장소는 이진 사이드카가 JSON과 맞으면 파싱 없이 복원하고, 아니면 JSON을 읽은 뒤 사이드카를 갱신
+    layout_width, layout_height = image.size if image is not None else (canvas_width, None)
+    document = store.load_document(json_path, layout_width, layout_height)
+
+    return {
+        "json_path": json_path,
+        "signature": signature,
+        "document": document,
+        "image_path": image_path,
+        "image_mtime": os.path.getmtime(image_path) if image_path else None,
+        "image": image
+    }
+
+
+def estimate_document_size(document):
+    """캐시 제거 기준으로 쓰는 문서의 대략적인 메모리 크기(byte)."""
+    size = model_nbytes(document["document"])
+    image = document["image"]
+    if image is not None:
+        size += image.nbytes
+    return size
+
+
+class DocumentCache:
+    """JSON 경로 -> 미리 읽어 둔 문서. 이웃 문서를 워커 스레드에서 미리 읽고, 메모리 크기 기준 LRU로 제거.
+
+    UI 스레드에서만 호출한다 (워커는 read_annotation_document만 실행).
+    """
+
+    def __init__(self, executor, max_bytes=512 * 1024 * 1024):
+        self.executor = executor
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # json path -> Future
+
+    def prefetch(self, json_path, canvas_width):
+        if json_path in self.entries:
+            self.entries.move_to_end(json_path)
+            return
+        self.entries[json_path] = self.executor.submit(read_annotation_document, json_path, canvas_width)
+        self.evict(keep=json_path)
+
+    def get(self, json_path, canvas_width):
+        """캐시된 문서를 반환 (읽는 중이면 완료를 기다림). 디스크의 파일이 바뀌었으면 다시 읽는다."""
+        future = self.entries.pop(json_path, None)
+        document = None
+        if future is not None and not future.cancelled():
+            try:
+                document = future.result()
+            except Exception:
+                document = None
+            if document is not None and not self.is_fresh(document):
+                document = None
+        if document is None:
+            document = read_annotation_document(json_path, canvas_width)
+            future = Future()
+            future.set_result(document)
+        self.entries[json_path] = future
+        self.evict(keep=json_path)
+        return document
+
+    def is_fresh(self, document):
+        try:
+            json_path = document["json_path"]
+            if store_for(os.path.dirname(os.path.abspath(json_path))).signature(json_path) != document["signature"]:
+                return False
+            image_path = find_image_for_json(json_path)
+            if image_path != document["image_path"]:
+                return False
+            return image_path is None or os.path.getmtime(image_path) == document["image_mtime"]
+        except (OSError, sqlite3.Error):
+            return False
+
+    def invalidate(self, json_path):
+        future = self.entries.pop(json_path, None)
+        if future is not None:
+            future.cancel()
+
+    def sizes(self):
+        """완료된 문서의 경로 -> 추정 크기(byte)."""
+        sizes = {}
+        for path, future in self.entries.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                sizes[path] = estimate_document_size(future.result())
+        return sizes
+
+    def nbytes(self):
+        return sum(self.sizes().values())
+
+    def evict(self, keep=None):
+        """완료된 문서의 크기 합이 max_bytes를 넘으면 오래된 것부터 제거."""
+        sizes = self.sizes()
+        total = sum(sizes.values())
+        for path in list(self.entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep or path not in sizes:
+                continue
+            del self.entries[path]
+            total -= sizes[path]
+
+
+
+MANIFEST_NAME = ".ant_manifest"
+
+
+class DatasetManifest:
+    """한 디렉터리의 JSON 어노테이션 목록과 상태. 디렉터리에 캐시 파일로 저장.
+
+    디렉터리 mtime(과 SQLite 저장소의 상태)이 그대로면 캐시를 그대로 쓰고, 바뀌었으면 다시 스캔해서 mtime/크기
+    (저장소에 있는 문서는 저장 횟수)가 바뀐 JSON만 다시 읽는다. 이름 순 이웃과 다음 미완료 문서는 인덱스로 바로 찾는다.
+    """
+
+    VERSION = 1
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.store = store_for(directory)
+        self.dir_mtime = None
+        self.store_state = None
+        self.entries = {}      # json 파일명 -> {"image", "annotated", "node_count", "mtime", "size", "revision"}
+        self.names = []        # 이름 순으로 정렬된 json 파일명
+        self.positions = {}    # json 파일명 -> self.names 인덱스
+        self.unannotated = []  # 미완료 문서의 self.names 인덱스 (정렬됨)
+        self.dirty = False
+
+    @classmethod
+    def open(cls, directory):
+        manifest = cls(directory)
+        manifest.load()
+        manifest.refresh()
+        return manifest
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            return
+        if cached.get("version") == self.VERSION:
+            self.dir_mtime = cached.get("dir_mtime")
+            self.store_state = cached.get("store_state")
+            self.entries = cached.get("entries", {})
+            self.reindex()
+
+    def save(self):
+        """캐시 파일 저장. 읽기 전용 디렉터리면 조용히 무시.
+
+        파일을 새로 만들면 디렉터리 mtime이 바뀌므로, 파일이 먼저 존재하게 한 뒤의 mtime을 기록하고
+        내용은 제자리에 덮어쓴다 (캐시이므로 깨져 있으면 load에서 무시하고 다시 스캔).
+        """
+        if not self.dirty:
+            return
+        try:
+            if not os.path.exists(self.path):
+                open(self.path, 'a', encoding='utf-8').close()
+                if self.dir_mtime is not None:
+                    self.dir_mtime = os.stat(self.directory).st_mtime_ns
+            with open(self.path, 'w', encoding='utf-8') as file:
+                json.dump({"version": self.VERSION, "dir_mtime": self.dir_mtime, "store_state": self.store_state,
+                           "entries": self.entries}, file, ensure_ascii=False)
+            self.dirty = False
+        except OSError:
+            pass
+
+    def refresh(self, force=False):
+        """디렉터리나 저장소가 바뀌었으면(또는 force) 다시 스캔. 바뀐 JSON만 다시 읽는다."""
+        self.store = store_for(self.directory)
+        dir_mtime = os.stat(self.directory).st_mtime_ns
+        store_state = self.store.state()
+        if not force and dir_mtime == self.dir_mtime and store_state == self.store_state:
+            return False
+        revisions = self.store.revisions()
+
+        json_files = {}
+        file_names = set()
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                file_names.add(entry.name)
+                if entry.name.endswith('.json') and not entry.name.startswith('.') and entry.is_file():
+                    stat = entry.stat()
+                    json_files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+        entries = {}
+        for name, (mtime, size) in json_files.items():
+            old = self.entries.get(name)
+            revision = revisions.get(os.path.splitext(name)[0])
+            if old and old["mtime"] == mtime and old["size"] == size and old.get("revision") == revision:
+                entries[name] = old
+                entries[name]["image"] = self.resolve_image(name, file_names)
+            else:
+                entries[name] = self.scan_file(name, mtime, size, file_names, revision)
+
+        self.entries = entries
+        self.dir_mtime = dir_mtime
+        self.store_state = store_state
+        self.dirty = True
+        self.reindex()
+        self.save()
+        return True
+
+    def resolve_image(self, name, file_names):
+        base_name = os.path.splitext(name)[0]
+        for ext in IMAGE_EXTENSIONS:
+            if f"{base_name}{ext}" in file_names:
+                return f"{base_name}{ext}"
+        return None
+
+    def scan_file(self, name, mtime, size, file_names, revision=None):
+        path = os.path.join(self.directory, name)
+        counts = self.store.counts(path)  # 저장소의 행 수 또는 유효한 사이드카 (JSON을 읽지 않음)
+        if counts is not None:
+            node_count = counts[0]
+        else:
+            try:
+                node_count = count_nodes(path)  # 연결은 건너뛰고 노드만 스트리밍으로 셈
+            except (OSError, ValueError, AttributeError, TypeError, KeyError):
+                node_count = 0
+        return {
+            "image": self.resolve_image(name, file_names),
+            "annotated": node_count > 0,
+            "node_count": node_count,
+            "mtime": mtime,
+            "size": size,
+            "revision": revision
+        }
+
+    def update_entry(self, name):
+        """파일 하나가 저장된 뒤 호출. 해당 항목만 다시 읽는다 (캐시 파일은 save()에서 기록)."""
+        path = os.path.join(self.directory, name)
+        stat = os.stat(path)
+        base_name = os.path.splitext(name)[0]
+        file_names = {f"{base_name}{ext}" for ext in IMAGE_EXTENSIONS
+                      if os.path.exists(os.path.join(self.directory, f"{base_name}{ext}"))}
+        revision = self.store.revision(path)
+        entry = self.scan_file(name, stat.st_mtime_ns, stat.st_size, file_names, revision)
+        self.store_state = self.store.state()
+        is_new = name not in self.entries
+        self.entries[name] = entry
+        self.dirty = True
+
+        if is_new:
+            self.reindex()
+            return
+        index = self.positions[name]
+        position = bisect.bisect_left(self.unannotated, index)
+        listed = position < len(self.unannotated) and self.unannotated[position] == index
+        if entry["annotated"] and listed:
+            del self.unannotated[position]
+        elif not entry["annotated"] and not listed:
+            self.unannotated.insert(position, index)
+
+    def reindex(self):
+        self.names = sorted(self.entries)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.unannotated = [i for i, name in enumerate(self.names) if not self.entries[name]["annotated"]]
+
+    def neighbour(self, name, step):
+        """이름 순으로 step만큼 떨어진 JSON 파일명 (처음/끝에서 순환)."""
+        return self.names[(self.positions[name] + step) % len(self.names)]
+
+    def next_unannotated(self, name):
+        """name 다음의 첫 미완료 JSON 파일명 (끝에서 순환). 없으면 None."""
+        if not self.unannotated:
+            return None
+        position = bisect.bisect_right(self.unannotated, self.positions.get(name, -1))
+        return self.names[self.unannotated[position % len(self.unannotated)]]
+
+    def image_path(self, name):
+        image = self.entries[name]["image"]
+        return os.path.join(self.directory, image) if image else None
+
+
+
+class CanvasScene:
+    """노드, 연결의 캔버스 아이템을 id별로 유지하는 retained-mode 렌더링 레이어.
+
+    매번 delete("all") 후 다시 그리는 대신, 실제로 바뀐 아이템만 coords/itemconfig 한다.
+    노드 좌표는 원본 이미지 좌표계로 받아서 현재 뷰(offset, scale)로 변환한다.
+    모든 아이템에 tag를 붙이며, 같은 문서의 이미지 타일(TileLayer)도 같은 tag를 사용하므로 이동 시 함께 움직인다.
+    """
+
+    def __init__(self, canvas, tag="scene"):
+        self.canvas = canvas
+        self.tag = tag
+        self.node_items = {}        # node id -> 아이템 및 마지막으로 그린 상태
+        self.connection_items = {}  # connection id -> 아이템 및 마지막으로 그린 상태
+        self.offset = (0, 0)
+        self.scale = 1.0
+        self.view_version = 0       # 배율이 바뀔 때마다 증가 (좌표 재계산 필요)
+        self._order_dirty = False
+
+    def set_view(self, offset_x, offset_y, scale):
+        """뷰 변환 반영. 이동만 있는 경우 canvas.move 한 번으로 모든 아이템을 옮긴다."""
+        if scale != self.scale:
+            self.scale = scale
+            self.offset = (offset_x, offset_y)
+            self.view_version += 1
+        elif (offset_x, offset_y) != self.offset:
+            self.canvas.move(self.tag, offset_x - self.offset[0], offset_y - self.offset[1])
+            self.offset = (offset_x, offset_y)
+
+    def to_canvas(self, x, y):
+        return self.offset[0] + x * self.scale, self.offset[1] + y * self.scale
+
+    def sync_node(self, node_id, coords, text, selected, font):
+        """노드 사각형과 텍스트를 생성하거나 바뀐 속성만 갱신."""
+        coords = tuple(coords)
+        style = ("yellow", 4) if selected else ("red", 3)
+        entry = self.node_items.get(node_id)
+
+        if entry is None or entry["coords"] != coords or entry["view"] != self.view_version:
+            x1, y1 = self.to_canvas(coords[0], coords[1])
+            x2, y2 = self.to_canvas(coords[2], coords[3])
+            if entry is None:
+                rect = self.canvas.create_rectangle(x1, y1, x2, y2, outline=style[0], width=style[1], tags=(self.tag, "node"))
+                label = self.canvas.create_text((x1 + x2) / 2, (y1 + y2) / 2, text=text, font=font, tags=(self.tag, "node_text"))
+                self.node_items[node_id] = {"rect": rect, "label": label, "coords": coords, "view": self.view_version,
+                                            "style": style, "text": text, "font": font}
+                self._order_dirty = True
+                return
+            self.canvas.coords(entry["rect"], x1, y1, x2, y2)
+            self.canvas.coords(entry["label"], (x1 + x2) / 2, (y1 + y2) / 2)
+            entry["coords"] = coords
+            entry["view"] = self.view_version
+
+        if entry["style"] != style:
+            self.canvas.itemconfig(entry["rect"], outline=style[0], width=style[1])
+            entry["style"] = style
+        if entry["text"] != text or entry["font"] != font:
+            self.canvas.itemconfig(entry["label"], text=text, font=font)
+            entry["text"] = text
+            entry["font"] = font
+
+    def sync_connection(self, connection_id, start, end, text, style, font):
+        """연결선과 라벨을 생성하거나 바뀐 속성만 갱신. style은 (fill, width, dash, arrow)."""
+        entry = self.connection_items.get(connection_id)
+        sx, sy = self.to_canvas(*start)
+        ex, ey = self.to_canvas(*end)
+        points = (start, end)
+        fill, width, dash, arrow = style
+
+        if entry is None:
+            line = self.canvas.create_line(sx, sy, ex, ey, fill=fill, width=width, dash=dash, arrow=arrow,
+                                           tags=(self.tag, "connection"))
+            entry = {"line": line, "label": None, "points": points, "view": self.view_version,
+                     "style": style, "text": None, "font": None}
+            self.connection_items[connection_id] = entry
+            self._order_dirty = True
+        else:
+            if entry["points"] != points or entry["view"] != self.view_version:
+                self.canvas.coords(entry["line"], sx, sy, ex, ey)
+                if entry["label"] is not None:
+                    self.canvas.coords(entry["label"], (sx + ex) / 2, (sy + ey) / 2)
+                entry["points"] = points
+                entry["view"] = self.view_version
+            if entry["style"] != style:
+                self.canvas.itemconfig(entry["line"], fill=fill, width=width, dash=dash, arrow=arrow)
+                entry["style"] = style
+
+        # 라벨은 텍스트가 있을 때만 유지
+        if not text:
+            if entry["label"] is not None:
+                self.canvas.delete(entry["label"])
+                entry["label"] = None
+                entry["text"] = None
+        elif entry["label"] is None:
+            entry["label"] = self.canvas.create_text((sx + ex) / 2, (sy + ey) / 2, text=text, fill="blue", font=font,
+                                                     tags=(self.tag, "connection_text"))
+            entry["text"] = text
+            entry["font"] = font
+            self._order_dirty = True
+        elif entry["text"] != text or entry["font"] != font:
+            self.canvas.itemconfig(entry["label"], text=text, font=font)
+            entry["text"] = text
+            entry["font"] = font
+
+    def remove_node(self, node_id):
+        entry = self.node_items.pop(node_id, None)
+        if entry:
+            self.canvas.delete(entry["rect"], entry["label"])
+
+    def remove_connection(self, connection_id):
+        entry = self.connection_items.pop(connection_id, None)
+        if entry:
+            self.canvas.delete(entry["line"])
+            if entry["label"] is not None:
+                self.canvas.delete(entry["label"])
+
+    def prune(self, live_node_ids, live_connection_ids):
+        """더 이상 존재하지 않는 노드/연결의 아이템 삭제."""
+        for node_id in [i for i in self.node_items if i not in live_node_ids]:
+            self.remove_node(node_id)
+        for connection_id in [i for i in self.connection_items if i not in live_connection_ids]:
+            self.remove_connection(connection_id)
+
+    def finish(self):
+        """새 아이템이 생긴 경우에만 쌓임 순서(이미지 < 노드 < 연결 < 하이라이트)를 정리."""
+        if not self._order_dirty:
+            return
+        self.canvas.tag_lower("image")
+        self.canvas.tag_raise("connection")
+        self.canvas.tag_raise("connection_text")
+        self.canvas.tag_raise("highlight")
+        self._order_dirty = False
+
+
+
+class ImagePyramid:
+    """배율별 이미지 피라미드. 레벨 k는 원본을 1/2**k로 축소한 RGB 이미지.
+
+    SourceImage의 표시용 이미지(base_level 레벨)는 항상 사용할 수 있고, 다른 레벨은 executor의 스레드에서 만들어
+    ImageBufferCache에 (원본 키, 레벨)로 넣는다 (PIL의 디코딩/리샘플링은 GIL을 해제하므로 UI 스레드를 막지 않는다).
+    더 작은 레벨은 바로 만들고, base_level보다 큰 레벨은 그 배율이 처음 필요할 때 원본 해상도를 디코딩해서 만든다.
+    예산을 넘어 캐시에서 제거된 레벨은 다시 필요할 때 다시 만든다.
+    """
+
+    MIN_LEVEL_SIZE = 256
+
+    def __init__(self, source, executor, buffers):
+        self.source = source
+        self.executor = executor
+        self.buffers = buffers
+        self.size = source.size
+        self.base_level = source.base_level
+        self.pending = {}
+        self.used_level = None  # TileLayer가 타일을 자르고 있는 레벨 (캐시에서 제거되지 않게 고정)
+        self.wanted_level = None  # 현재 배율에 필요해서 생성을 요청한 레벨
+        self.level_count = 1
+        while max(self.size) >> self.level_count >= self.MIN_LEVEL_SIZE:
+            self.level_count += 1
+        self.reduce_levels(source.base_image, self.base_level, self.base_level + 1, self.level_count)
+
+    def key(self, level):
+        return self.source.key, level
+
+    def ready(self, level):
+        return level == self.base_level or self.key(level) in self.buffers
+
+    def image(self, level):
+        if level == self.base_level:
+            return self.source.base_image
+        return self.buffers.get(self.key(level))
+
+    def reduce_levels(self, image, from_level, start, stop):
+        """from_level 레벨 이미지를 줄여 start..stop-1 레벨을 백그라운드에서 생성."""
+        for level in range(start, stop):
+            if not self.ready(level) and level not in self.pending:
+                self.pending[level] = self.executor.submit(image.reduce, 1 << (level - from_level))
+
+    def request_level(self, level):
+        """level 생성을 시작. 더 큰 준비된 레벨이 있으면 줄이고, 없으면 원본 해상도를 디코딩한다."""
+        if self.ready(level) or level in self.pending:
+            return
+        finer = [candidate for candidate in range(level) if self.ready(candidate)]
+        if finer:
+            self.reduce_levels(self.image(finer[-1]), finer[-1], level, level + 1)
+        elif 0 not in self.pending:
+            self.pending[0] = self.executor.submit(self.source.load_full)
+
+    def poll(self):
+        """완료된 레벨을 캐시에 넣음. 새로 사용할 수 있게 된 레벨이 있으면 True."""
+        done = [level for level, future in self.pending.items() if future.done()]
+        for level in done:
+            future = self.pending.pop(level)
+            if future.cancelled() or future.exception() is not None:
+                continue
+            image = self.buffers.put(self.key(level), future.result(), "full" if level == 0 else "level")
+            if level == self.wanted_level:
+                # 다음 프레임에서 쓰기 전에 뒤이어 만든 레벨에 밀려 제거되지 않게 바로 고정
+                self.use_level(level)
+            if level == 0:
+                # 원본과 표시용 이미지 사이의 레벨은 원본에서 생성
+                self.reduce_levels(image, 0, 1, self.base_level)
+        return bool(done)
+
+    def cancel(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.use_level(None)
+
+    def use_level(self, level):
+        """타일을 자를 레벨을 고정하고 이전 레벨의 고정을 푼다 (None이면 고정만 해제)."""
+        if level == self.used_level:
+            return
+        if self.used_level is not None and self.used_level != self.base_level:
+            self.buffers.unpin(self.key(self.used_level))
+        self.used_level = level
+        if level is not None and level != self.base_level:
+            self.buffers.pin(self.key(level))
+
+    def best_level(self, scale):
+        """scale 배율로 표시할 때 해상도가 부족하지 않은 가장 작은 준비된 레벨.
+
+        알맞은 레벨이 아직 없으면(원본 해상도가 필요한 확대나 제거된 레벨) 생성을 시작하고, 그동안은 준비된
+        레벨 중 가장 가까운 것을 쓴다.
+        """
+        wanted = 0
+        while wanted + 1 < self.level_count and (1 << (wanted + 1)) * scale <= 1:
+            wanted += 1
+        if not self.ready(wanted):
+            self.wanted_level = wanted
+            self.request_level(wanted)
+        ready = [level for level in range(self.level_count) if self.ready(level)]
+        finer = [level for level in ready if level <= wanted]
+        return finer[-1] if finer else ready[0]
+
+
+
+class TileLayer:
+    """현재 캔버스에 보이는 영역의 이미지 타일만 리샘플링해서 배치.
+
+    타일은 표시 좌표계(원본 * scale)에서 TILE_SIZE 단위로 자르며, 배율에 가장 가까운
+    피라미드 레벨에서 잘라낸다. 배율/레벨이 바뀌면 타일을 새로 만들고, 투명도만 바뀌면
+    리샘플링된 타일을 그대로 두고 알파 채널만 바꾼다.
+    """
+
+    TILE_SIZE = 256
+
+    def __init__(self, canvas, tag="scene"):
+        self.canvas = canvas
+        self.tag = tag   # CanvasScene과 같은 태그 (이동 시 함께 움직임)
+        self.tiles = {}  # (tile_x, tile_y) -> (canvas item, PhotoImage, 리샘플링된 RGBA 이미지)
+        self.key = None  # 현재 타일이 유효한 (pyramid, scale, level)
+        self.alpha = None
+
+    def clear(self):
+        for item, _, _ in self.tiles.values():
+            self.canvas.delete(item)
+        self.tiles.clear()
+        self.key = None
+
+    @property
+    def nbytes(self):
+        """보이는 타일의 RGBA 이미지와 PhotoImage 크기 합(byte, PhotoImage도 픽셀당 4byte로 계산)."""
+        return sum(2 * image_nbytes(image) for _, _, image in self.tiles.values())
+
+    def resume(self, pyramid):
+        """다른 문서를 보다가 돌아왔을 때 타일을 자르던 레벨을 다시 고정. 그 사이 캐시에서 제거되었으면 타일을 버린다."""
+        if self.key is None:
+            return
+        level = self.key[2]
+        if pyramid is not self.key[0] or not pyramid.ready(level):
+            self.clear()
+        else:
+            pyramid.use_level(level)
+
+    def set_alpha(self, alpha):
+        """보이는 타일의 알파 채널만 교체 (리샘플링/아이템 재생성 없음)."""
+        if alpha == self.alpha:
+            return
+        self.alpha = alpha
+        for _, photo, image in self.tiles.values():
+            image.putalpha(alpha)
+            photo.paste(image)
+
+    def update(self, pyramid, scale, offset, viewport, alpha):
+        """뷰포트와 겹치는 타일만 유지. 뷰포트 밖 타일은 삭제하고 새로 보이는 타일만 생성."""
+        level = pyramid.best_level(scale)
+        key = (pyramid, scale, level)
+        if key != self.key:
+            self.clear()
+            self.key = key
+            pyramid.use_level(level)
+        self.set_alpha(alpha)
+
+        size = self.TILE_SIZE
+        display_width = int(pyramid.size[0] * scale)
+        display_height = int(pyramid.size[1] * scale)
+        # 이미지 원점 기준 표시 좌표로 본 뷰포트 영역
+        left = max(0, -offset[0])
+        top = max(0, -offset[1])
+        right = min(display_width, viewport[0] - offset[0])
+        bottom = min(display_height, viewport[1] - offset[1])
+
+        wanted = set()
+        if left < right and top < bottom:
+            wanted = {(tile_x, tile_y)
+                      for tile_x in range(int(left // size), int((right - 1) // size) + 1)
+                      for tile_y in range(int(top // size), int((bottom - 1) // size) + 1)}
+
+        for tile in [tile for tile in self.tiles if tile not in wanted]:
+            self.canvas.delete(self.tiles.pop(tile)[0])
+
+        for tile in wanted:
+            if tile not in self.tiles:
+                self.tiles[tile] = self.make_tile(pyramid, level, scale, tile, display_width, display_height, offset, alpha)
+
+    def make_tile(self, pyramid, level, scale, tile, display_width, display_height, offset, alpha):
+        size = self.TILE_SIZE
+        x0 = tile[0] * size
+        y0 = tile[1] * size
+        x1 = min(x0 + size, display_width)
+        y1 = min(y0 + size, display_height)
+
+        # 표시 좌표 -> 레벨 이미지 좌표 비율
+        source = pyramid.image(level)
+        ratio = 1 / (scale * (1 << level))
+        box = (x0 * ratio, y0 * ratio, min(x1 * ratio, source.width), min(y1 * ratio, source.height))
+        image = source.resize((x1 - x0, y1 - y0), Image.LANCZOS, box=box)
+        image.putalpha(alpha)
+
+        photo = ImageTk.PhotoImage(image)
+        item = self.canvas.create_image(offset[0] + x0, offset[1] + y0, anchor=tk.NW, image=photo, tags=(self.tag, "image"))
+        self.canvas.tag_lower(item)
+        return item, photo, image
+
+
+
+class AnnotationList:
+    """노드/연결 목록 패널. 화면에 보이는 줄만 Listbox에 채우는 가상 스크롤 목록.
+
+    행 내용은 row_at(i)로 필요할 때만 (키, 표시 텍스트)를 받아 오고, 선택은 위치 대신
+    ("node" | "connection", id) 키로 유지한다. 항목이 수만 개여도 갱신 비용은 보이는 줄 수에 비례한다.
+    """
+
+    def __init__(self, parent, row_count, row_at, row_index, on_select, **options):
+        self.row_count = row_count  # () -> 전체 행 수
+        self.row_at = row_at        # (행 번호) -> (키, 텍스트)
+        self.row_index = row_index  # (키) -> 행 번호 (없으면 None)
+        self.on_select = on_select  # 사용자가 목록에서 고른 키 (선택 해제 시 None)
+
+        self.frame = tk.Frame(parent)
+        self.listbox = tk.Listbox(self.frame, exportselection=False, activestyle="none",
+                                  selectbackground="yellow", selectforeground="black", **options)
+        self.scrollbar = tk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        font = tkfont.Font(root=self.listbox, font=self.listbox.cget("font"))
+        self.row_height = font.metrics("linespace") + 1 + 2 * int(self.listbox.cget("selectborderwidth"))
+        self.visible_rows = int(self.listbox.cget("height"))
+        self.top = 0          # 첫 번째로 보이는 행 번호
+        self.keys = []        # Listbox에 채워진 줄의 키
+        self.selected = None
+
+        self.listbox.bind("<Configure>", self.on_configure)
+        self.listbox.bind("<<ListboxSelect>>", self.on_listbox_select)
+        self.listbox.bind("<MouseWheel>", self.on_mousewheel)
+        self.listbox.bind("<Button-4>", self.on_mousewheel)
+        self.listbox.bind("<Button-5>", self.on_mousewheel)
+        self.listbox.bind("<Up>", lambda event: self.move_selection(-1))
+        self.listbox.bind("<Down>", lambda event: self.move_selection(1))
+        self.listbox.bind("<Prior>", lambda event: self.move_selection(-self.visible_rows))
+        self.listbox.bind("<Next>", lambda event: self.move_selection(self.visible_rows))
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def refresh(self):
+        """보이는 줄을 다시 채움 (행이 추가/삭제되었을 때)."""
+        count = self.row_count()
+        self.top = max(0, min(self.top, count - self.visible_rows))
+        rows = [self.row_at(i) for i in range(self.top, min(count, self.top + self.visible_rows))]
+        self.keys = [key for key, _ in rows]
+        self.listbox.delete(0, tk.END)
+        if rows:
+            self.listbox.insert(tk.END, *[text for _, text in rows])
+        self.show_selection()
+        if count > self.visible_rows:
+            self.scrollbar.set(self.top / count, (self.top + self.visible_rows) / count)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def update_row(self, key):
+        """행 순서는 그대로이고 key 행의 내용만 바뀐 경우, 화면에 있으면 그 줄만 다시 씀."""
+        if key not in self.keys:
+            return
+        position = self.keys.index(key)
+        _, text = self.row_at(self.top + position)
+        self.listbox.delete(position)
+        self.listbox.insert(position, text)
+        if key == self.selected:
+            self.listbox.selection_set(position)
+
+    def select(self, key, see=True):
+        """key 행을 선택 표시 (on_select는 호출하지 않음). see가 True이면 보이도록 스크롤."""
+        self.selected = key
+        if key is not None and see:
+            self.see(key)
+        self.show_selection()
+
+    def see(self, key):
+        row = self.row_index(key)
+        if row is None:
+            return
+        if row < self.top:
+            self.scroll_to(row)
+        elif row >= self.top + self.visible_rows:
+            self.scroll_to(row - self.visible_rows + 1)
+
+    def show_selection(self):
+        self.listbox.selection_clear(0, tk.END)
+        if self.selected in self.keys:
+            position = self.keys.index(self.selected)
+            self.listbox.selection_set(position)
+            self.listbox.activate(position)
+
+    def scroll_to(self, top):
+        top = max(0, min(int(top), self.row_count() - self.visible_rows))
+        if top != self.top:
+            self.top = top
+            self.refresh()
+
+    def on_configure(self, event):
+        # 완전히 보이는 줄만 채워서 Listbox 자체는 스크롤되지 않게 함
+        inset = 2 * (int(self.listbox.cget("borderwidth")) + int(self.listbox.cget("highlightthickness")))
+        rows = max(1, (event.height - inset) // self.row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.refresh()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == tk.MOVETO:
+            self.scroll_to(float(amount) * self.row_count())
+        elif action == tk.SCROLL:
+            step = self.visible_rows if unit == tk.PAGES else 1
+            self.scroll_to(self.top + int(amount) * step)
+
+    def on_mousewheel(self, event):
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        self.scroll_to(self.top + (-3 if up else 3))
+        return "break"
+
+    def move_selection(self, step):
+        """키보드로 이전/다음 행 선택 (보이는 범위를 넘어가면 스크롤)."""
+        count = self.row_count()
+        if not count:
+            return "break"
+        row = self.row_index(self.selected) if self.selected is not None else None
+        row = 0 if row is None else max(0, min(count - 1, row + step))
+        key, _ = self.row_at(row)
+        self.select(key)
+        self.on_select(key)
+        return "break"
+
+    def on_listbox_select(self, event):
+        selection = self.listbox.curselection()
+        key = self.keys[selection[0]] if selection and selection[0] < len(self.keys) else None
+        if key != self.selected:
+            self.selected = key
+            self.on_select(key)
+
 
 
 class ImageEditor:
-    def __init__(self, root):
+    def __init__(self, root, image_budget=DEFAULT_BUDGET):
         self.root = root
         self.root.title("Image Drawing with Nodes")
 
+        # 피라미드 레벨 등 파생 이미지 버퍼의 공유 캐시 (image_budget byte를 넘으면 오래 안 쓴 레벨부터 제거)
+        self.image_buffers = ImageBufferCache(image_budget)
+
+        # 핸들러 계측 (Debug 메뉴에서 켜기 전에는 기록하지 않음)
+        self.metrics = Instrumentation()
+        self.profiler = SessionProfiler()
+
+        # 핸들러는 바뀐 것만 표시하고, 캔버스는 프레임당 한 번 모아서 그림
+        self.frame_scheduler = FrameScheduler(self.root, self.render_frame, metrics=self.metrics)
+
         # 최상단 프레임 추가
         self.title_frame = tk.Frame(self.root)
         self.title_frame.pack(side=tk.TOP, fill=tk.X)
@@ -68,6 +920,10 @@ class ImageEditor:
         self.file_name_label = tk.Label(self.title_frame, text="No file loaded", font=("Arial", 16))
         self.file_name_label.pack(side=tk.LEFT, padx=10)
 
+        # 자동 저장 상태 표시 (저장은 백그라운드에서 하므로 대화상자를 띄우지 않음)
+        self.save_status_label = tk.Label(self.title_frame, text="", fg="gray")
+        self.save_status_label.pack(side=tk.LEFT, padx=10)
+
          # 이전 JSON 버튼 추가
         self.prev_json_button = Button(self.title_frame, text="Previous JSON", command=self.load_previous_json)
         self.prev_json_button.pack(side=tk.RIGHT, padx=5)
@@ -76,6 +932,15 @@ class ImageEditor:
         self.next_json_button = Button(self.title_frame, text="Next JSON", command=self.load_next_json)
         self.next_json_button.pack(side=tk.RIGHT, padx=5)
 
+        # 다음 미완료 JSON 버튼 추가
+        self.next_unannotated_button = Button(self.title_frame, text="Next Unannotated", command=self.load_next_unannotated_json)
+        self.next_unannotated_button.pack(side=tk.RIGHT, padx=5)
+
+        # 열린 문서 탭 (탭을 바꿔도 문서마다 모델, 확대/이동, 캔버스 아이템, 타일을 그대로 보관)
+        self.tab_bar = tk.Frame(self.root)
+        self.tab_bar.pack(side=tk.TOP, fill=tk.X)
+        self.active_tab = tk.IntVar()
+
         # 메뉴 바 설정
         menubar = tk.Menu(root)
         root.config(menu=menubar)
@@ -85,9 +950,40 @@ class ImageEditor:
         file_menu.add_command(label="Save Image", command=self.save_image)
         file_menu.add_command(label="Save Nodes and Connections as JSON", command=self.save_nodes_as_json)
         file_menu.add_command(label="Load JSON", command=self.load_json)
+        file_menu.add_command(label="Rescan Dataset Folder", command=self.rescan_dataset)
+        file_menu.add_command(label="Dataset Statistics...", command=self.show_dataset_statistics)
+        file_menu.add_command(label="Search Dataset...", accelerator="Ctrl+F", command=self.open_search)
+        file_menu.add_command(label="Close Document", accelerator="Ctrl+W", command=self.close_tab)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.on_closing)
 
+        # 성능 진단 메뉴
+        self.metrics_enabled = tk.BooleanVar(value=False)
+        self.profiling_enabled = tk.BooleanVar(value=False)
+        self.fps_overlay_enabled = tk.BooleanVar(value=False)
+        edit_menu = tk.Menu(menubar)
+        menubar.add_cascade(label="Edit", menu=edit_menu)
+        edit_menu.add_command(label="Undo", accelerator="Ctrl+Z", command=self.undo)
+        edit_menu.add_command(label="Redo", accelerator="Ctrl+Y", command=self.redo)
+
+        sync_menu = tk.Menu(menubar)
+        menubar.add_cascade(label="Sync", menu=sync_menu)
+        sync_menu.add_command(label="Connect to Sync Server...", command=self.connect_sync)
+        sync_menu.add_command(label="Disconnect", command=self.disconnect_sync)
+
+        debug_menu = tk.Menu(menubar)
+        menubar.add_cascade(label="Debug", menu=debug_menu)
+        debug_menu.add_checkbutton(label="Record Handler Timings", variable=self.metrics_enabled,
+                                   command=self.toggle_metrics)
+        debug_menu.add_command(label="Export Handler Timings...", command=self.export_metrics)
+        debug_menu.add_command(label="Reset Handler Timings", command=self.reset_metrics)
+        debug_menu.add_command(label="Image Memory...", command=self.show_image_memory)
+        debug_menu.add_separator()
+        debug_menu.add_checkbutton(label="Profile Session (cProfile)", variable=self.profiling_enabled,
+                                   command=self.toggle_profiler)
+        debug_menu.add_checkbutton(label="Show FPS Overlay", variable=self.fps_overlay_enabled,
+                                   command=self.toggle_fps_overlay)
+
         # 윈도우 기본 버튼 추가
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)  # 창 닫기 버튼
         self.root.resizable(True, True)  # 창 크기 조절 가능하도록
@@ -132,11 +1028,11 @@ class ImageEditor:
         self.draw_mode_btn.pack(side=tk.LEFT, padx=5)
         self.connect_mode_btn.pack(side=tk.LEFT, padx=5)
 
-        # 투명도 슬라이더
-        self.opacity_slider = tk.Scale(self.top_frame, from_=0, to=255, orient=tk.HORIZONTAL, label="Transparency")
+        # 투명도 슬라이더 (값이 바뀔 때만 command 호출, 반영은 프레임 단위로 모아서 처리)
+        self.opacity_slider = tk.Scale(self.top_frame, from_=0, to=255, orient=tk.HORIZONTAL, label="Transparency",
+                                       command=self.adjust_opacity)
         self.opacity_slider.set(128)
         self.opacity_slider.pack(fill=tk.X)
-        self.opacity_slider.bind("<Motion>", self.adjust_opacity)
 
         # 비율 유지 체크박스
         self.keep_aspect_ratio = tk.BooleanVar(value=True)
@@ -157,8 +1053,9 @@ class ImageEditor:
         }
 
         # 리스트박스와 버튼
-        self.label_listbox = tk.Listbox(self.right_frame, width=40, height=20)
-        self.label_listbox.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)  # fill=tk.BOTH로 좌우 크기 조정 가능
+        self.annotation_list = AnnotationList(self.right_frame, self.annotation_row_count, self.annotation_row,
+                                              self.annotation_row_index, self.on_list_select, width=40, height=20)
+        self.annotation_list.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)  # fill=tk.BOTH로 좌우 크기 조정 가능
         self.delete_button = tk.Button(self.right_frame, text="Delete Selected", command=self.delete_selected)
         self.delete_button.pack(padx=10, pady=5)
         self.edit_button = tk.Button(self.right_frame, text="Edit Selected", command=self.edit_selected)
@@ -202,12 +1099,10 @@ class ImageEditor:
         self.setup_type_selector()
 
         # 이미지 및 도형 관련 변수 초기화
-        self.image = None
-        self.original_image = None
-        self.tk_image = None
+        self.image = None          # 캔버스 크기로 줄인 사본 (Save Image, ImageDraw용)
+        self.source_image = None   # SourceImage (표시용 해상도만 디코딩된 원본 이미지)
         self.draw = None
-        self.nodes = []
-        self.connections = []
+        self.document = AnnotationDocument()  # 노드/연결과 인덱스 (self.nodes, self.connections로도 접근)
         self.start_x = None
         self.start_y = None
         self.selected_node = None
@@ -219,6 +1114,18 @@ class ImageEditor:
         self.img_y = 0
         self.drag_data = {"x": 0, "y": 0}
         self.resizing = False  # 노드 크기 조정 상태를 추적
+        self.pointer = (0, 0)     # 마지막 마우스 위치 (hover 히트 테스트용)
+        self.preview_end = None   # 새 노드 미리보기 사각형의 끝점
+
+        # 열린 문서 목록 (추정 메모리나 문서 수가 한도를 넘으면 오래 보지 않은 문서부터 닫음)
+        self.session = DocumentSession(self.measure_document)
+        self.session.activate(self.session.new_state())
+
+        # 노드/연결/이미지 캔버스 아이템을 유지하는 렌더링 레이어 (문서마다 하나, 문서 태그를 붙임)
+        self.scene = CanvasScene(self.canvas, self.session.active.tag)
+
+        # 프레임 간격 측정 (계측 또는 FPS 오버레이가 켜져 있을 때만 동작)
+        self.frame_monitor = FrameMonitor(self.root, self.metrics, self.update_fps_overlay)
 
         # 이벤트 바인딩
         self.canvas.bind("<Button-1>", self.on_click)
@@ -234,7 +1141,6 @@ class ImageEditor:
         self.canvas.bind("<ButtonRelease-3>", self.end_canvas_drag)
         self.canvas.bind("<Double-1>", self.on_canvas_left_click)
 
-        self.label_listbox.bind("<<ListboxSelect>>", self.on_list_select)
         self.root.bind("<Delete>", self.on_key_delete)
 
         # 드래그 상태 변수 추가
@@ -246,47 +1152,80 @@ class ImageEditor:
         self.scale_factor = 1.0
         self.zoom_step = 0.1
         self.canvas.bind("<Control-MouseWheel>", self.zoom)
+        self.canvas_width = None
+        self.canvas_height = None
+        self.canvas.bind("<Configure>", self.on_resize)
         self.canvas.bind("<Motion>", self.on_motion)
 
         # 단축키 바인딩: Ctrl+S로 JSON 파일 저장
         self.root.bind('<Control-s>', self.save_nodes_as_json)
         self.root.bind('<Control-S>', self.save_nodes_as_json)
+        self.root.bind('<Control-z>', self.undo)
+        self.root.bind('<Control-y>', self.redo)
+        self.root.bind('<Control-Z>', self.redo)  # Ctrl+Shift+Z
+        self.root.bind('<Control-w>', self.close_tab)
+        self.root.bind('<Control-f>', self.open_search)
 
          # 캐싱 변수 초기화
-        self._cached_transparent_image = None  # 투명도 적용된 이미지
-        self._cached_resized_image = None      # 리사이즈된 이미지
-        self._cached_resized_image_size = None # 리사이즈된 이미지 크기
-        self._cached_tk_image = None           # Tkinter에 표시할 이미지
+        self.image_executor = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+        self.image_pyramid = None              # 배율별 이미지 피라미드 (백그라운드 생성)
+        self.pyramid_timer = None              # 피라미드 완료 확인 타이머
+        self.tile_layer = TileLayer(self.canvas, self.session.active.tag)  # 화면에 보이는 타일만 그리는 이미지 레이어
+
+        # 이전/다음 JSON 문서를 미리 읽어 두는 캐시
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=2)
+        self.document_cache = DocumentCache(self.prefetch_executor)
 
         # 기타 초기화
         self.image_path = None
+        self.current_json_path = None
+        self.manifest = None  # 현재 폴더의 DatasetManifest
+
+        # 데이터셋 전문 검색 (색인 갱신은 전용 스레드에서, 검색은 UI 스레드의 연결로)
+        self.search_index = None       # 검색 중인 폴더의 SearchIndex
+        self.search_dialog = None
+        self.search_executor = ThreadPoolExecutor(max_workers=1)
+        self.search_refresh = None     # 진행 중인 색인 갱신 Future
+        self.search_cancel = threading.Event()
+
+        # 편집 연산을 저널에 기록하고 주기적으로 JSON에 반영하는 자동 저장
+        self.autosaver = Autosaver()
+        self.autosave_session = None
+        self.root.after(500, self.poll_autosave)
+
+        # 동시 편집 동기화 서버 연결 (Sync 메뉴에서 연결했을 때만)
+        self.sync_client = None
+        self.sync_timer = None
+
+        # 되돌리기/다시 실행 (편집 연산과 그 역연산만 기록)
+        self.history = EditHistory()
+        self.history.attach(self.document)
         
-        # 선택된 항목의 인덱스를 분리하여 초기화
-        self.selected_node_index = None
-        self.selected_connection_index = None
-        self.selected_item_index = None  # 초기화 추가
+        # 목록/캔버스에서 선택한 노드 또는 연결의 id (편집으로 위치가 바뀌어도 유지)
+        self.selected_node_id = None
+        self.selected_connection_id = None
+        self.selected_item_index = None  # 마우스 아래 노드 인덱스 (hover/드래그용)
+
+        self.update_tab_bar()
+
 
+    @property
+    def nodes(self):
+        return self.document.nodes
+
+    @property
+    def connections(self):
+        return self.document.connections
 
         # 노드 크기 변경 함수
     def change_node_size(self, scale_factor):
-        for node in self.nodes:
-            x1, y1, x2, y2 = node['coords']
-            center_x = (x1 + x2) / 2
-            center_y = (y1 + y2) / 2
-            width = (x2 - x1) * scale_factor
-            height = (y2 - y1) * scale_factor
-            node['coords'] = (
-                center_x - width / 2,
-                center_y - height / 2,
-                center_x + width / 2,
-                center_y + height / 2,
-            )
-        self.update_canvas()  # 변경된 내용을 반영하여 캔버스를 다시 그리기
+        self.document.scale_nodes(scale_factor)  # 모든 노드가 바뀌었으므로 관계도 전체 재계산
+        self.frame_scheduler.mark_all()  # 다음 프레임에 모든 아이템을 다시 그리기
 
     # 폰트 크기 변경 함수
     def change_font_size(self, change):
         self.font_size = max(1, self.font_size + change)  # 최소 폰트 크기를 1로 제한
-        self.update_canvas()  # 변경된 내용을 반영하여 캔버스를 다시 그리기
+        self.frame_scheduler.mark_all()  # 다음 프레임에 모든 아이템을 다시 그리기
      
 
     def start_canvas_drag(self, event):
@@ -295,16 +1234,18 @@ class ImageEditor:
         clicked_node = self.get_node_at(event.x, event.y)
 
         if clicked_node is not None:
-            # 노드가 클릭된 경우: 노드 이동으로 처리
+            # 노드가 클릭된 경우: 노드 이동으로 처리 (드래그 전체를 되돌리기 한 단계로)
             self.selected_item_index = clicked_node
             self.dragging = True
             self.drag_data = {"x": event.x, "y": event.y}
+            self.history.begin("move")
         else:
             # 노드가 아닌 경우: 캔버스 이동으로 처리
             self.dragging_canvas = True
             self.drag_start_x = event.x
             self.drag_start_y = event.y
 
+    @timed("on_canvas_drag")
     def on_canvas_drag(self, event):
         """마우스 오른쪽 버튼 드래그 중."""
         if self.dragging:
@@ -313,12 +1254,11 @@ class ImageEditor:
                 dx = event.x - self.drag_data["x"]
                 dy = event.y - self.drag_data["y"]
                 node = self.nodes[self.selected_item_index]
-                x1, y1, x2, y2 = node['coords']
-                new_coords = (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
-                node['coords'] = new_coords
+                x1, y1, x2, y2 = node.coords
+                self.document.set_node_coords(node, (x1 + dx, y1 + dy, x2 + dx, y2 + dy))
                 self.drag_data["x"] = event.x
                 self.drag_data["y"] = event.y
-                self.update_canvas()
+                self.refresh_node(self.selected_item_index)
         elif self.dragging_canvas:
             # 캔버스 이동 처리
             dx = event.x - self.drag_start_x
@@ -332,244 +1272,325 @@ class ImageEditor:
             self.drag_start_x = event.x
             self.drag_start_y = event.y
 
-            # 캔버스 업데이트
-            self.update_canvas()
+            # 캔버스 업데이트 (이벤트가 몰려도 프레임당 한 번)
+            self.frame_scheduler.mark_view()
 
     def end_canvas_drag(self, event):
         """마우스 오른쪽 버튼 드래그 종료."""
+        if self.dragging:
+            self.history.end()
         self.dragging = False
         self.dragging_canvas = False
+        self.frame_scheduler.flush()  # 마지막 위치를 바로 표시
 
 
     def assign_parent_child_relationship(self):
-        """노드 간 부모-자식 관계를 설정"""
-        for child in self.nodes:
-            child['parent_id'] = None  # 초기화
-
-            for parent in self.nodes:
-                if child['id'] == parent['id']:
-                    continue
-
-                # 부모 노드의 영역 계산
-                px1, py1, px2, py2 = parent['coords']
-                cx1, cy1, cx2, cy2 = child['coords']
-
-                # 자식 노드가 부모 노드 안에 완전히 포함되는지 확인
-                if px1 <= cx1 <= px2 and px1 <= cx2 <= px2 and py1 <= cy1 <= py2 and py1 <= cy2 <= py2:
-                    child['parent_id'] = parent['id']
-                    break  # 첫 번째 부모를 찾으면 종료
+        """노드 간 부모-자식 관계를 전체 재설정. 평소에는 AnnotationDocument가 점진적으로 갱신."""
+        self.document.containment.rebuild([node.id for node in self.nodes])
 
     def update_label_listbox(self):
-        """Listbox 업데이트 메서드, 노드와 연결을 각각 추가."""
-        self.label_listbox.delete(0, tk.END)
-
-        # 노드를 리스트 박스에 추가
-        for node in self.nodes:
-            self.label_listbox.insert(tk.END, f"Node({node['id']}): {node['text']}")
-
-        # 연결을 리스트 박스에 추가
-        for connection in self.connections:
-            from_id = connection['from']
-            to_id = connection['to']
-            direction_icon = "→" if connection['direction'] else "-"
-            text = connection['text'] or ""
-            connection_type = connection['type']
-            display_text = f"Connection({connection['id']}): {from_id} {direction_icon} {to_id} ({text}) [Type: {connection_type}]"
-            self.label_listbox.insert(tk.END, display_text)
-
-        # 하이라이트 처리 (선택된 항목을 노란색으로 하이라이트)
-        selected_index = self.label_listbox.curselection()
-        if selected_index:
-            self.label_listbox.itemconfig(selected_index[0], {'bg': 'yellow'})
-        
-        # 리스트박스를 다시 업데이트하여 하이라이트 효과 반영
-        self.label_listbox.update_idletasks()
-            
-
-    def on_list_select(self, event):
-        selection = self.label_listbox.curselection()
-
-        if selection:
-            selected_index = selection[0]
-
-            # `selected_item_index`로 통합 관리
-            self.selected_item_index = selected_index
+        """목록 패널의 보이는 줄을 다시 채움 (행이 추가/삭제되었을 때)."""
+        self.annotation_list.refresh()
+
+    def annotation_row_count(self):
+        return len(self.nodes) + len(self.connections)
+
+    def annotation_row(self, index):
+        """목록의 index번째 행 (노드 다음에 연결)의 (키, 표시 텍스트)."""
+        if index < len(self.nodes):
+            node = self.nodes[index]
+            return ("node", node.id), f"Node({node.id}): {node.text}"
+        connection = self.connections[index - len(self.nodes)]
+        return ("connection", connection.id), self.format_connection_row(connection)
+
+    def annotation_row_index(self, key):
+        kind, item_id = key
+        if kind == "node":
+            return self.document.node_index(item_id)
+        index = self.document.connection_index(item_id)
+        return None if index is None else len(self.nodes) + index
+
+    def format_connection_row(self, connection):
+        direction_icon = "→" if connection.direction else "-"
+        display_text = (f"Connection({connection.id}): {connection.from_id} {direction_icon} {connection.to_id} "
+                        f"({connection.text or ''}) [Type: {connection.type}]")
+        if connection.color != self.colors["Black"]:
+            color_name = next((name for name, value in self.colors.items() if value == connection.color), connection.color)
+            display_text += f" [Color: {color_name}]"
+        return display_text
+
+    def on_list_select(self, key):
+        self.set_selection(key, see=False)
+
+    def set_selection(self, key, see=True, redraw=True):
+        """목록과 캔버스의 선택을 key(("node" | "connection", id) 또는 None)로 맞추고 바뀐 아이템만 다음 프레임에 다시 그림."""
+        previous_node_id, previous_connection_id = self.selected_node_id, self.selected_connection_id
+        self.selected_node_id = key[1] if key is not None and key[0] == "node" else None
+        self.selected_connection_id = key[1] if key is not None and key[0] == "connection" else None
+        self.annotation_list.select(key, see=see)
+        if not redraw:
+            return
 
-            # 노드와 연결 구분
-            if selected_index < len(self.nodes):
-                self.selected_node_index = selected_index
-                self.selected_connection_index = None
-            else:
-                self.selected_node_index = None
-                self.selected_connection_index = selected_index - len(self.nodes)
-        else:
-            self.selected_node_index = None
-            self.selected_connection_index = None
-            self.selected_item_index = None
+        self.frame_scheduler.mark_nodes({previous_node_id, self.selected_node_id} - {None})
+        self.frame_scheduler.mark_connections({previous_connection_id, self.selected_connection_id} - {None})
 
-        self.update_canvas()
+    def selected_connection(self):
+        if self.selected_connection_id is None:
+            return None
+        return self.document.connection_map.get(self.selected_connection_id)
 
+    def refresh_connection(self, connection):
+        """연결 하나의 캔버스 아이템과 목록 줄만 갱신."""
+        self.frame_scheduler.mark_connections([connection.id])
+        self.annotation_list.update_row(("connection", connection.id))
 
     def change_connection_color(self, _=None):
-        selected_index = self.label_listbox.curselection()
-        if not selected_index:
-            return  # 색상을 변경할 항목이 선택되지 않은 경우
+        connection = self.selected_connection()
+        if connection is None:
+            return  # 색상을 변경할 연결이 선택되지 않은 경우
 
-        selected_index = selected_index[0]
-
-        # 선택된 항목이 연결인지 확인
-        if selected_index >= len(self.nodes):  # Nodes count as entries before connections in Listbox
-            connection_index = selected_index - len(self.nodes)
-            
-            # 현재 선택된 색상 가져오기
-            color_name = self.selected_color.get()
-            new_color = self.colors[color_name]
-            
-            # 연결의 색상 속성 업데이트
-            self.connections[connection_index]['color'] = new_color
-            
-            # Listbox에서 텍스트 업데이트
-            connection = self.connections[connection_index]
-            from_id = connection['from']
-            to_id = connection['to']
-            direction_icon = "→" if connection['direction'] else "-"
-            text = connection['text'] or ""
-            connection_type = connection['type']
-            display_text = f"Connection({connection['id']}): {from_id} {direction_icon} {to_id} ({text}) [Type: {connection_type}] [Color: {color_name}]"
-            
-            # Listbox 갱신
-            self.label_listbox.delete(selected_index)
-            self.label_listbox.insert(selected_index, display_text)
-            
-            # 변경 사항을 반영하기 위해 캔버스를 다시 그립니다.
-            self.update_canvas()
+        # 현재 선택된 색상으로 연결의 색상 속성 업데이트
+        self.document.update_connection(connection, color=self.colors[self.selected_color.get()])
+        self.refresh_connection(connection)
 
 
     def load_json(self):
         json_path = filedialog.askopenfilename(filetypes=[("JSON Files", "*.json")])
         if not json_path:
             return  # 파일 선택 취소 시 종료
-        self.current_json_path = json_path
         self.load_json_file(json_path)
 
 
+    @timed("load_json_file")
     def load_json_file(self, json_path):
+        """json_path를 새 탭으로 엶. 이미 열려 있는 문서이면 그 탭으로 전환만 한다 (다시 읽지 않음)."""
+        if self.document_key(json_path) in self.session:
+            self.switch_tab(self.document_key(json_path))
+            self.prefetch_neighbours(json_path)
+            return
         try:
-            # JSON 파일에서 데이터 로드
-            with open(json_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-
-            # 기존 데이터 초기화
-            self.nodes.clear()
-            self.connections.clear()
-            self.label_listbox.delete(0, tk.END)
-            self.selected_item_index = None  # 선택 항목 초기화
-
-            # 좌표 겹침 방지를 위한 함수들 정의
-            def is_overlapping(new_coords, existing_coords):
-                """Check if new_coords overlap with any in existing_coords list."""
-                x1, y1, x2, y2 = new_coords
-                for ex_x1, ex_y1, ex_x2, ex_y2 in existing_coords:
-                    if not (x2 < ex_x1 or x1 > ex_x2 or y2 < ex_y1 or y1 > ex_y2):
-                        return True
-                return False
+            # 미리 읽어 둔 문서가 있으면 그대로 사용
+            document = self.document_cache.get(json_path, self.canvas.winfo_width())
+            self.apply_document(document)
+            # 이동할 때마다 모달 창을 띄우지 않고 상태 라벨에 표시 (저널 복구 메시지가 있으면 그대로 둠)
+            if not self.save_status_label.cget("text"):
+                self.save_status_label.config(text=f"Loaded {os.path.basename(json_path)}", fg="gray")
 
-            def assign_non_overlapping_coords(existing_coords):
-                """Assign coordinates that do not overlap with existing_coords."""
-                x, y, width, height = 50, 50, 100, 50
-                while is_overlapping((x, y, x + width, y + height), existing_coords):
-                    x += 120
-                    if x + width > self.canvas.winfo_width():
-                        x = 50
-                        y += 70
-                return (x, y, x + width, y + height)
-
-            existing_coords = []  # Track existing node coordinates for overlap checking
-
-            # 노드 불러오기 및 리스트 초기화
-            def parse_nodes(node_list, parent_id=None):
-                for node in node_list:
-                    if "coords" not in node or not node["coords"]:
-                        node["coords"] = assign_non_overlapping_coords(existing_coords)
-                    existing_coords.append(node["coords"])
-
-                    node_data = {
-                        "id": node["id"],
-                        "coords": node["coords"],
-                        "text": node["text"],
-                        "parent_id": parent_id
-                    }
-                    self.nodes.append(node_data)
-
-                    # Listbox에 노드 추가
-                    self.label_listbox.insert(tk.END, f"Node({node['id']}): {node['text']}")
-
-                    # "node" 키가 있는 경우만 재귀 호출
-                    if "node" in node and isinstance(node["node"], list):
-                        parse_nodes(node["node"], node["id"])
-
-            # 최상위 "components" 키의 데이터   를 재귀적으로 파싱
-            parse_nodes(data.get("components", []))  # "components"로 변경
-
-            # connections를 불러와 Listbox에 추가
-            def generate_unique_id(existing_ids):
-                """Generate a unique 3-character ID."""
-                while True:
-                    new_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=3))
-                    if new_id not in existing_ids:
-                        return new_id
-
-            existing_ids = {conn.get('id') for conn in data.get("connections", []) if 'id' in conn}
-            self.connections = data.get("connections", [])
-            for connection in self.connections:
-                if 'id' not in connection or not connection['id']:
-                    connection['id'] = generate_unique_id(existing_ids)
-                    existing_ids.add(connection['id'])
-                from_id = connection['from']
-                to_id = connection['to']
-                direction_icon = "→" if connection['direction'] else "-"
-                text = connection['text'] or ""
-                connection_type = connection['type']
-                color = connection.get('color', "#000000")  # Default to black if color is missing
-                connection['color'] = color  # 기본값 적용
-                display_text = f"Connection({connection['id']}): {from_id} {direction_icon} {to_id} ({text}) [Type: {connection_type}]"
-                self.label_listbox.insert(tk.END, display_text)
-
-            # 이미지 파일을 찾아 로드
-            base_name = os.path.splitext(os.path.basename(json_path))[0]
-            directory = os.path.dirname(json_path)
-            possible_extensions = [".png", ".jpg", ".jpeg", ".bmp", ".gif"]
-            image_path = None
-
-            for ext in possible_extensions:
-                image_path = os.path.join(directory, f"{base_name}{ext}")
-                if os.path.exists(image_path):
-                    break
-            else:
-                image_path = None
-
-            if image_path:
-                self.image_path = image_path
-                self.original_image = Image.open(self.image_path)
-                if self.original_image.mode in ("RGBA", "LA") or (self.original_image.mode == "P" and "transparency" in self.original_image.info):
-                    # 알파 채널이 있는 이미지를 불러올 때 투명한 부분을 흰색으로 채우지 않고 그대로 유지
-                    alpha = self.original_image.convert("RGBA").split()[-1]
-                    background = Image.new("RGBA", self.original_image.size, (255, 255, 255, 0))
-                    self.original_image = Image.composite(self.original_image, background, alpha)
-                self.update_image()  # Canvas 크기와 이미지를 동기화
-                self.file_name_label.config(text=f"File: {os.path.basename(self.image_path)}")  # 파일명 업데이트
-            else:
-                messagebox.showwarning("Image Missing", "The corresponding image file could not be found with common extensions (.png, .jpg, .jpeg, .bmp, .gif).")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load JSON file: {e}")
+            return
 
-            # Listbox와 Canvas 업데이트
-            self.update_label_listbox()
-            self.assign_parent_child_relationship()  # JSON 로드 후 관계 설정
-            self.update_canvas()
+        # 이전/다음 문서를 백그라운드에서 미리 읽기
+        self.prefetch_neighbours(json_path)
 
-            messagebox.showinfo("Load Complete", "JSON file loaded successfully and is ready for editing.")
+    def apply_document(self, document):
+        """read_annotation_document 결과를 새 문서 탭으로 열어 편집기 상태로 반영."""
+        # 현재 문서는 탭에 보관하고 빈 상태에서 시작
+        self.new_tab(self.document_key(document["json_path"]))
+        self.current_json_path = document["json_path"]
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load JSON file: {e}")
+        # 캐시된 문서는 다시 열 수 있으므로 복사본을 편집 (인덱스와 부모-자식 관계도 복사본에서 생성)
+        self.document = document["document"].copy()
+        file_name = os.path.basename(document["image_path"]) if document["image_path"] else self.document.file_name
+        self.start_autosave(document["json_path"], file_name, document["document"])
+
+        if document["image"] is not None:
+            self.image_path = document["image_path"]
+            self.source_image = document["image"]
+            self.update_image()  # Canvas 크기와 이미지를 동기화
+            self.file_name_label.config(text=f"File: {os.path.basename(self.image_path)}")  # 파일명 업데이트
+        else:
+            messagebox.showwarning("Image Missing", "The corresponding image file could not be found with common extensions (.png, .jpg, .jpeg, .bmp, .gif).")
+
+        # Listbox와 Canvas 업데이트
+        self.update_label_listbox()
+        self.frame_scheduler.mark_view()
+        self.frame_scheduler.mark_all()
+        self.evict_tabs()
+
+    def dataset_manifest(self, json_path):
+        """json_path가 속한 디렉터리의 매니페스트. 현재 파일이 목록에 없으면 다시 스캔."""
+        directory = os.path.dirname(os.path.abspath(json_path))
+        if self.manifest is None or self.manifest.directory != directory:
+            if self.manifest is not None:
+                self.manifest.save()
+            self.manifest = DatasetManifest.open(directory)
+        if os.path.basename(json_path) not in self.manifest.positions:
+            self.manifest.refresh(force=True)
+        return self.manifest
+
+    def json_neighbours(self, json_path):
+        """현재 폴더 내에서 이름 순으로 (이전, 다음) JSON 경로 반환."""
+        manifest = self.dataset_manifest(json_path)
+        name = os.path.basename(json_path)
+        prev_path = os.path.join(manifest.directory, manifest.neighbour(name, -1))
+        next_path = os.path.join(manifest.directory, manifest.neighbour(name, 1))
+        return prev_path, next_path
+
+    def prefetch_neighbours(self, json_path):
+        try:
+            prev_path, next_path = self.json_neighbours(json_path)
+        except (OSError, ValueError):
+            return
+        canvas_width = self.canvas.winfo_width()
+        self.document_cache.prefetch(next_path, canvas_width)
+        self.document_cache.prefetch(prev_path, canvas_width)
+
+    # 문서 탭: 활성 문서의 상태는 편집기 속성에 있고, 다른 문서의 상태는 DocumentState.values에 보관
+
+    TAB_FIELDS = ("document", "history", "autosave_session", "current_json_path", "image_path", "source_image",
+                  "image", "draw", "image_pyramid", "tile_layer", "scene", "scale_factor", "img_x", "img_y",
+                  "selected_node_id", "selected_connection_id")
+
+    def document_key(self, json_path):
+        return os.path.abspath(json_path)
+
+    def tab_values(self):
+        return {name: getattr(self, name) for name in self.TAB_FIELDS}
+
+    def measure_document(self, state):
+        """DocumentSession 콜백: 문서 하나의 추정 메모리 크기 (모델, 표시용 원본, 캔버스 사본, 타일).
+
+        피라미드 레벨은 ImageBufferCache의 예산으로 따로 관리하므로 포함하지 않는다.
+        """
+        values = self.tab_values() if state is self.session.active else state.values
+        size = model_nbytes(values["document"]) + values["tile_layer"].nbytes
+        if values["source_image"] is not None:
+            size += values["source_image"].nbytes
+        if values["image"] is not None:
+            size += image_nbytes(values["image"])
+        return size
+
+    def new_tab(self, key):
+        """현재 문서를 탭에 보관하고 key 문서용 빈 상태로 전환. 현재 탭이 아무것도 열지 않은 새 문서이면 그 탭을 사용."""
+        state = self.session.active
+        if state.key is None and self.autosave_session is None and not self.nodes:
+            self.session.rekey(state, key)
+            return
+        self.stash_tab()
+        state = self.session.new_state(key)
+        self.session.add(state)
+        self.session.activate(state)
+        self.reset_tab(state)
+
+    def reset_tab(self, state):
+        """state(활성 문서)의 편집기 상태를 빈 문서로 초기화."""
+        self.document = AnnotationDocument()
+        self.history = EditHistory()
+        self.history.attach(self.document)
+        self.autosave_session = None
+        self.current_json_path = None
+        self.image_path = None
+        self.source_image = None
+        self.image = None
+        self.draw = None
+        self.image_pyramid = None
+        self.tile_layer = TileLayer(self.canvas, state.tag)
+        self.scene = CanvasScene(self.canvas, state.tag)
+        self.scale_factor = 1.0
+        self.img_x = 0
+        self.img_y = 0
+        self.selected_node_id = None
+        self.selected_connection_id = None
+        self.annotation_list.top = 0
+        self.annotation_list.select(None)
+        self.file_name_label.config(text="No file loaded")
+
+    def stash_tab(self):
+        """활성 문서의 상태를 DocumentState에 보관하고 캔버스 아이템을 숨김 (아이템과 타일은 지우지 않음)."""
+        self.frame_scheduler.flush()  # 이 문서에 표시해 둔 변경을 먼저 그림
+        state = self.session.active
+        state.values = self.tab_values()
+        state.values["font_size"] = self.font_size
+        state.values["list_top"] = self.annotation_list.top
+        if self.image_pyramid is not None:
+            self.image_pyramid.use_level(None)  # 보이지 않는 동안에는 공유 캐시에서 제거될 수 있음
+        self.canvas.itemconfigure(state.tag, state="hidden")
+        self.canvas.delete("highlight", "temp_shape")
+        self.selected_item_index = None
+        self.dragging = False
+        if state.key is None:
+            self.discard_tab(state)  # 파일 없이 만든 새 문서는 보관하지 않음
+
+    def restore_tab(self, state):
+        """보관한 문서 상태를 편집기에 되돌리고 캔버스 아이템을 다시 표시 (파싱/리샘플링 없음)."""
+        values = state.values
+        for name in self.TAB_FIELDS:
+            setattr(self, name, values[name])
+        state.values = {}
+        self.session.activate(state)
+        self.canvas.itemconfigure(state.tag, state="normal")
+        self.tile_layer.resume(self.image_pyramid)
+        self.watch_image_pyramid()
+        self.annotation_list.top = values["list_top"]
+        self.frame_scheduler.mark_view()
+        if values["font_size"] != self.font_size or values.get("stale"):
+            self.frame_scheduler.mark_all()  # 숨겨져 있는 동안 글꼴 크기나 (동기화로) 문서가 바뀜
+
+    def discard_tab(self, state):
+        """보관한 문서를 닫음: 남은 변경을 저장하고 캔버스 아이템/타일을 지우며 피라미드 작업을 취소."""
+        values = state.values
+        self.leave_sync(values)
+        if values.get("autosave_session") is not None:
+            self.autosaver.close(values["autosave_session"])
+        if values.get("image_pyramid") is not None:
+            values["image_pyramid"].cancel()
+        self.canvas.delete(state.tag)
+        state.values = {}
+
+    def show_active_document(self):
+        """활성 문서가 바뀐 뒤 목록, 파일명, 탭 표시를 갱신."""
+        key = ("node", self.selected_node_id) if self.selected_node_id is not None else \
+            ("connection", self.selected_connection_id) if self.selected_connection_id is not None else None
+        self.annotation_list.select(key, see=False)
+        self.update_label_listbox()
+        name = os.path.basename(self.image_path) if self.image_path else None
+        self.file_name_label.config(text=f"File: {name}" if name else "No file loaded")
+        self.save_status_label.config(text="")
+        self.update_tab_bar()
+
+    @timed("switch_tab")
+    def switch_tab(self, key):
+        """열려 있는 key 문서로 전환."""
+        state = self.session.get(key)
+        if state is None or state is self.session.active:
+            self.update_tab_bar()
+            return
+        self.stash_tab()
+        self.restore_tab(state)
+        self.show_active_document()
+
+    def close_tab(self, event=None):
+        """활성 문서를 닫고(남은 변경은 자동 저장) 가장 최근에 본 문서로 전환."""
+        state = self.session.active
+        if state.key is None:
+            return
+        self.stash_tab()
+        self.session.remove(state)
+        self.discard_tab(state)
+        following = self.session.most_recent()
+        if following is None:
+            # 열린 문서가 없으면 빈 새 문서
+            self.session.activate(self.session.new_state())
+            self.reset_tab(self.session.active)
+        else:
+            self.restore_tab(following)
+        self.show_active_document()
+
+    def evict_tabs(self):
+        """메모리/문서 수 한도를 넘은 만큼 오래 보지 않은 문서를 닫음."""
+        for state in self.session.evict():
+            self.discard_tab(state)
+        self.update_tab_bar()
+
+    def update_tab_bar(self):
+        for widget in self.tab_bar.winfo_children():
+            widget.destroy()
+        for state in self.session.tabs():
+            title = os.path.splitext(os.path.basename(state.key))[0] if state.key else "Untitled"
+            tk.Radiobutton(self.tab_bar, text=title, variable=self.active_tab, value=state.serial, indicatoron=False,
+                           command=lambda key=state.key: self.switch_tab(key)).pack(side=tk.LEFT, padx=2)
+        self.active_tab.set(self.session.active.serial)
 
 
 
@@ -579,96 +1600,156 @@ class ImageEditor:
             return dialog.show()
 
     def toggle_direction(self):
-        selected_index = self.label_listbox.curselection()
-        if not selected_index:
-            messagebox.showinfo("Info", "방향을 변경할 연결을 선택하세요.")
+        connection = self.selected_connection()
+        if connection is None:
+            if self.selected_node_id is None:
+                messagebox.showinfo("Info", "방향을 변경할 연결을 선택하세요.")
             return
 
-        selected_index = selected_index[0]
-        if selected_index >= len(self.nodes):  # 연결만 선택되었는지 확인
-            connection_index = selected_index - len(self.nodes)
-            
-            # `direction` 필드를 토글
-            if 0 <= connection_index < len(self.connections):
-                self.connections[connection_index]['direction'] = not self.connections[connection_index]['direction']
-                
-                # 리스트박스 업데이트
-                from_id = self.connections[connection_index]['from']
-                to_id = self.connections[connection_index]['to']
-                text = self.connections[connection_index]['text'] or ""
-                connection_type = self.connections[connection_index]['type'] or ""
-                direction_icon = "→" if self.connections[connection_index]['direction'] else "-"
-                display_text = f"Connection: {from_id} {direction_icon} {to_id} ({text}) [Type: {connection_type}]"
-                self.label_listbox.delete(selected_index)
-                self.label_listbox.insert(selected_index, display_text)
-             
-            
-            self.update_canvas()
+        # `direction` 필드를 토글
+        self.document.update_connection(connection, direction=not connection.direction)
+        self.refresh_connection(connection)
 
     
+    @timed("zoom")
     def zoom(self, event):
         if event.delta > 0:  # 확대
             self.scale_factor = min(5.0, self.scale_factor + self.zoom_step)  # 최대 5배
         elif event.delta < 0:  # 축소
             self.scale_factor = max(0.1, self.scale_factor - self.zoom_step)  # 최소 0.1배
-        self.update_canvas()
-
-    def delayed_update_canvas(self):
-        if hasattr(self, "_update_pending") and self._update_pending:
-            return
-        self._update_pending = True
-
-        def update():
-            self.update_canvas()
-            self._update_pending = False
-
-        self.root.after(50, update)  # 50ms 지연
-
-
-
-        
+        self.frame_scheduler.mark_view()
 
     def move_image(self, dx, dy):
     # """Move the image by (dx, dy) without affecting other items on the canvas."""
         self.img_x += dx
         self.img_y += dy
-        self.update_canvas()
+        self.frame_scheduler.mark_view()
 
     # 창을 닫을 때 동작
     def on_closing(self):
         if messagebox.askokcancel("Quit", "정말 종료하시겠습니까?"):
+            self.image_executor.shutdown(wait=False, cancel_futures=True)
+            self.prefetch_executor.shutdown(wait=False, cancel_futures=True)
+            self.search_cancel.set()
+            self.search_executor.shutdown(wait=False, cancel_futures=True)
+            if self.search_index is not None:
+                self.search_index.close()
+            self.disconnect_sync()
+            for state in list(self.session.documents.values()):
+                if state is not self.session.active:
+                    self.discard_tab(state)  # 보관 중인 문서의 자동 저장 세션 닫기
+            if self.autosave_session is not None:
+                self.autosaver.close(self.autosave_session)
+                self.autosave_session = None
+            self.frame_scheduler.cancel()
+            self.autosaver.stop()  # 남은 변경을 저장할 때까지 대기
+            if self.manifest is not None:
+                self.manifest.save()
+            self.frame_monitor.stop()
+            self.profiler.stop()
             self.root.destroy()
 
-    def adjust_opacity(self, event=None):
-        """Adjust the transparency of the image in real-time."""
-        if not self.original_image:
-            return
+    def toggle_metrics(self):
+        """Debug 메뉴: 핸들러 호출 횟수/지연 시간 기록 켜기/끄기."""
+        self.metrics.enabled = self.metrics_enabled.get()
+        self.update_frame_monitor()
 
-        # 슬라이더 값에 따른 투명도 조정
-        alpha = self.opacity_slider.get()
+    def reset_metrics(self):
+        self.metrics.reset()
+        self.frame_scheduler.reset_stats()
 
-        # 투명도 이미지 생성
-        alpha_channel = Image.new("L", self.original_image.size, alpha)
-        transparent_image = self.original_image.copy()
-        transparent_image.putalpha(alpha_channel)
+    def export_metrics(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON Files", "*.json")])
+        if not path:
+            return
+        try:
+            self.metrics.export(path, {"scheduler": self.frame_scheduler.stats.to_dict(),
+                                       "image_memory": self.image_memory_stats()})
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export timings: {e}")
+
+    def image_memory_stats(self):
+        """이미지 버퍼 사용량: 공유 캐시 통계와 캐시 밖에서 들고 있는 버퍼(byte)."""
+        stats = self.image_buffers.stats()
+        stats["source"] = self.source_image.nbytes if self.source_image else 0
+        stats["display"] = image_nbytes(self.image) if self.image else 0
+        stats["tiles"] = self.tile_layer.nbytes
+        stats["document_cache"] = self.document_cache.nbytes()
+        stats["open_documents"] = self.session.stats()
+        return stats
+
+    def show_image_memory(self):
+        """Debug 메뉴: 이미지 버퍼 사용량 표시."""
+        stats = self.image_memory_stats()
+        mb = lambda value: f"{value / 1024 ** 2:.1f} MB"
+        lines = [f"Buffer cache: {mb(stats['bytes'])} / {mb(stats['budget'])} "
+                 f"(peak {mb(stats['peak_bytes'])}, {stats['entries']} entries, {stats['pinned']} in use)"]
+        lines += [f"  {kind}: {usage['count']} x, {mb(usage['bytes'])}" for kind, usage in sorted(stats["kinds"].items())]
+        lines.append(f"Hits {stats['hits']}, misses {stats['misses']}, "
+                     f"evicted {stats['evictions']} ({mb(stats['evicted_bytes'])})")
+        lines.append(f"Source preview: {mb(stats['source'])}, canvas copy: {mb(stats['display'])}, "
+                     f"tiles: {mb(stats['tiles'])}")
+        lines.append(f"Prefetched documents: {mb(stats['document_cache'])}")
+        documents = stats["open_documents"]
+        lines.append(f"Open documents: {documents['documents']}, {mb(documents['bytes'])} / {mb(documents['max_bytes'])} "
+                     f"(closed {documents['evictions']})")
+        messagebox.showinfo("Image Memory", "\n".join(lines))
+
+    def toggle_profiler(self):
+        """Debug 메뉴: cProfile 세션 시작/중지. 중지하면 통계를 파일로 저장."""
+        if self.profiling_enabled.get():
+            self.profiler.start()
+            return
+        stats = self.profiler.stop()
+        if stats is None:
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".prof", filetypes=[("Profile Stats", "*.prof")])
+        if not path:
+            return
+        try:
+            SessionProfiler.export(stats, path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export profile: {e}")
 
-        # 캐시 업데이트
-        self._cached_transparent_image = transparent_image
+    def toggle_fps_overlay(self):
+        if not self.fps_overlay_enabled.get():
+            self.canvas.delete("fps_overlay")
+        self.update_frame_monitor()
 
-        # Tkinter용 이미지 갱신
-        img_width = int(transparent_image.width * self.scale_factor)
-        img_height = int(transparent_image.height * self.scale_factor)
+    def update_frame_monitor(self):
+        if self.metrics.enabled or self.fps_overlay_enabled.get():
+            self.frame_monitor.start()
+        else:
+            self.frame_monitor.stop()
 
-        resized_image = transparent_image.resize((img_width, img_height), Image.LANCZOS)
-        self._cached_resized_image = resized_image
-        self._cached_resized_image_size = (img_width, img_height)
-        self._cached_tk_image = ImageTk.PhotoImage(resized_image)
+    def update_fps_overlay(self, fps, frame_time, worst_frame_time):
+        """캔버스 왼쪽 위에 FPS와 최근 프레임 시간을 표시 (FrameMonitor가 매 프레임 호출)."""
+        if not self.fps_overlay_enabled.get():
+            return
+        stats = self.frame_scheduler.stats
+        text = (f"{fps:.0f} FPS  {frame_time * 1000:.1f} ms  (max {worst_frame_time * 1000:.0f} ms)  "
+                f"late {stats.late}  dropped {stats.dropped}")
+        if not self.canvas.find_withtag("fps_overlay"):
+            self.canvas.create_text(8, 8, anchor=tk.NW, text=text, fill="red", font=("Arial", 10, "bold"),
+                                    tags="fps_overlay")
+        else:
+            self.canvas.itemconfig("fps_overlay", text=text)
+        self.canvas.tag_raise("fps_overlay")
 
-        # 캔버스 업데이트
-        self.update_canvas()
+    @timed("adjust_opacity")
+    def adjust_opacity(self, value=None):
+        """Adjust the transparency of the image in real-time.
 
-        # 강제 업데이트
-        self.canvas.update_idletasks()
+        슬라이더 이벤트가 몰려도 한 프레임에 한 번만 반영한다.
+        """
+        self.frame_scheduler.mark_task("opacity", self.apply_opacity)
+
+    @timed("apply_opacity")
+    def apply_opacity(self):
+        if not self.image_pyramid:
+            return
+        # 현재 배율로 리샘플링된 타일은 그대로 두고 알파만 변경 (값이 같으면 아무것도 안 함)
+        self.tile_layer.set_alpha(self.opacity_slider.get())
 
     def is_point_near_line(self, point, line_start, line_end, tolerance=5):
         """점이 선에 가까운지 확인."""
@@ -690,43 +1771,30 @@ class ImageEditor:
         dist = ((px - closest_x) ** 2 + (py - closest_y) ** 2) ** 0.5
         return dist <= tolerance
 
-    def select_listbox_item(self, index):
-        """리스트박스에서 특정 항목을 선택."""
-        self.label_listbox.selection_clear(0, tk.END)  # 기존 선택 해제
-        self.label_listbox.selection_set(index)       # 새로운 항목 선택
-        self.label_listbox.activate(index)            # 포커스 설정
-        self.label_listbox.see(index)                 # 선택된 항목 보기
-        self.update_canvas()              
-
     def on_canvas_left_click(self, event):
         """캔버스에서 오른쪽 클릭으로 노드 또는 연결 선택."""
         clicked_x = (event.x - self.img_x) / self.scale_factor
         clicked_y = (event.y - self.img_y) / self.scale_factor
 
         # 노드 선택 여부 확인
-        for i, node in enumerate(self.nodes):
-            x1, y1, x2, y2 = node['coords']
-            if x1 <= clicked_x <= x2 and y1 <= clicked_y <= y2:
-                # 노드 선택
-                self.selected_node_index = i
-                self.selected_connection_index = None
-                self.select_listbox_item(i)  # 리스트박스와 동기화
-                return
+        node_index = self.get_node_at(event.x, event.y)
+        if node_index is not None:
+            # 노드 선택 (목록과 동기화)
+            self.set_selection(("node", self.nodes[node_index].id))
+            return
 
         # 연결 선택 여부 확인
-        for i, connection in enumerate(self.connections):
-            from_node = next((n for n in self.nodes if n['id'] == connection['from']), None)
-            to_node = next((n for n in self.nodes if n['id'] == connection['to']), None)
+        for connection in self.connections:
+            from_node = self.document.node_map.get(connection.from_id)
+            to_node = self.document.node_map.get(connection.to_id)
             if not from_node or not to_node:
                 continue
 
-            from_center = self.get_center(from_node['coords'])
-            to_center = self.get_center(to_node['coords'])
+            from_center = self.get_center(from_node.coords)
+            to_center = self.get_center(to_node.coords)
             if self.is_point_near_line((clicked_x, clicked_y), from_center, to_center):
-                # 연결 선택
-                self.selected_node_index = None
-                self.selected_connection_index = i
-                self.select_listbox_item(len(self.nodes) + i)  # 리스트박스와 동기화
+                # 연결 선택 (목록과 동기화)
+                self.set_selection(("connection", connection.id))
                 return
 
 
@@ -736,7 +1804,7 @@ class ImageEditor:
         clicked_node = self.get_node_at(event.x, event.y)
         if clicked_node is not None:
             self.selected_item_index = clicked_node
-            self.update_canvas()
+            self.refresh_node(clicked_node)
             self.dragging = True
             self.drag_data = {"x": event.x, "y": event.y}
 
@@ -746,42 +1814,42 @@ class ImageEditor:
             dx = event.x - self.drag_data["x"]
             dy = event.y - self.drag_data["y"]
             node = self.nodes[self.selected_item_index]
-            x1, y1, x2, y2 = node['coords']
-            new_coords = (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
-            node['coords'] = new_coords
+            x1, y1, x2, y2 = node.coords
+            self.document.set_node_coords(node, (x1 + dx, y1 + dy, x2 + dx, y2 + dy))
             self.drag_data["x"] = event.x
             self.drag_data["y"] = event.y
-            self.update_canvas()
+            self.refresh_node(self.selected_item_index)
 
     # 드래그 종료
     def end_node_drag(self, event):
         self.dragging = False
-        self.assign_parent_child_relationship()  # 관계 재설정 호출
-        self.update_canvas()
+        self.frame_scheduler.flush()
 
     def load_image(self):
-        self.image_path = filedialog.askopenfilename()
-        if self.image_path:
+        image_path = filedialog.askopenfilename()
+        if image_path:
+            # 새로운 이미지는 새 탭에서 빈 문서로 시작 (같은 이름의 JSON이 이미 열려 있으면 그 탭으로 전환)
+            base_name = os.path.splitext(os.path.basename(image_path))[0]
+            json_path = os.path.join(os.path.dirname(image_path), f"{base_name}.json")
+            if self.document_key(json_path) in self.session:
+                self.switch_tab(self.document_key(json_path))
+                return
+            if os.path.exists(json_path):
+                # 이미 어노테이션이 있으면 그 문서를 연다 (빈 문서로 자동 저장하면 기존 내용을 덮어씀)
+                self.load_json_file(json_path)
+                return
+            self.new_tab(self.document_key(json_path))
+            self.image_path = image_path
             self.file_name_label.config(text=f"File: {os.path.basename(self.image_path)}")  # 파일명 업데이트
-            # 새로운 이미지를 불러오면 기존 데이터 초기화
-            self.nodes.clear()
-            self.connections.clear()
-            self.label_listbox.delete(0, tk.END)
-            self.selected_item_index = None
-
-            # 이미지 불러오기
-            self.original_image = Image.open(self.image_path)
-
-            # PNG의 알파 채널을 올바르게 처리하기 위한 설정
-             # 알파 채널이 있는 경우 흰색 배경으로 변환
-            if self.original_image.mode in ("RGBA", "P"):
-                background = Image.new("RGBA", self.original_image.size, (255, 255, 255, 255))  # 흰색 배경
-                background.paste(self.original_image, mask=self.original_image.split()[3])  # 알파 채널 마스크 사용
-                self.original_image = background.convert("RGB")  # 최종적으로 RGB로 변환
-            else:
-                self.original_image = self.original_image.convert("RGB")
+            self.document = AnnotationDocument()
+            self.start_autosave(json_path, os.path.basename(self.image_path), AnnotationDocument())
+            self.update_label_listbox()
+
+            # 이미지 불러오기 (JSON과 함께 열 때와 같은 경로: 표시용 해상도 디코딩, 알파는 흰 배경에 합성)
+            self.source_image = SourceImage(self.image_path)
 
             self.update_image()
+            self.evict_tabs()
     
     def toggle_fullscreen(self):
         """전체 화면 모드로 전환하거나 원래 창 크기로 복원합니다."""
@@ -798,13 +1866,13 @@ class ImageEditor:
 
 
     def update_image(self):
-        if self.original_image:
+        if self.source_image:
             canvas_width = self.canvas.winfo_width()
             canvas_height = self.canvas.winfo_height()
 
             if self.keep_aspect_ratio.get():
                 # 이미지 비율을 유지하면서 캔버스 크기에 맞게 리사이징
-                img_width, img_height = self.original_image.size
+                img_width, img_height = self.source_image.size
                 scale = min(canvas_width / img_width, canvas_height / img_height)
                 new_width = int(img_width * scale)
                 new_height = int(img_height * scale)
@@ -812,104 +1880,140 @@ class ImageEditor:
                 # 이미지 비율을 무시하고 창 크기에 맞춤
                 new_width, new_height = canvas_width, canvas_height
 
-            # 이미지를 새 크기로 리사이즈
-            resized_image = self.original_image.resize((new_width, new_height), Image.LANCZOS)
+            # 이미지를 새 크기로 리사이즈 (원본 해상도가 아니라 표시용 이미지에서)
+            self.image = self.source_image.display_image((max(1, new_width), max(1, new_height)))
 
-            self.image = resized_image
-            self.tk_image = ImageTk.PhotoImage(self.image)
+            # 표시용 이미지로 이미지 피라미드 생성 (나머지 레벨은 백그라운드에서 생성)
+            if self.image_pyramid:
+                self.image_pyramid.cancel()
+            self.image_pyramid = ImagePyramid(self.source_image, self.image_executor, self.image_buffers)
+            self.watch_image_pyramid()
 
-            self.canvas.delete("all")
-            self.update_canvas()
+            self.frame_scheduler.mark_view()
 
             self.draw = ImageDraw.Draw(self.image)
             self.adjust_opacity()
             
 
+    def poll_image_pyramid(self):
+        """백그라운드에서 만든 피라미드 레벨이 준비되면 캔버스에 반영."""
+        self.pyramid_timer = None
+        pyramid = self.image_pyramid
+        if pyramid is None:
+            return
+        if pyramid.poll():
+            self.frame_scheduler.mark_view()
+        self.watch_image_pyramid()
+
+    def watch_image_pyramid(self):
+        """피라미드에 만드는 중인 레벨이 있으면 완료 확인 타이머를 건다 (이미 걸려 있으면 그대로)."""
+        if self.pyramid_timer is None and self.image_pyramid is not None and self.image_pyramid.pending:
+            self.pyramid_timer = self.root.after(100, self.poll_image_pyramid)
+
     def on_resize(self, event):
-        # 캔버스 크기가 변경된 경우에만 업데이트
+        # 캔버스 크기가 변경된 경우에만 업데이트 (새로 보이는 타일 생성)
         if event.width != self.canvas_width or event.height != self.canvas_height:
             self.canvas_width = event.width
             self.canvas_height = event.height
-            self.update_canvas()
+            self.frame_scheduler.mark_view()
+
+    @timed("render_frame")
+    def render_frame(self, update):
+        """FrameScheduler 콜백: 한 프레임 동안 표시된 변경(FrameUpdate)을 한 번에 캔버스와 목록에 반영."""
+        for task in update.tasks.values():
+            task()
+        if update.view and self.update_view():
+            update.full = True  # 배율이 바뀌면 모든 아이템 좌표를 다시 계산
+        if update.full:
+            self.sync_all_items()
+        else:
+            connections = {}
+            for node_id in update.nodes:
+                index = self.document.node_index(node_id)
+                if index is not None:
+                    self.sync_node_item(index)
+                    connections.update((connection.id, connection)
+                                       for connection in self.document.incident_connections(node_id))
+            for connection_id in update.connections:
+                connection = self.document.connection_map.get(connection_id)
+                if connection is not None:
+                    connections[connection_id] = connection
+            for connection in connections.values():
+                self.sync_connection_item(connection)
+        self.scene.finish()
+        if update.rows:
+            self.update_label_listbox()
 
+    @timed("update_canvas")
     def update_canvas(self):
-        """Update the canvas with the current image, nodes, and connections."""
-        self.assign_parent_child_relationship()
-        self.canvas.delete("all")
-
-        # 이미지 그리기
-        if self._cached_transparent_image:
-            img_width = int(self._cached_transparent_image.width * self.scale_factor)
-            img_height = int(self._cached_transparent_image.height * self.scale_factor)
-
-            # 이미지 캐싱 및 리샘플링
-            if not hasattr(self, "_cached_resized_image") or self._cached_resized_image_size != (img_width, img_height):
-                resized_image = self._cached_transparent_image.resize((img_width, img_height), Image.LANCZOS)
-                self._cached_resized_image = resized_image
-                self._cached_resized_image_size = (img_width, img_height)
-                self._cached_tk_image = ImageTk.PhotoImage(resized_image)
-
-            # 캔버스에 이미지 그리기
-            self.canvas.create_image(self.img_x, self.img_y, anchor=tk.NW, image=self._cached_tk_image)
-
-        # 노드 및 연결 그리기
-        for i, node_info in enumerate(self.nodes):
-            x1, y1, x2, y2 = node_info['coords']
-            scaled_coords = (
-                self.img_x + x1 * self.scale_factor,
-                self.img_y + y1 * self.scale_factor,
-                self.img_x + x2 * self.scale_factor,
-                self.img_y + y2 * self.scale_factor
+        """Update the canvas with the current image, nodes, and connections (스케줄러를 거치지 않고 바로 전체 갱신)."""
+        self.update_view()
+        self.sync_all_items()
+        self.scene.finish()
+
+    def update_view(self):
+        """뷰 변환과 보이는 이미지 타일을 반영. 배율이 바뀌어 아이템 좌표를 다시 계산해야 하면 True."""
+        view_version = self.scene.view_version
+        self.scene.set_view(self.img_x, self.img_y, self.scale_factor)
+
+        # 이미지 그리기 (뷰포트에 보이는 타일만)
+        if self.image_pyramid:
+            self.tile_layer.update(
+                self.image_pyramid,
+                self.scale_factor,
+                (self.img_x, self.img_y),
+                (self.canvas.winfo_width(), self.canvas.winfo_height()),
+                self.opacity_slider.get()
             )
-            outline_color = "yellow" if i == self.selected_node_index else "red"
-            width = 4 if i == self.selected_node_index else 3
-            self.canvas.create_rectangle(scaled_coords, outline=outline_color, width=width)
-            self.canvas.create_text(
-                (scaled_coords[0] + scaled_coords[2]) / 2,
-                (scaled_coords[1] + scaled_coords[3]) / 2,
-                text=node_info["text"],
-                font=("Arial", self.font_size)
-            )
-
-        # 연결 그리기
-        for i, connection in enumerate(self.connections):
-            from_node = next((node for node in self.nodes if node['id'] == connection['from']), None)
-            to_node = next((node for node in self.nodes if node['id'] == connection['to']), None)
-            if not from_node or not to_node:
-                continue
+            self.watch_image_pyramid()  # 확대로 원본 해상도 디코딩이 시작되었을 수 있음
+        else:
+            self.tile_layer.clear()
+        return self.scene.view_version != view_version
 
-            from_center = self.get_center(from_node['coords'])
-            to_center = self.get_center(to_node['coords'])
-            scaled_from_center = (
-                self.img_x + from_center[0] * self.scale_factor,
-                self.img_y + from_center[1] * self.scale_factor
-            )
-            scaled_to_center = (
-                self.img_x + to_center[0] * self.scale_factor,
-                self.img_y + to_center[1] * self.scale_factor
-            )
+    def sync_all_items(self):
+        """모든 노드/연결 아이템을 동기화하고 사라진 항목의 아이템 삭제."""
+        # 노드 그리기 (바뀐 아이템만 갱신)
+        for i in range(len(self.nodes)):
+            self.sync_node_item(i)
 
-            line_dash = (6, 2) if connection['type'] == "dashed" else (2, 1) if connection['type'] == "dotted" else ()
-            is_selected = i == self.selected_connection_index
-            line_color = connection['color']
-            width = 4 if is_selected else 2
-            line_color = "yellow" if is_selected else line_color
-            arrow_option = tk.LAST if connection.get('direction', True) else None
-
-            self.canvas.create_line(
-                scaled_from_center,
-                scaled_to_center,
-                arrow=arrow_option,
-                fill=line_color,
-                width=width,
-                dash=line_dash if line_dash else None
-            )
+        # 연결 그리기
+        for connection in self.connections:
+            self.sync_connection_item(connection)
+
+        self.scene.prune({node.id for node in self.nodes}, {conn.id for conn in self.connections})
+
+    def sync_node_item(self, index):
+        """index 위치 노드의 캔버스 아이템을 현재 상태와 동기화."""
+        node_info = self.nodes[index]
+        self.scene.sync_node(node_info.id, node_info.coords, node_info.text,
+                             node_info.id == self.selected_node_id, ("Arial", self.font_size))
+
+    def sync_connection_item(self, connection):
+        """연결의 캔버스 아이템을 현재 상태와 동기화."""
+        from_node = self.document.node_map.get(connection.from_id)
+        to_node = self.document.node_map.get(connection.to_id)
+        if not from_node or not to_node:
+            self.scene.remove_connection(connection.id)
+            return
 
-            if connection['text']:
-                mid_x = (scaled_from_center[0] + scaled_to_center[0]) / 2
-                mid_y = (scaled_from_center[1] + scaled_to_center[1]) / 2
-                self.canvas.create_text(mid_x, mid_y, text=connection['text'], fill="blue", font=("Arial", self.font_size))
+        line_dash = (6, 2) if connection.type == "dashed" else (2, 1) if connection.type == "dotted" else ""
+        is_selected = connection.id == self.selected_connection_id
+        line_color = "yellow" if is_selected else connection.color
+        width = 4 if is_selected else 2
+        arrow_option = tk.LAST if connection.direction else tk.NONE
+
+        self.scene.sync_connection(
+            connection.id,
+            self.get_center(from_node.coords),
+            self.get_center(to_node.coords),
+            connection.text,
+            (line_color, width, line_dash, arrow_option),
+            ("Arial", self.font_size)
+        )
 
+    def refresh_node(self, index):
+        """노드 하나와 그 노드에 연결된 선만 다음 프레임에 다시 그림 (드래그/크기 조절용)."""
+        self.frame_scheduler.mark_nodes([self.nodes[index].id])
 
 
 
@@ -923,61 +2027,125 @@ class ImageEditor:
             self.image.save(save_path)
 
     
+    @timed("save_nodes_as_json")
     def save_nodes_as_json(self, event=None):
-        if self.image_path:
-            # 이미지 파일명에서 확장자를 제거한 기본 이름 가져오기
-            base_name = os.path.splitext(os.path.basename(self.image_path))[0]
-            json_path = os.path.join(os.path.dirname(self.image_path), f"{base_name}.json")
+        """바로 저장 요청 (Ctrl+S). 저장은 자동 저장 스레드에서 하고 결과는 상태 라벨에 표시."""
+        if self.autosave_session is None:
+            messagebox.showwarning("Save Error", "먼저 이미지를 불러오세요.")
+            return
+        self.autosaver.save(self.autosave_session)
+        self.save_status_label.config(text="Saving...", fg="gray")
 
-            # 기존 JSON 파일에서 summary 값 읽어오기
-            existing_summary = None
-            if os.path.exists(json_path):
-                try:
-                    with open(json_path, 'r', encoding='utf-8') as file:
-                        data = json.load(file)
-                        existing_summary = data.get("summary")
-                except Exception as e:
-                    messagebox.showwarning("Error", f"Failed to load existing summary: {e}")
-
-            # 중첩된 노드 구조 생성
-            def build_hierarchy(nodes):
-                node_dict = {node['id']: node for node in nodes}
-                for node in nodes:
-                    node["node"] = []
-                for node in nodes:
-                    if node["parent_id"]:
-                        parent_node = node_dict.get(node["parent_id"])
-                        if parent_node:
-                            parent_node["node"].append(node)
-                return [node for node in nodes if node["parent_id"] is None]
-
-            nested_nodes = build_hierarchy(self.nodes)
-
-            # JSON 데이터 생성
-            data = {
-                "file_name": os.path.basename(self.image_path),  # 현재 이미지 파일명
-                "node_count": len(self.nodes),                  # node 개수
-                "connection_count": len(self.connections),      # connection 개수
-                "components": nested_nodes,
-                "connections": self.connections                 # color is automatically included in connections
-            }
-
-            # 기존 summary 값을 먼저 추가
-            if existing_summary is not None:
-                ordered_data = {"summary": existing_summary}
-                ordered_data.update(data)  # 나머지 데이터를 추가
-            else:
-                ordered_data = data
+    def undo(self, event=None):
+        self.apply_history(self.history.undo)
 
-            # JSON 데이터 저장
-            try:
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(ordered_data, f, ensure_ascii=False, indent=4)
-                messagebox.showinfo("Save JSON", f"JSON 파일이 다음 경로에 저장되었습니다: {json_path}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save JSON file: {e}")
+    def redo(self, event=None):
+        self.apply_history(self.history.redo)
+
+    def apply_history(self, action):
+        """되돌리기/다시 실행 후 실제로 적용된 연산에 해당하는 아이템만 다시 그림."""
+        applied = []
+        collect = lambda op, inverse: applied.append(op)
+        self.document.observers.append(collect)
+        try:
+            action()
+        finally:
+            self.document.observers.remove(collect)
+        if applied:
+            self.show_applied_ops(applied)
+
+    def show_applied_ops(self, ops):
+        """되돌리기나 동기화로 문서에 적용된 연산을 화면에 반영."""
+        self.selected_item_index = None
+        self.redraw_ops(ops)
+        # 선택은 id로 유지하므로 사라진 항목만 선택 해제
+        if (self.selected_node_id is not None and self.selected_node_id not in self.document.node_map) or \
+                (self.selected_connection_id is not None and self.selected_connection_id not in self.document.connection_map):
+            self.set_selection(None)
+
+    def redraw_ops(self, ops):
+        """편집 연산 리스트가 바꾼 노드/연결만 캔버스에 반영. 리스트박스는 항목이 바뀐 경우에만 갱신."""
+        nodes = set()
+        connections = set()
+        full_redraw = False
+        listbox_changed = False
+        for op in ops:
+            kind = op["op"]
+            if kind in ("scale_nodes", "set_coords"):
+                full_redraw = True
+            elif kind == "set_node_coords":
+                nodes.add(op["id"])
+            elif kind in ("add_node", "set_node_text"):
+                nodes.add(op["node"]["id"] if kind == "add_node" else op["id"])
+                listbox_changed = True
+            elif kind == "remove_node":
+                self.scene.remove_node(op["id"])
+                for connection_id in op["connections"]:
+                    self.scene.remove_connection(connection_id)
+                listbox_changed = True
+            elif kind in ("add_connection", "update_connection"):
+                connections.add(op["connection"]["id"] if kind == "add_connection" else op["id"])
+                listbox_changed = True
+            elif kind == "remove_connection":
+                self.scene.remove_connection(op["id"])
+                listbox_changed = True
+
+        if full_redraw:
+            self.frame_scheduler.mark_all()
         else:
-            messagebox.showwarning("Save Error", "먼저 이미지를 불러오세요.")
+            self.frame_scheduler.mark_nodes(nodes)
+            self.frame_scheduler.mark_connections(connections)
+        if listbox_changed:
+            self.frame_scheduler.mark_rows()
+
+    def start_autosave(self, json_path, file_name, base_document, recover=True):
+        """self.document의 자동 저장 세션 시작. 이전 세션은 남은 변경을 저장하고 닫는다.
+
+        base_document는 self.document와 같은 내용의 변경되지 않는 문서. recover가 True이면 비정상 종료로
+        저장소에 반영되지 않은 저널 연산을 self.document에 다시 적용한다.
+        """
+        if self.autosave_session is not None:
+            self.autosaver.close(self.autosave_session)
+            self.autosave_session = None
+
+        store = store_for(os.path.dirname(os.path.abspath(json_path)))
+        recovered_ops = read_journal(json_path, store) if recover else []
+        try:
+            for op in recovered_ops:
+                self.document.apply_op(op)
+        except Exception as e:
+            self.document = base_document.copy()
+            recovered_ops = []
+            self.save_status_label.config(text=f"Journal recovery failed: {e}", fg="red")
+        else:
+            if recovered_ops:
+                self.save_status_label.config(text=f"Recovered {len(recovered_ops)} unsaved edits", fg="blue")
+            else:
+                self.save_status_label.config(text="")
+
+        self.autosave_session = self.autosaver.open(json_path, file_name, base_document, recovered_ops, store)
+        self.document.observers.append(self.autosave_session.record)
+        self.history.attach(self.document)
+        if self.sync_client is not None:
+            self.sync_client.join(json_path, self.document)
+
+    def poll_autosave(self):
+        """자동 저장 스레드의 결과를 UI에 반영 (캐시/매니페스트 갱신, 상태 표시)."""
+        for kind, json_path, detail in self.autosaver.poll():
+            if kind == "saved":
+                self.document_cache.invalidate(json_path)
+                if self.manifest is not None and self.manifest.directory == os.path.dirname(os.path.abspath(json_path)):
+                    self.manifest.update_entry(os.path.basename(json_path))
+                if self.search_index is not None and self.search_index.directory == os.path.dirname(os.path.abspath(json_path)):
+                    try:
+                        self.search_index.update_file(os.path.basename(json_path))
+                    except sqlite3.Error:
+                        pass  # 색인은 다음 검색 창을 열 때 refresh로 다시 맞춰짐
+                if self.autosave_session is not None and json_path == self.autosave_session.json_path:
+                    self.save_status_label.config(text=f"Saved {time.strftime('%H:%M:%S')}", fg="gray")
+            else:
+                self.save_status_label.config(text=f"Autosave failed: {detail}", fg="red")
+        self.root.after(500, self.poll_autosave)
 
 
 
@@ -987,77 +2155,62 @@ class ImageEditor:
 
 
     def delete_selected(self):
-        selected_index = self.label_listbox.curselection()
-        if not selected_index:
-            messagebox.showinfo("Info", "삭제할 항목을 선택하세요.")
-            return
-
-        selected_index = selected_index[0]
-        item_text = self.label_listbox.get(selected_index)
-
-        # 선택한 항목이 노드인지 연결인지 확인
-        if item_text.startswith("Node("):
-            # 노드를 삭제
-            node_index = selected_index
-            if node_index < len(self.nodes):  # 인덱스가 범위 내에 있는지 확인
-                node_id = self.nodes[node_index]["id"]
-                
-                # 관련된 모든 연결 삭제
-                self.connections = [conn for conn in self.connections if conn['from'] != node_id and conn['to'] != node_id]
-                self.nodes.pop(node_index)
-                self.label_listbox.delete(0, tk.END)
-
-            else:
+        if self.selected_node_id is not None:
+            # 노드와 관련된 모든 연결 삭제
+            index = self.document.node_index(self.selected_node_id)
+            if index is None:
                 messagebox.showerror("Error", "선택한 노드를 삭제할 수 없습니다.")
-        elif item_text.startswith("Connection("):
-            # 연결을 삭제
-            connection_index = selected_index - len(self.nodes)
-            if 0 <= connection_index < len(self.connections):  # 인덱스가 범위 내에 있는지 확인
-                self.connections.pop(connection_index)
-                self.label_listbox.delete(0, tk.END)
-
-            else:
+                return
+            self.remove_node_at(index)
+        elif self.selected_connection_id is not None:
+            index = self.document.connection_index(self.selected_connection_id)
+            if index is None:
                 messagebox.showerror("Error", "선택한 연결을 삭제할 수 없습니다.")
+                return
+            connection = self.document.remove_connection_at(index)
+            self.scene.remove_connection(connection.id)
+        else:
+            messagebox.showinfo("Info", "삭제할 항목을 선택하세요.")
+            return
 
+        # 삭제된 항목의 캔버스 아이템은 이미 제거됨. 선택만 초기화
+        self.set_selection(None, redraw=False)
         self.update_label_listbox()
-        self.update_canvas()
-
 
+    def remove_node_at(self, index):
+        """노드와 연결된 선들을 문서와 캔버스에서 제거."""
+        node, removed_connections = self.document.remove_node_at(index)
+        self.scene.remove_node(node.id)
+        for connection in removed_connections:
+            self.scene.remove_connection(connection.id)
 
-    def edit_selected(self):
-        selected_index = self.label_listbox.curselection()
-        if not selected_index:
-            messagebox.showinfo("Info", "수정할 항목을 선택하세요.")
-            return
 
-        selected_index = selected_index[0]
-        item_text = self.label_listbox.get(selected_index)
 
-        if item_text.startswith("Node("):
+    def edit_selected(self):
+        if self.selected_node_id is not None:
             # 노드 텍스트 수정
-            node_index = selected_index
-            new_text = self.prompt_multiline_text("Edit Node Text", initial_text=self.nodes[node_index]['text'])
+            index = self.document.node_index(self.selected_node_id)
+            if index is None:
+                return
+            node = self.nodes[index]
+            new_text = self.prompt_multiline_text("Edit Node Text", initial_text=node.text)
             if new_text:
-                self.nodes[node_index]['text'] = new_text
-                self.label_listbox.delete(selected_index)
-                self.label_listbox.insert(selected_index, f"Node({self.nodes[node_index]['id']}): {new_text}")
+                self.document.set_node_text(node, new_text)
+                self.frame_scheduler.mark_nodes([node.id])
+                self.annotation_list.update_row(("node", node.id))
 
-        elif item_text.startswith("Connection("):
+        elif self.selected_connection_id is not None:
             # 연결 텍스트 수정
-            connection_index = selected_index - len(self.nodes)
-            current_text = self.connections[connection_index]['text'] or ""
-            new_text = self.prompt_multiline_text("Edit Connection Text", initial_text=current_text)
+            connection = self.selected_connection()
+            if connection is None:
+                return
+            new_text = self.prompt_multiline_text("Edit Connection Text", initial_text=connection.text or "")
             if new_text:
-                self.connections[connection_index]['text'] = new_text
-                from_id = self.connections[connection_index]['from']
-                to_id = self.connections[connection_index]['to']
-                direction_icon = "→" if self.connections[connection_index]['direction'] else "-"
-                connection_type = self.connections[connection_index]['type']
-                display_text = f"Connection({self.connections[connection_index]['id']}): {from_id} {direction_icon} {to_id} ({new_text}) [Type: {connection_type}]"
-                self.label_listbox.delete(selected_index)
-                self.label_listbox.insert(selected_index, display_text)
+                self.document.update_connection(connection, text=new_text)
+                self.refresh_connection(connection)
 
-        self.update_canvas()
+        else:
+            messagebox.showinfo("Info", "수정할 항목을 선택하세요.")
 
 
 
@@ -1065,18 +2218,14 @@ class ImageEditor:
         # 실제 클릭 좌표를 원본 이미지 좌표계로 변환
         original_x = (x - self.img_x) / self.scale_factor
         original_y = (y - self.img_y) / self.scale_factor
-        
-        for i, node_info in enumerate(self.nodes):
-            x1, y1, x2, y2 = node_info['coords']
-            # 원본 좌표계에서 클릭한 위치가 노드 안에 있는지 확인
-            if x1 <= original_x <= x2 and y1 <= original_y <= y2:
-                return i
-        return None
+
+        # 공간 인덱스에서 클릭 위치를 포함하는 가장 안쪽 노드 검색
+        return self.document.node_at(original_x, original_y)
 
 
     def highlight_node(self, node_index):
         node_info = self.nodes[node_index]
-        x1, y1, x2, y2 = node_info['coords']
+        x1, y1, x2, y2 = node_info.coords
         
         # 확대/축소 및 이미지 위치를 반영한 좌표로 변환
         scaled_coords = (
@@ -1105,25 +2254,11 @@ class ImageEditor:
         self.type_menu.pack()
 
     def update_type(self, _=None):  # 선택한 옵션을 반영하도록 기본값 매개변수 사용
-        selected_index = self.label_listbox.curselection()
-        if selected_index:
-            selected_index = selected_index[0] - len(self.nodes)  # 관계 인덱스 조정
-            if 0 <= selected_index < len(self.connections):
-                # 선택된 옵션 메뉴에서 현재 타입을 가져옴
-                selected_type = self.selected_type.get()
-                
-                # 연결의 type을 업데이트
-                self.connections[selected_index]["type"] = selected_type
-                
-                # 리스트박스 업데이트
-                self.label_listbox.delete(selected_index + len(self.nodes))
-                from_id = self.connections[selected_index]['from']
-                to_id = self.connections[selected_index]['to']
-                text = self.connections[selected_index]['text'] or ""
-                self.label_listbox.insert(selected_index + len(self.nodes), f"Connection: {from_id} → {to_id} ({text}) [Type: {selected_type}]")
-                
-                # 업데이트 후 화면 다시 그리기
-                self.update_canvas()
+        connection = self.selected_connection()
+        if connection is not None:
+            # 선택된 옵션 메뉴의 타입으로 연결의 type을 업데이트
+            self.document.update_connection(connection, type=self.selected_type.get())
+            self.refresh_connection(connection)
 
 
     # prompt_multiline_text 메서드에서 MultiLineInputDialog를 호출
@@ -1139,11 +2274,10 @@ class ImageEditor:
             
             # 텍스트가 없을 경우 None으로 설정하고, 그렇지 않으면 JSON-friendly 형식으로 변환
             connection_text_json = connection_text.replace("\n", "\\n") if connection_text else None
-            connection_text_display = connection_text if connection_text else ""
 
             # from_node와 to_node의 id를 가져와서 저장
-            from_node_id = self.nodes[self.selected_nodes[0]]['id']
-            to_node_id = self.nodes[self.selected_nodes[1]]['id']
+            from_node_id = self.nodes[self.selected_nodes[0]].id
+            to_node_id = self.nodes[self.selected_nodes[1]].id
 
             # Set color based on user selection
             color_name = self.selected_color.get()
@@ -1151,26 +2285,24 @@ class ImageEditor:
 
             # 관계 정보 저장 (기본 type은 'line')
             connection_type = self.selected_type.get()  # 현재 선택된 타입
-            connection_id = str(uuid.uuid4())[:3]  # 고유 id 추가
-            self.connections.append({
-                'id': connection_id,
-                'from': from_node_id,
-                'to': to_node_id,
-                'text': connection_text_json,  # JSON 저장 시 줄바꿈을 '\n'으로 처리된 텍스트 사용
-                'type': connection_type,  # 선택된 type 설정
-                'direction': True,  # 기본 값 True로 설정
-                'color': connection_color  # Add color attribute
-            })
-
-            # 리스트박스에 표시할 텍스트 설정 (화면에는 줄바꿈 그대로 표시)
-            display_text = f"Connection({connection_id}): {from_node_id} → {to_node_id} ({connection_text_display}) [Type: {connection_type}] [Color: {color_name}]"
-            self.label_listbox.insert(tk.END, display_text)
+            # 고유 id 추가 (캔버스 아이템이 id로 관리되므로 기존 id와 겹치지 않게 생성)
+            connection_id = self.document.new_connection_id()
+            connection = Connection(
+                connection_id,
+                from_node_id,
+                to_node_id,
+                text=connection_text_json,  # JSON 저장 시 줄바꿈을 '\n'으로 처리된 텍스트 사용
+                type=connection_type,  # 선택된 type 설정
+                direction=True,  # 기본 값 True로 설정
+                color=connection_color
+            )
+            self.document.add_connection(connection)
+            self.frame_scheduler.mark_connections([connection.id])
             self.update_label_listbox()
 
-        # 선택 해제 및 업데이트
+        # 선택 해제
         self.selected_nodes = []
         self.canvas.delete("highlight")
-        self.update_canvas()
 
 
 
@@ -1199,10 +2331,11 @@ class ImageEditor:
             # 기존 노드 위에서 클릭한 경우 - 노드 크기 조절
             if clicked_node is not None:
                 node = self.nodes[clicked_node]
-                x1, y1, x2, y2 = node['coords']
+                x1, y1, x2, y2 = node.coords
                 if abs(event.x - x2 * self.scale_factor - self.img_x) < 10 and abs(event.y - y2 * self.scale_factor - self.img_y) < 10:
                     self.resizing = True
                     self.selected_item_index = clicked_node
+                    self.history.begin("resize")
                 else:
                     self.dragging = True  # 드래그 상태 활성화
             
@@ -1215,37 +2348,50 @@ class ImageEditor:
         if self.resizing and self.selected_item_index is not None:
             # 노드 크기 조절
             node = self.nodes[self.selected_item_index]
-            x1, y1, _, _ = node['coords']
-            node['coords'] = (x1, y1, (event.x - self.img_x) / self.scale_factor, (event.y - self.img_y) / self.scale_factor)
+            x1, y1, _, _ = node.coords
+            self.document.set_node_coords(
+                node, (x1, y1, (event.x - self.img_x) / self.scale_factor, (event.y - self.img_y) / self.scale_factor))
             
-            self.update_canvas()
+            self.refresh_node(self.selected_item_index)
         elif self.mode_var.get() == "draw" and self.dragging:
-            # 임시 사각형으로 노드 그리기 미리보기
-            self.canvas.delete("temp_shape")
-            self.canvas.create_rectangle(
-                self.start_x, self.start_y, event.x, event.y,
-                outline="red", tags="temp_shape"
-            )
+            # 임시 사각형으로 노드 그리기 미리보기 (프레임마다 마지막 위치만 그림)
+            self.preview_end = (event.x, event.y)
+            self.frame_scheduler.mark_task("draw_preview", self.draw_preview)
+
+    def draw_preview(self):
+        if self.start_x is None:
+            return  # 프레임 전에 버튼을 놓음
+        self.canvas.delete("temp_shape")
+        self.canvas.create_rectangle(
+            self.start_x, self.start_y, *self.preview_end,
+            outline="red", tags="temp_shape"
+        )
             
 
 
+    @timed("on_motion")
     def on_motion(self, event):
-        original_x = event.x
-        original_y = event.y
+        # 이동 이벤트가 몰려도 hover 히트 테스트는 프레임마다 마지막 위치로 한 번만
+        self.pointer = (event.x, event.y)
+        self.frame_scheduler.mark_task("hover", self.update_hover)
+
+    def update_hover(self):
+        if self.dragging or self.dragging_canvas or self.resizing:
+            return  # 드래그 중에는 드래그 시작 시 정한 노드를 유지
 
         # 변환된 좌표를 사용하여 마우스 위치에 있는 노드 찾기
-        hovered_node_index = self.get_node_at(original_x, original_y)
+        hovered_node_index = self.get_node_at(*self.pointer)
 
-        # 현재 하이라이트된 노드와 다르면 업데이트
+        # hover 상태는 화면에 그려지지 않으므로 인덱스만 갱신 (다시 그릴 필요 없음)
         if self.selected_item_index is None or hovered_node_index != self.selected_item_index:
             self.selected_item_index = hovered_node_index
-            self.update_canvas()  # 하이라이트 업데이트를 위해 캔버스 다시 그림
 
 
      # Update where text input is required
     def on_release(self, event):
         if self.resizing:
             self.resizing = False
+            self.history.end()
         elif self.mode_var.get() == "draw" and self.dragging:
             if abs(event.x - self.start_x) > 5 and abs(event.y - self.start_y) > 5:
                 self.canvas.delete("temp_shape")
@@ -1259,22 +2405,12 @@ class ImageEditor:
                 # 텍스트 입력 대화상자 열기
                 text = self.prompt_multiline_text("Enter Text for Node")
                 if text:
-                    node_id = str(uuid.uuid4())[:3]
-                    node_info = {
-                        "id": node_id,
-                        "coords": (original_x1, original_y1, original_x2, original_y2),
-                        "text": text,
-                        "parent_id": None
-                    }
-                    self.nodes.append(node_info)
-                    self.label_listbox.insert(tk.END, f"Node({node_id}): {text}")
-
-                    # Listbox와 노드 상태 일관성 유지
-                    self.label_listbox.selection_clear(0, tk.END)
-                    self.label_listbox.selection_set(tk.END)
-                    self.selected_item_index = len(self.nodes) - 1
+                    node_id = self.document.new_node_id()
+                    self.document.add_node(Node(node_id, (original_x1, original_y1, original_x2, original_y2), text))
+
+                    # 새 노드를 목록과 캔버스에서 선택
                     self.update_label_listbox()
-                    self.update_canvas()
+                    self.set_selection(("node", node_id))
 
         
         self.dragging = False
@@ -1288,7 +2424,7 @@ class ImageEditor:
         """지정된 좌표 범위 내에 있는 노드들을 찾습니다."""
         enclosed_nodes = []
         for node in self.nodes:
-            nx1, ny1, nx2, ny2 = node["coords"]
+            nx1, ny1, nx2, ny2 = node.coords
             if x1 <= nx1 <= x2 and y1 <= ny1 <= y2 and x1 <= nx2 <= x2 and y1 <= ny2 <= y2:
                 enclosed_nodes.append(node)
         return enclosed_nodes
@@ -1298,12 +2434,7 @@ class ImageEditor:
         if not self.current_json_path:
             messagebox.showinfo("Info", "No JSON file is currently loaded.")
             return
-        directory = os.path.dirname(self.current_json_path)
-        all_files = sorted([f for f in os.listdir(directory) if f.endswith('.json')])
-        current_index = all_files.index(os.path.basename(self.current_json_path))
-        next_index = (current_index + 1) % len(all_files)
-        next_json_path = os.path.join(directory, all_files[next_index])
-        self.current_json_path = next_json_path
+        _, next_json_path = self.json_neighbours(self.current_json_path)
         self.load_json_file(next_json_path)
 
     def load_previous_json(self):
@@ -1311,14 +2442,252 @@ class ImageEditor:
         if not self.current_json_path:
             messagebox.showinfo("Info", "No JSON file is currently loaded.")
             return
-        directory = os.path.dirname(self.current_json_path)
-        all_files = sorted([f for f in os.listdir(directory) if f.endswith('.json')])
-        current_index = all_files.index(os.path.basename(self.current_json_path))
-        prev_index = (current_index - 1) % len(all_files)
-        prev_json_path = os.path.join(directory, all_files[prev_index])
-        self.current_json_path = prev_json_path
+        prev_json_path, _ = self.json_neighbours(self.current_json_path)
         self.load_json_file(prev_json_path)
 
+    def load_next_unannotated_json(self):
+        """현재 파일 다음에 있는 첫 번째 미완료(노드가 없는) JSON 파일을 로드"""
+        if not self.current_json_path:
+            messagebox.showinfo("Info", "No JSON file is currently loaded.")
+            return
+        manifest = self.dataset_manifest(self.current_json_path)
+        name = manifest.next_unannotated(os.path.basename(self.current_json_path))
+        if name is None:
+            messagebox.showinfo("Info", "All JSON files in this folder are annotated.")
+            return
+        self.load_json_file(os.path.join(manifest.directory, name))
+
+    def rescan_dataset(self):
+        """현재 폴더의 매니페스트를 강제로 다시 스캔 (외부에서 파일을 수정한 경우)."""
+        if self.current_json_path:
+            self.dataset_manifest(self.current_json_path).refresh(force=True)
+
+    def show_dataset_statistics(self):
+        """File 메뉴: 현재 폴더의 문서/노드/연결 수 (SQLite 저장소는 쿼리 한 번, JSON은 사이드카 헤더로 계산)."""
+        if not self.current_json_path:
+            messagebox.showwarning("Dataset Statistics", "먼저 JSON 파일을 불러오세요.")
+            return
+        store = store_for(os.path.dirname(os.path.abspath(self.current_json_path)))
+        try:
+            stats = store.statistics()
+        except (OSError, sqlite3.Error) as e:
+            messagebox.showerror("Error", f"Failed to read dataset statistics: {e}")
+            return
+        connections = stats["connections"] if stats["connections"] is not None else "unknown"
+        lines = [f"Storage: {STORE_NAME if store.incremental else 'JSON files'}",
+                 f"Documents: {stats['documents']} ({stats['annotated_documents']} annotated)",
+                 f"Nodes: {stats['nodes']}",
+                 f"Connections: {connections}"]
+        if stats.get("updated_at"):
+            lines.append(f"Last saved: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stats['updated_at']))}")
+        messagebox.showinfo("Dataset Statistics", "\n".join(lines))
+
+    def open_search(self, event=None):
+        """현재 문서의 폴더(열린 문서가 없으면 선택한 폴더)를 검색하는 창을 열고 색인을 백그라운드에서 갱신."""
+        if self.current_json_path:
+            directory = os.path.dirname(os.path.abspath(self.current_json_path))
+        else:
+            directory = filedialog.askdirectory()
+            if not directory:
+                return
+            directory = os.path.abspath(directory)
+        if self.search_index is None or self.search_index.directory != directory:
+            try:
+                index = SearchIndex(directory)
+            except (OSError, sqlite3.Error) as e:
+                messagebox.showerror("Error", f"Failed to open search index: {e}")
+                return
+            if self.search_index is not None:
+                self.search_index.close()
+            self.search_index = index
+
+        if self.search_dialog is not None and self.search_dialog.exists():
+            self.search_dialog.lift()
+        else:
+            self.search_dialog = SearchDialog(self.root, self.search_dataset, self.open_search_hit)
+        self.refresh_search_index()
+
+    def search_dataset(self, query):
+        if self.search_index is None:
+            return []
+        return self.search_index.search(query)
+
+    def refresh_search_index(self):
+        """바뀐 JSON만 다시 색인 (전용 스레드). 색인하는 동안에도 이미 색인된 파일은 검색할 수 있다."""
+        if self.search_refresh is not None and not self.search_refresh.done():
+            return
+        self.search_dialog.set_status("Indexing...")
+        self.search_refresh = self.search_executor.submit(refresh_index, self.search_index.directory,
+                                                          self.search_cancel.is_set)
+        self.root.after(200, self.poll_search_refresh)
+
+    def poll_search_refresh(self):
+        future = self.search_refresh
+        if future is None:
+            return
+        if not future.done():
+            self.root.after(200, self.poll_search_refresh)
+            return
+        if self.search_dialog is None or not self.search_dialog.exists():
+            return
+        try:
+            updated, total = future.result()
+        except Exception as e:
+            self.search_dialog.set_status(f"Indexing failed: {e}")
+            return
+        self.search_dialog.set_status(f"{total} files indexed ({updated} updated)")
+        self.search_dialog.update_results()
+
+    def open_search_hit(self, hit):
+        """검색 결과의 문서를 열고(열려 있으면 탭 전환) 일치한 노드/연결을 선택해서 화면 가운데로 이동."""
+        json_path = os.path.join(self.search_index.directory, hit.name)
+        self.load_json_file(json_path)
+        if self.session.active.key != self.document_key(json_path):
+            return  # 열지 못함
+
+        key = None
+        if hit.kind == "node" and hit.item_id in self.document.node_map:
+            key = ("node", hit.item_id)
+        elif hit.kind == "connection":
+            connection = self.document.connection_map.get(hit.item_id) if hit.item_id else None
+            if connection is None and hit.item_id is None and hit.position < len(self.connections):
+                connection = self.connections[hit.position]  # id 없이 저장된 연결은 파일 안의 순서로 찾음
+            if connection is not None:
+                key = ("connection", connection.id)
+        if key is None:
+            return
+        self.set_selection(key)
+        if key[0] == "node":
+            self.center_view_on(self.document.node_map[key[1]].coords)
+        else:
+            connection = self.document.connection_map[key[1]]
+            ends = [self.document.node_map[node_id].coords for node_id in (connection.from_id, connection.to_id)
+                    if node_id in self.document.node_map]
+            if ends:
+                self.center_view_on((min(c[0] for c in ends), min(c[1] for c in ends),
+                                     max(c[2] for c in ends), max(c[3] for c in ends)))
+
+    def center_view_on(self, coords):
+        """원본 좌표 영역 coords의 중심이 캔버스 가운데에 오도록 이미지를 이동 (배율은 유지)."""
+        center_x, center_y = self.get_center(coords)
+        self.img_x = int(self.canvas.winfo_width() / 2 - center_x * self.scale_factor)
+        self.img_y = int(self.canvas.winfo_height() / 2 - center_y * self.scale_factor)
+        self.frame_scheduler.mark_view()
+
+    # 동시 편집 동기화: 열린 문서마다 편집 연산을 서버와 주고받음 (ant_sync)
+
+    def connect_sync(self, address=None):
+        """Sync 메뉴: 동기화 서버에 연결하고 열린 문서를 모두 참여시킴. address는 "host:port"."""
+        if address is None:
+            address = simpledialog.askstring("Connect to Sync Server", "Server (host:port):",
+                                             initialvalue=f"{DEFAULT_HOST}:{DEFAULT_PORT}", parent=self.root)
+            if not address:
+                return
+        self.disconnect_sync()
+        host, _, port = address.strip().rpartition(":")
+        try:
+            self.sync_client = SyncClient(host or DEFAULT_HOST, int(port)).start()
+        except (ValueError, SyncError) as e:
+            messagebox.showerror("Sync Error", f"Failed to connect to {address}: {e}")
+            return
+        for state in self.session.documents.values():
+            values = self.tab_values() if state is self.session.active else state.values
+            if values["autosave_session"] is not None:
+                self.sync_client.join(values["autosave_session"].json_path, values["document"])
+        self.save_status_label.config(text=f"Connected to {address}", fg="blue")
+        self.sync_timer = self.root.after(50, self.poll_sync)
+
+    def disconnect_sync(self):
+        if self.sync_client is None:
+            return
+        if self.sync_timer is not None:
+            self.root.after_cancel(self.sync_timer)
+            self.sync_timer = None
+        self.sync_client.close()
+        self.sync_client = None
+        self.save_status_label.config(text="Disconnected from sync server", fg="gray")
+
+    def leave_sync(self, values):
+        """닫는 탭(values)의 문서를 동기화에서 뺌."""
+        session = values.get("autosave_session")
+        if self.sync_client is None or session is None:
+            return
+        replica = self.sync_client.replicas.get(document_key(session.json_path))
+        if replica is not None and replica.document is values["document"]:
+            self.sync_client.leave(replica.key)
+
+    def sync_tab_values(self, replica):
+        """replica 문서를 연 탭과 그 편집기 상태 (활성 탭이면 현재 속성 값). 탭이 없으면 (None, None)."""
+        state = self.session.get(self.document_key(replica.json_path))
+        if state is None:
+            return None, None
+        return state, self.tab_values() if state is self.session.active else state.values
+
+    def poll_sync(self):
+        """동기화 스레드가 받은 연산을 문서에 적용하고 화면에 반영."""
+        self.sync_timer = None
+        # 받은 연산(과 그에 맞춰 다시 적용하는 내 편집)은 되돌리기 기록에 넣지 않음
+        histories = [values["history"] for _, values in map(self.sync_tab_values, self.sync_client.replicas.values())
+                     if values is not None]
+        for history in histories:
+            history.applying = True
+        try:
+            events = self.sync_client.poll()
+        finally:
+            for history in histories:
+                history.applying = False
+        for event, replica, detail in events:
+            if event == "closed":
+                self.sync_client.close()
+                self.sync_client = None
+                self.save_status_label.config(text=f"Sync disconnected: {detail}", fg="red")
+                return
+            if event == "error":
+                self.save_status_label.config(text=f"Sync error: {detail}", fg="red")
+            elif event == "replaced":
+                self.adopt_sync_document(replica)
+            elif event == "changed":
+                self.show_remote_ops(replica, detail)
+            elif event == "rejected":
+                self.save_status_label.config(text=f"Edit rejected: {detail}", fg="red")
+        self.sync_timer = self.root.after(50, self.poll_sync)
+
+    def show_remote_ops(self, replica, ops):
+        """다른 사람의 편집(과 그에 맞춰 다시 적용한 내 편집)을 반영. 되돌리기 기록은 다른 사람의 편집을
+        덮어쓰지 않도록 지운다. 보이지 않는 탭은 전환할 때 전체를 다시 그린다."""
+        state, values = self.sync_tab_values(replica)
+        if state is None:
+            return
+        values["history"].clear()
+        if state is self.session.active:
+            self.show_applied_ops(ops)
+        else:
+            values["stale"] = True
+
+    def adopt_sync_document(self, replica):
+        """서버에 이미 있던 문서로 바뀐 탭을 새 문서로 교체. 자동 저장은 새 문서 전체를 바로 저장한다."""
+        state, values = self.sync_tab_values(replica)
+        if state is None or values["document"] is replica.document:
+            return
+        document = replica.document
+        old_session = values["autosave_session"]
+        self.autosaver.close(old_session)
+        session = self.autosaver.open(old_session.json_path, old_session.file_name, document.copy(),
+                                      store=old_session.store, dirty=True)
+        document.observers.append(session.record)
+        values["history"].attach(document)
+        if state is self.session.active:
+            self.document = document
+            self.autosave_session = session
+            self.show_applied_ops([])
+            self.update_label_listbox()
+            self.frame_scheduler.mark_all()
+            self.save_status_label.config(text="Loaded the shared version from the sync server", fg="blue")
+        else:
+            state.values["document"] = document
+            state.values["autosave_session"] = session
+            state.values["stale"] = True
+
 
 
 if __name__ == "__main__":
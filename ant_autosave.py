@@ -0,0 +1,270 @@
+"""AnT 백그라운드 자동 저장 (Tk 없이 사용 가능).
+
+편집 연산(AnnotationDocument.notify로 전달되는 dict)을 저장 스레드로 보내면, 스레드는 자신의 문서 사본에
+연산을 적용하고 문서별 저널(<json>.journal)에 한 줄씩 추가한다. 일정 시간마다(또는 요청 시) 사본을
+저장소에 저장(JSON은 임시 파일 + rename)하고 저널을 비운다. UI 스레드는 큐에 넣기만 하므로 저장 때문에 멈추지 않는다.
+
+저널 첫 줄에는 저널이 기준으로 삼는 저장 상태(store.signature: JSON 파일의 (mtime_ns, size) 또는 SQLite 저장소의
+문서 revision)를 기록한다. 프로그램이 비정상 종료되면 다음에 같은 문서를 열 때 read_journal로 아직 저장되지 않은
+연산을 다시 적용할 수 있다.
+
+저장은 세션의 저장소(ant_store)가 한다. 저장소가 incremental이면 마지막 저장 이후의 연산을 함께 넘겨 바뀐 행만 기록한다.
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+from ant_io import atomic_write
+from ant_store import JSONStore
+
+
+JOURNAL_SUFFIX = ".journal"
+
+
+def journal_path(json_path):
+    return f"{json_path}{JOURNAL_SUFFIX}"
+
+
+def read_journal(json_path, store=None):
+    """json_path 문서에 아직 반영되지 않은 편집 연산 리스트. store는 문서를 저장하는 저장소 (기본 JSONStore).
+
+    저널이 없거나, 저널을 쓴 뒤에 저장된 문서가 바뀌었으면(저장 완료 또는 외부 수정) 빈 리스트.
+    """
+    store = store or JSONStore(os.path.dirname(json_path))
+    try:
+        with open(journal_path(json_path), 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    try:
+        header = json.loads(lines[0])
+    except (IndexError, ValueError):
+        return []
+    if header.get("base") != store.signature(json_path):
+        return []
+
+    ops = []
+    for line in lines[1:]:
+        try:
+            ops.append(json.loads(line))
+        except ValueError:
+            break  # 비정상 종료 직전에 일부만 기록된 마지막 줄
+    return ops
+
+
+class AutosaveSession:
+    """문서 하나의 자동 저장 상태. record는 UI 스레드에서, 나머지 필드는 저장 스레드에서만 사용."""
+
+    def __init__(self, commands, json_path, file_name, base_document, recovered_ops, store, dirty=False):
+        self.commands = commands
+        self.json_path = json_path
+        self.file_name = file_name
+        self.base_document = base_document  # 저장 스레드가 복사한 뒤 버림 (읽기 전용으로 공유)
+        self.recovered_ops = recovered_ops
+        self.store = store
+
+        self.dirty = dirty         # base_document가 저장된 내용과 다름 (열자마자 전체 저장)
+        self.unsaved_ops = []      # 마지막 저장 이후 연산 (incremental 저장소에만 기록, None이면 전체 저장)
+        self.document = None       # 저장 스레드의 문서 사본
+        self.journal = None
+        self.pending_ops = 0       # 마지막 저장 이후 연산 수
+        self.compact_at = None     # 다음 저장 시각 (저장할 변경이 없으면 None)
+        self.unflushed = False
+        self.written_at = 0.0     # 마지막 저널 기록 시각
+        self.synced_at = 0.0      # 마지막 fsync 시각
+
+    def record(self, op, inverse=None):
+        """AnnotationDocument.observers에 등록하는 콜백 (저널에는 정방향 연산만 기록)."""
+        self.commands.put(("op", self, op))
+
+
+class Autosaver:
+    """자동 저장 스레드. compact_interval초마다 변경된 문서를 저장소에 저장하고, 저널은 sync_interval초마다 fsync."""
+
+    def __init__(self, compact_interval=30.0, sync_interval=1.0):
+        self.compact_interval = compact_interval
+        self.sync_interval = sync_interval
+        self.commands = queue.Queue()
+        self.results = queue.Queue()  # ("saved" | "error", json_path, 연산 수 | 오류 메시지)
+        self.sessions = []            # 저장 스레드 전용
+        self.thread = threading.Thread(target=self.run, name="ant-autosave", daemon=True)
+        self.thread.start()
+
+    # UI 스레드에서 호출
+
+    def open(self, json_path, file_name, base_document, recovered_ops=(), store=None, dirty=False):
+        """base_document(변경되지 않는 문서)에 recovered_ops를 적용한 상태로 세션 시작. store가 없으면 JSON 파일에 저장.
+
+        dirty이면 base_document가 저장된 문서와 다른 것이므로(동기화 서버에서 받은 문서 등) 바로 전체를 저장한다.
+        """
+        session = AutosaveSession(self.commands, json_path, file_name, base_document, list(recovered_ops),
+                                  store or JSONStore(os.path.dirname(json_path)), dirty)
+        self.commands.put(("open", session, None))
+        return session
+
+    def save(self, session):
+        """기다리지 않고 바로 저장을 요청."""
+        self.commands.put(("save", session, None))
+
+    def close(self, session):
+        """남은 변경을 저장하고 세션 종료."""
+        self.commands.put(("close", session, None))
+
+    def stop(self, timeout=None):
+        """열린 세션을 모두 저장/종료하고 스레드가 끝날 때까지 대기."""
+        self.commands.put(("stop", None, None))
+        self.thread.join(timeout)
+
+    def poll(self):
+        """저장 스레드에서 온 결과를 모두 꺼냄."""
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    # 저장 스레드
+
+    def run(self):
+        while True:
+            try:
+                kind, session, op = self.commands.get(timeout=self.next_timeout())
+            except queue.Empty:
+                kind, session = None, None
+
+            try:
+                if kind == "op":
+                    self.record(session, op)
+                elif kind == "open":
+                    self.open_session(session)
+                elif kind == "save":
+                    if session in self.sessions:
+                        self.compact(session)
+                elif kind == "close":
+                    self.close_session(session)
+                elif kind == "stop":
+                    self.close_all()
+                    return
+
+            except Exception as e:
+                self.results.put(("error", session.json_path if session else None, f"{type(e).__name__}: {e}"))
+            if self.commands.empty():
+                self.tick()
+
+    def next_timeout(self):
+        deadlines = []
+        for session in self.sessions:
+            if session.compact_at is not None:
+                deadlines.append(session.compact_at)
+            if session.journal is not None and session.synced_at < session.written_at:
+                deadlines.append(session.synced_at + self.sync_interval)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def tick(self):
+        """세션마다 저널 flush/fsync와 예정된 저장. 실패는 그 세션의 문서로 보고하고 다른 세션은 계속 처리한다."""
+        now = time.monotonic()
+        for session in self.sessions:
+            try:
+                if session.unflushed:
+                    session.journal.flush()
+                    session.unflushed = False
+                if session.journal is not None and session.synced_at < session.written_at \
+                        and now - session.synced_at >= self.sync_interval:
+                    os.fsync(session.journal.fileno())
+                    session.synced_at = now
+                if session.compact_at is not None and now >= session.compact_at:
+                    self.compact(session)
+            except Exception as e:
+                self.results.put(("error", session.json_path, f"{type(e).__name__}: {e}"))
+
+    def open_session(self, session):
+        session.document = session.base_document.copy()
+        session.base_document = None
+        try:
+            for op in session.recovered_ops:
+                session.document.apply_op(op)
+            self.reset_journal(session, session.recovered_ops)
+        except Exception as e:
+            self.results.put(("error", session.json_path, f"{type(e).__name__}: {e}"))
+        self.sessions.append(session)
+        if session.dirty:
+            session.unsaved_ops = None
+            session.compact_at = time.monotonic()
+        elif session.recovered_ops:
+            if session.store.incremental:
+                session.unsaved_ops.extend(session.recovered_ops)
+            session.pending_ops = len(session.recovered_ops)
+            session.compact_at = time.monotonic()
+        session.recovered_ops = None
+
+    def close_session(self, session):
+        if session not in self.sessions:
+            return
+        if session.compact_at is not None:
+            self.compact(session)
+        self.sessions.remove(session)
+        if session.journal is not None:
+            session.journal.close()
+            session.journal = None
+            if session.compact_at is None:
+                # 모든 변경이 저장소에 반영됨
+                try:
+                    os.remove(journal_path(session.json_path))
+                except OSError:
+                    pass
+
+    def close_all(self):
+        for session in list(self.sessions):
+            try:
+                self.close_session(session)
+            except Exception as e:
+                self.sessions.remove(session)
+                self.results.put(("error", session.json_path, f"{type(e).__name__}: {e}"))
+
+    def record(self, session, op):
+        if session not in self.sessions:
+            return
+        session.document.apply_op(op)
+        if session.store.incremental and session.unsaved_ops is not None:
+            session.unsaved_ops.append(op)
+        if session.journal is not None:
+            session.journal.write(json.dumps(op, ensure_ascii=False) + "\n")
+            session.unflushed = True
+            session.written_at = time.monotonic()
+        session.pending_ops += 1
+        if session.compact_at is None:
+            session.compact_at = time.monotonic() + self.compact_interval
+
+    def reset_journal(self, session, ops):
+        """현재 저장 상태를 기준으로 저널을 새로 씀 (임시 파일 + rename)."""
+        if session.journal is not None:
+            session.journal.close()
+            session.journal = None
+        path = journal_path(session.json_path)
+        with atomic_write(path, fsync=True) as f:
+            f.write(json.dumps({"journal": 1, "base": session.store.signature(session.json_path)}) + "\n")
+            for op in ops:
+                f.write(json.dumps(op, ensure_ascii=False) + "\n")
+        session.journal = open(path, 'a', encoding='utf-8')
+        session.synced_at = session.written_at = time.monotonic()
+
+    def compact(self, session):
+        """문서 사본을 저장소에 저장하고 저널을 비움. 실패하면 저널을 유지하고 나중에 다시 시도."""
+        try:
+            if session.journal is not None:
+                session.journal.flush()
+            session.store.save(session.json_path, session.document, session.file_name, session.unsaved_ops)
+            session.unsaved_ops = []
+            self.reset_journal(session, [])
+        except Exception as e:
+            session.compact_at = time.monotonic() + self.compact_interval
+            self.results.put(("error", session.json_path, f"{type(e).__name__}: {e}"))
+            return
+        self.results.put(("saved", session.json_path, session.pending_ops))
+        session.pending_ops = 0
+        session.compact_at = None
@@ -0,0 +1,116 @@
+"""AnT 어노테이션 JSON 일괄 정규화 (GUI 없이 실행).
+
+편집기에서 열고 저장한 것과 같은 결과를 만든다: 연결 id 생성, 기본 색상 지정,
+좌표 기반 부모-자식 관계 설정, 중첩된 "components" 출력.
+
+사용법: python ant_batch.py DATASET_DIR [DATASET_DIR ...] [--workers N] [--output-dir OUT] [--dry-run]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+import ant_stream
+from ant_io import find_image_for_json, write_json_atomic
+from ant_sidecar import refresh_sidecar
+
+
+def find_json_files(paths):
+    """경로(파일 또는 디렉터리 트리)에서 처리할 JSON 파일을 이름 순으로 수집."""
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append((path, os.path.dirname(path)))
+            continue
+        for directory, subdirs, files in os.walk(path):
+            subdirs[:] = sorted(d for d in subdirs if not d.startswith('.'))
+            for name in sorted(files):
+                if name.endswith('.json') and not name.startswith('.'):
+                    found.append((os.path.join(directory, name), path))
+    return found
+
+
+def process_file(json_path, root, output_dir, layout_width, dry_run):
+    """JSON 하나를 정규화해서 저장. 워커 프로세스에서 실행되며 예외 대신 결과 dict를 반환."""
+    try:
+        # 좌표가 없는 노드는 이미지 영역 안에 배치 (이미지가 없으면 layout_width 폭 안에)
+        image_path = find_image_for_json(json_path)
+        layout_height = None
+        if image_path:
+            with Image.open(image_path) as image:  # 헤더만 읽음
+                layout_width, layout_height = image.size
+
+        # 중첩이 아주 깊은 파일도 재귀 없이 스트리밍으로 읽음
+        document, _ = ant_stream.load_document(json_path, layout_width, layout_height)
+
+        file_name = os.path.basename(image_path) if image_path else document.file_name
+        output = document.to_data(file_name)
+
+        if output_dir:
+            target = os.path.join(output_dir, os.path.relpath(json_path, root))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        else:
+            target = json_path
+        if not dry_run:
+            write_json_atomic(target, output)
+            refresh_sidecar(target, document, file_name)
+        return {"path": json_path, "nodes": len(document.nodes), "connections": len(document.connections), "error": None}
+    except Exception as e:
+        return {"path": json_path, "nodes": 0, "connections": 0, "error": f"{type(e).__name__}: {e}"}
+
+
+def run_batch(json_files, output_dir=None, workers=None, layout_width=1280, dry_run=False, log=sys.stderr):
+    """json_files [(path, root)]를 프로세스 풀로 처리하고 요약 dict 반환."""
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(process_file, path, root, output_dir, layout_width, dry_run)
+                   for path, root in json_files]
+        for future in futures:
+            result = future.result()
+            if result["error"]:
+                print(f"ERROR {result['path']}: {result['error']}", file=log)
+            results.append(result)
+    elapsed = time.perf_counter() - start
+
+    failed = [result for result in results if result["error"]]
+    return {
+        "files": len(results),
+        "failed": len(failed),
+        "nodes": sum(result["nodes"] for result in results),
+        "connections": sum(result["connections"] for result in results),
+        "seconds": elapsed,
+        "files_per_second": len(results) / elapsed if elapsed > 0 else 0.0,
+        "errors": {result["path"]: result["error"] for result in failed}
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Normalise AnT annotation JSON files without a GUI.")
+    parser.add_argument("paths", nargs="+", help="dataset directories (searched recursively) or JSON files")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--output-dir", help="write results here, mirroring the input tree (default: in place)")
+    parser.add_argument("--layout-width", type=int, default=1280,
+                        help="width used to place nodes without coordinates when there is no image (default: 1280)")
+    parser.add_argument("--dry-run", action="store_true", help="process files but do not write anything")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    json_files = find_json_files(args.paths)
+    summary = run_batch(json_files, args.output_dir, args.workers, args.layout_width, args.dry_run)
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=4))
+    else:
+        print(f"{summary['files']} files, {summary['failed']} failed, "
+              f"{summary['nodes']} nodes, {summary['connections']} connections "
+              f"in {summary['seconds']:.2f}s ({summary['files_per_second']:.1f} files/sec)")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""AnT 되돌리기/다시 실행 (Tk 없이 사용 가능).
+
+AnnotationDocument가 편집마다 알려 주는 (연산, 되돌리기 연산)을 쌓아 두었다가 apply_op로 재생한다.
+문서 전체를 복사하지 않으므로 기록 하나의 크기와 되돌리는 시간은 해당 편집의 크기에 비례한다.
+"""
+from collections import deque
+
+
+class HistoryEntry:
+    """되돌리기 한 단계. ops는 정방향 연산, inverses는 연산마다의 되돌리기 연산 리스트."""
+
+    __slots__ = ("label", "ops", "inverses")
+
+    def __init__(self, label):
+        self.label = label
+        self.ops = []
+        self.inverses = []
+
+    def add(self, op, inverse):
+        # 드래그처럼 같은 노드 좌표를 연속으로 바꾸면 마지막 좌표와 처음 되돌리기만 유지
+        if (op["op"] == "set_node_coords" and self.ops and self.ops[-1]["op"] == "set_node_coords"
+                and self.ops[-1]["id"] == op["id"]):
+            self.ops[-1] = op
+            return
+        self.ops.append(op)
+        self.inverses.append(inverse)
+
+    def undo_ops(self):
+        """되돌릴 때 적용할 연산 (마지막 편집부터 역순)."""
+        return [op for inverse in reversed(self.inverses) for op in inverse]
+
+
+class EditHistory:
+    """문서 하나의 되돌리기/다시 실행 스택. begin/end 사이의 편집은 한 단계로 묶는다."""
+
+    def __init__(self, limit=500):
+        self.document = None
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = []
+        self.group = None
+        self.group_depth = 0
+        self.applying = False
+
+    def attach(self, document):
+        """document의 편집을 기록 (이전 문서의 기록은 지움)."""
+        if self.document is not None and self.record in self.document.observers:
+            self.document.observers.remove(self.record)
+        self.document = document
+        self.clear()
+        document.observers.append(self.record)
+
+    def clear(self):
+        """쌓인 기록을 지움. 진행 중인 묶음(드래그 등)은 새 단계로 이어서 모으므로 end와의 짝이 유지된다."""
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        if self.group_depth:
+            self.group = HistoryEntry(self.group.label)
+
+    def begin(self, label):
+        """여러 편집을 한 단계로 묶기 시작 (드래그 시작 등). end와 짝을 맞춘다."""
+        if self.group_depth == 0:
+            self.group = HistoryEntry(label)
+        self.group_depth += 1
+
+    def end(self):
+        if self.group_depth == 0:
+            return
+        self.group_depth -= 1
+        if self.group_depth == 0:
+            group, self.group = self.group, None
+            if group.ops:
+                self.push(group)
+
+    def push(self, entry):
+        self.undo_stack.append(entry)
+        self.redo_stack.clear()
+
+    def record(self, op, inverse):
+        """AnnotationDocument.observers 콜백."""
+        if self.applying:
+            return
+        if self.group is not None:
+            self.group.add(op, inverse)
+            return
+        entry = HistoryEntry(op["op"])
+        entry.add(op, inverse)
+        self.push(entry)
+
+    def can_undo(self):
+        return bool(self.undo_stack) or bool(self.group and self.group.ops)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        """마지막 단계를 되돌리고 적용한 연산 리스트 반환 (없으면 빈 리스트)."""
+        while self.group_depth:
+            self.end()  # 진행 중인 묶음은 먼저 닫음
+        if not self.undo_stack:
+            return []
+        entry = self.undo_stack.pop()
+        ops = entry.undo_ops()
+        self.apply(ops)
+        self.redo_stack.append(entry)
+        return ops
+
+    def redo(self):
+        """마지막으로 되돌린 단계를 다시 실행하고 적용한 연산 리스트 반환."""
+        if not self.redo_stack:
+            return []
+        entry = self.redo_stack.pop()
+        self.apply(entry.ops)
+        self.undo_stack.append(entry)
+        return entry.ops
+
+    def apply(self, ops):
+        self.applying = True
+        try:
+            for op in ops:
+                self.document.apply_op(op)
+        finally:
+            self.applying = False
@@ -0,0 +1,180 @@
+"""AnT 이미지 로딩 파이프라인 (PIL 필요, Tk 불필요).
+
+편집기의 두 로딩 경로(JSON과 함께 열기, 이미지 직접 열기)가 모두 SourceImage를 사용한다.
+JPEG는 draft(DCT 축소 디코딩)로 1/2~1/8 해상도의 미리보기를 바로 만들고, 원본 해상도는 확대해서
+필요할 때만 load_full로 다시 디코딩한다. 알파 채널은 flatten_alpha 한 곳에서 흰 배경에 합성한다.
+원본에서 파생된 버퍼(피라미드 레벨 등)는 ImageBufferCache가 메모리 예산 안에서 공유/관리한다.
+"""
+import os
+from collections import OrderedDict
+
+from PIL import Image
+
+
+PREVIEW_SIZE = 2048             # 미리보기의 긴 변이 이보다 작아지지 않을 때까지만 축소
+MAX_DRAFT_LEVEL = 3             # JPEG draft는 1/2, 1/4, 1/8 축소만 지원
+DEFAULT_BUDGET = 1024 ** 3      # ImageBufferCache 기본 예산 (byte)
+
+
+def image_nbytes(image):
+    """PIL 이미지의 픽셀 버퍼 크기(byte)."""
+    return image.width * image.height * len(image.getbands())
+
+
+def flatten_alpha(image):
+    """알파 채널이나 투명 색이 있는 이미지를 흰 배경에 합성해서 RGB로 변환 (투명도 슬라이더는 타일 알파로 처리).
+
+    항상 디코딩을 끝낸 이미지를 반환하므로 원본 파일을 닫은 뒤에도 사용할 수 있다.
+    """
+    image.load()
+    if image.mode in ("RGBA", "LA", "PA", "RGBa", "La") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        return Image.alpha_composite(background, image).convert("RGB")
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+class SourceImage:
+    """원본 이미지 파일 하나. 생성할 때 표시용 이미지(base_image)만 디코딩한다.
+
+    base_image는 원본을 1/2**base_level로 축소한 RGB 이미지로, 이미지 피라미드의 base_level 레벨과 크기가 같다.
+    draft를 쓸 수 없는 형식(PNG 등)은 원본 전체를 디코딩하므로 base_level이 0이다.
+    """
+
+    def __init__(self, path, preview_size=PREVIEW_SIZE):
+        self.path = path
+        stat = os.stat(path)
+        self.key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)  # 파생 버퍼의 캐시 키
+        with Image.open(path) as image:
+            self.size = image.size
+            level = 0
+            while level < MAX_DRAFT_LEVEL and max(self.size) >> (level + 1) >= preview_size:
+                level += 1
+            if level and image.format == "JPEG":
+                image.draft("RGB", (-(-self.size[0] >> level), -(-self.size[1] >> level)))
+            self.base_image = flatten_alpha(image)
+        # draft가 고른 실제 축소 비율 (요청보다 덜 줄였을 수 있음)
+        self.base_level = 0
+        while self.base_level < level and self.base_image.width < self.size[0] >> self.base_level:
+            self.base_level += 1
+
+    @property
+    def width(self):
+        return self.size[0]
+
+    @property
+    def height(self):
+        return self.size[1]
+
+    @property
+    def nbytes(self):
+        """디코딩해서 들고 있는 픽셀 크기(byte)."""
+        return image_nbytes(self.base_image)
+
+    def load_full(self):
+        """원본 해상도로 다시 디코딩 (워커 스레드에서 호출). base_level이 0이면 이미 가진 이미지를 반환."""
+        if self.base_level == 0:
+            return self.base_image
+        with Image.open(self.path) as image:
+            return flatten_alpha(image)
+
+    def display_image(self, size):
+        """size로 리샘플링한 RGB 이미지 (화면 크기 사본용, 원본 해상도를 디코딩하지 않음)."""
+        return self.base_image.resize(size, Image.LANCZOS)
+
+
+class ImageBufferCache:
+    """디코딩/리샘플링한 이미지 버퍼의 공유 캐시 (UI 스레드 전용).
+
+    키는 (SourceImage.key, 변환)처럼 원본과 변환을 나타내므로, 같은 이미지를 여는 피라미드끼리 버퍼를 공유한다.
+    전체 크기가 budget을 넘으면 사용 중(pin)이 아닌 항목을 오래 쓰지 않은 순서대로 버린다.
+    버린 버퍼는 필요할 때 다시 만든다.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self.entries = OrderedDict()  # key -> (image, byte 수, 종류)
+        self.pins = {}                # key -> 사용 중인 곳의 수
+        self.bytes = 0
+        self.peak_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, image, kind):
+        """image를 등록하고 캐시의 버퍼를 반환. 같은 키가 이미 있으면 기존 버퍼를 공유한다.
+
+        새로 넣은 항목은 이번 정리에서 버리지 않는다 (예산보다 큰 버퍼도 한 번은 사용할 수 있게).
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry[0]
+        nbytes = image_nbytes(image)
+        self.entries[key] = (image, nbytes, kind)
+        self.bytes += nbytes
+        self.peak_bytes = max(self.peak_bytes, self.bytes)
+        self.evict(keep=key)
+        return image
+
+    def pin(self, key):
+        """key를 사용 중으로 표시 (unpin할 때까지 제거하지 않음)."""
+        self.pins[key] = self.pins.get(key, 0) + 1
+
+    def unpin(self, key):
+        count = self.pins.get(key, 0) - 1
+        if count > 0:
+            self.pins[key] = count
+        else:
+            self.pins.pop(key, None)
+        self.evict()
+
+    def set_budget(self, budget):
+        self.budget = budget
+        self.evict()
+
+    def evict(self, keep=None):
+        if self.bytes <= self.budget:
+            return
+        for key in list(self.entries):
+            if self.bytes <= self.budget:
+                break
+            if key == keep or key in self.pins:
+                continue
+            _, nbytes, _ = self.entries.pop(key)
+            self.bytes -= nbytes
+            self.evictions += 1
+            self.evicted_bytes += nbytes
+
+    def stats(self):
+        """현재 사용량과 누적 적중/제거 통계."""
+        kinds = {}
+        for _, nbytes, kind in self.entries.values():
+            usage = kinds.setdefault(kind, {"count": 0, "bytes": 0})
+            usage["count"] += 1
+            usage["bytes"] += nbytes
+        return {
+            "budget": self.budget,
+            "bytes": self.bytes,
+            "peak_bytes": self.peak_bytes,
+            "entries": len(self.entries),
+            "pinned": len(self.pins),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+            "kinds": kinds
+        }
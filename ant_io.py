@@ -0,0 +1,90 @@
+"""AnT 어노테이션 파일 입출력 도우미 (Tk/PIL 없이 사용 가능).
+
+문서 모델은 ant_model.py에 있다.
+"""
+import contextlib
+import json
+import os
+import random
+import stat
+import string
+import tempfile
+
+
+IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".bmp", ".gif"]
+
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def generate_unique_id(existing_ids, rng=random):
+    """Generate a unique 3-character ID."""
+    while True:
+        new_id = ''.join(rng.choices(string.ascii_uppercase + string.digits, k=3))
+        if new_id not in existing_ids:
+            return new_id
+
+
+def find_image_for_json(json_path):
+    """JSON 파일과 같은 이름의 이미지 파일 경로를 찾음. 없으면 None."""
+    base_name = os.path.splitext(os.path.basename(json_path))[0]
+    directory = os.path.dirname(json_path)
+    for ext in IMAGE_EXTENSIONS:
+        image_path = os.path.join(directory, f"{base_name}{ext}")
+        if os.path.exists(image_path):
+            return image_path
+    return None
+
+
+def file_signature(path):
+    """파일이 바뀌었는지 확인하는 (mtime_ns, size). 파일이 없으면 None."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_annotation_json(json_path):
+    with open(json_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def write_json_atomic(path, data, fsync=False):
+    """임시 파일에 쓴 뒤 rename해서 중간에 실패해도 기존 파일이 깨지지 않게 저장.
+
+    fsync=True이면 rename 전에 디스크에 기록해 전원이 꺼져도 빈 파일이 남지 않게 한다.
+    """
+    with atomic_write(path, fsync=fsync) as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode='w', fsync=False):
+    """path와 같은 폴더의 임시 파일을 열어 주고, 블록이 끝나면 rename으로 path를 교체.
+
+    임시 파일 이름은 호출마다 달라서 여러 스레드(미리 읽기, 자동 저장)가 같은 파일을 동시에 써도 다른 쪽이
+    쓰던 파일을 옮기지 않는다. 예외가 나면 임시 파일을 지우고 기존 파일은 그대로 둔다.
+    """
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory or os.curdir, prefix=f"{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=None if 'b' in mode else 'utf-8') as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.chmod(temp_path, _file_mode(path))  # mkstemp는 0600으로 만듦
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
+
+
+def _file_mode(path):
+    """교체할 파일의 권한. 새 파일이면 open()으로 만들 때와 같은 권한."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
@@ -0,0 +1,200 @@
+"""AnT 핸들러 계측과 프로파일러 (Tk 없이 사용 가능).
+
+편집기 핸들러에 @timed를 붙여 두면, 계측이 켜졌을 때만 호출 횟수/지연 시간 히스토그램/프레임 예산 초과를 기록한다.
+꺼져 있을 때는 플래그 하나만 확인하고 원래 메서드를 호출한다.
+"""
+import cProfile
+import functools
+import io
+import json
+import pstats
+import time
+from collections import deque
+
+
+FRAME_BUDGET = 1 / 60  # 초
+HISTOGRAM_BOUNDS_MS = (1, 2, 4, 8, 16, 33, 66, 133, 266, 533, 1066)
+
+
+class HandlerStats:
+    """핸들러 하나의 호출 횟수, 누적/최대 시간, 지연 시간 히스토그램."""
+
+    __slots__ = ("count", "total", "max", "over_budget", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.over_budget = 0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)  # 마지막 칸은 최대 경계 초과
+
+    def add(self, seconds, budget):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if seconds > budget:
+            self.over_budget += 1
+        milliseconds = seconds * 1000
+        for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if milliseconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def to_dict(self):
+        histogram = {f"<={bound}ms": count for bound, count in zip(HISTOGRAM_BOUNDS_MS, self.buckets)}
+        histogram[f">{HISTOGRAM_BOUNDS_MS[-1]}ms"] = self.buckets[-1]
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total * 1000 / self.count if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "over_budget": self.over_budget,
+            "histogram": histogram
+        }
+
+
+class Instrumentation:
+    """핸들러별 통계와 예산을 넘긴 호출/프레임 기록. enabled가 False면 아무 것도 기록하지 않는다."""
+
+    def __init__(self, frame_budget=FRAME_BUDGET, max_slow_events=500):
+        self.enabled = False
+        self.frame_budget = frame_budget
+        self.stats = {}                                  # 핸들러 이름 -> HandlerStats
+        self.slow_events = deque(maxlen=max_slow_events)  # (시각, 이름, 초): 예산을 넘긴 호출/프레임
+        self.frames = HandlerStats()                      # 이벤트 루프 프레임 간격 (FrameMonitor가 기록)
+        self.started = time.time()
+
+    def reset(self):
+        self.stats.clear()
+        self.slow_events.clear()
+        self.frames = HandlerStats()
+        self.started = time.time()
+
+    def record(self, name, seconds):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = HandlerStats()
+        stats.add(seconds, self.frame_budget)
+        if seconds > self.frame_budget:
+            self.slow_events.append((time.time(), name, seconds))
+
+    def record_frame(self, seconds):
+        """프레임 간격 기록. 예산의 두 배를 넘으면 UI가 멈춘 프레임으로 본다."""
+        self.frames.add(seconds, self.frame_budget * 2)
+        if seconds > self.frame_budget * 2:
+            self.slow_events.append((time.time(), "frame", seconds))
+
+    def to_dict(self):
+        return {
+            "started": self.started,
+            "exported": time.time(),
+            "frame_budget_ms": self.frame_budget * 1000,
+            "handlers": {name: stats.to_dict() for name, stats in sorted(self.stats.items())},
+            "frames": self.frames.to_dict(),
+            "slow_events": [{"time": at, "name": name, "ms": seconds * 1000} for at, name, seconds in self.slow_events]
+        }
+
+    def export(self, path, extra=None):
+        """to_dict() 결과를 JSON으로 저장. extra(dict)가 있으면 함께 저장 (프레임 스케줄러 통계 등)."""
+        data = self.to_dict()
+        if extra:
+            data.update(extra)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def timed(name):
+    """self.metrics(Instrumentation)가 켜져 있을 때 메서드 실행 시간을 name으로 기록하는 데코레이터."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            metrics = self.metrics
+            if not metrics.enabled:
+                return func(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                metrics.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class FrameMonitor:
+    """after 타이머로 이벤트 루프 프레임 간격을 재고 FPS/프레임 시간을 계산 (켜져 있을 때만 타이머가 돈다).
+
+    핸들러가 UI 스레드를 오래 붙잡고 있으면 다음 타이머가 늦게 실행되므로 간격이 길어진다.
+    """
+
+    def __init__(self, root, metrics, on_update=None, window=60):
+        self.root = root
+        self.metrics = metrics
+        self.on_update = on_update  # 매 프레임 (fps, 최근 평균 프레임 시간(초), 최근 최대(초))로 호출
+        self.intervals = deque(maxlen=window)
+        self.interval_ms = max(1, int(metrics.frame_budget * 1000))
+        self.last = None
+        self.timer = None
+
+    @property
+    def running(self):
+        return self.timer is not None
+
+    def start(self):
+        if self.timer is None:
+            self.last = time.perf_counter()
+            self.intervals.clear()
+            self.timer = self.root.after(self.interval_ms, self.tick)
+
+    def stop(self):
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+
+    def tick(self):
+        now = time.perf_counter()
+        interval = now - self.last
+        self.last = now
+        self.intervals.append(interval)
+        if self.metrics.enabled:
+            self.metrics.record_frame(interval)
+        if self.on_update is not None:
+            mean = sum(self.intervals) / len(self.intervals)
+            self.on_update(1 / mean if mean > 0 else 0.0, mean, max(self.intervals))
+        self.timer = self.root.after(self.interval_ms, self.tick)
+
+
+class SessionProfiler:
+    """cProfile 세션 시작/중지와 통계 내보내기."""
+
+    def __init__(self):
+        self.profile = None
+
+    @property
+    def running(self):
+        return self.profile is not None
+
+    def start(self):
+        if self.profile is None:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self):
+        """프로파일링을 멈추고 pstats.Stats 반환 (실행 중이 아니면 None)."""
+        if self.profile is None:
+            return None
+        self.profile.disable()
+        stats = pstats.Stats(self.profile)
+        self.profile = None
+        return stats
+
+    @staticmethod
+    def export(stats, path, limit=50):
+        """path에 pstats 바이너리(.prof)를, 같은 이름의 .txt에 누적 시간 상위 limit개 요약을 저장."""
+        stats.dump_stats(path)
+        summary = io.StringIO()
+        stats.stream = summary
+        stats.sort_stats("cumulative").print_stats(limit)
+        with open(f"{path}.txt", 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
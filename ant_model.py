@@ -0,0 +1,850 @@
+"""AnT 어노테이션 문서 모델 (Tk/PIL 없이 사용 가능).
+
+노드와 연결은 __slots__ 레코드로 저장하고, 문서가 id/공간/인접/포함 관계 인덱스를 함께 유지한다.
+편집기(AnT.py)와 배치 도구(ant_batch.py)는 모두 AnnotationDocument를 통해 읽고 저장한다.
+"""
+import math
+import random
+import uuid
+
+from ant_io import generate_unique_id, load_annotation_json, write_json_atomic
+
+
+class Node:
+    """어노테이션 노드. 좌표는 원본 이미지 좌표계의 (x1, y1, x2, y2)."""
+
+    __slots__ = ("id", "x1", "y1", "x2", "y2", "text", "parent_id")
+
+    def __init__(self, id, coords, text, parent_id=None):
+        self.id = id
+        self.x1, self.y1, self.x2, self.y2 = coords
+        self.text = text
+        self.parent_id = parent_id
+
+    @property
+    def coords(self):
+        return (self.x1, self.y1, self.x2, self.y2)
+
+    @coords.setter
+    def coords(self, coords):
+        self.x1, self.y1, self.x2, self.y2 = coords
+
+    def copy(self):
+        return Node(self.id, self.coords, self.text, self.parent_id)
+
+
+class Connection:
+    """두 노드 사이의 연결. JSON에 있던 알 수 없는 키는 extra에 보관했다가 그대로 저장한다."""
+
+    __slots__ = ("id", "from_id", "to_id", "text", "type", "direction", "color", "extra")
+
+    FIELDS = ("id", "from", "to", "text", "type", "direction", "color")
+
+    def __init__(self, id, from_id, to_id, text=None, type="line", direction=True, color="#000000", extra=None):
+        self.id = id
+        self.from_id = from_id
+        self.to_id = to_id
+        self.text = text
+        self.type = type
+        self.direction = direction
+        self.color = color
+        self.extra = extra
+
+    @classmethod
+    def from_json(cls, data):
+        extra = {key: value for key, value in data.items() if key not in cls.FIELDS} or None
+        return cls(data.get("id"), data["from"], data["to"], data.get("text"), data.get("type", "line"),
+                   data.get("direction", True), data.get("color", "#000000"), extra)
+
+    def to_json(self):
+        data = {
+            "id": self.id,
+            "from": self.from_id,
+            "to": self.to_id,
+            "text": self.text,
+            "type": self.type,
+            "direction": self.direction,
+            "color": self.color
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def copy(self):
+        return Connection(self.id, self.from_id, self.to_id, self.text, self.type, self.direction, self.color,
+                          dict(self.extra) if self.extra else None)
+
+
+class SpatialGrid:
+    """노드 히트 테스트용 균일 격자(uniform grid) 공간 인덱스. 좌표는 원본 이미지 좌표계.
+
+    각 박스를 겹치는 셀에 등록해 두고, 점 질의는 해당 셀의 후보만 검사한다.
+    """
+
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}  # (cell_x, cell_y) -> 해당 셀과 겹치는 key 집합
+        self.boxes = {}  # key -> 정규화된 (x1, y1, x2, y2)
+
+    def _cells_of(self, box):
+        size = self.cell_size
+        x1, y1, x2, y2 = box
+        for cell_x in range(int(x1 // size), int(x2 // size) + 1):
+            for cell_y in range(int(y1 // size), int(y2 // size) + 1):
+                yield cell_x, cell_y
+
+    def insert(self, key, coords):
+        """key의 박스를 등록하거나 갱신. 좌표가 뒤집혀 있어도 정규화해서 저장."""
+        x1, y1, x2, y2 = coords
+        box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        if self.boxes.get(key) == box:
+            return
+        self.remove(key)
+        self.boxes[key] = box
+        for cell in self._cells_of(box):
+            self.cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        box = self.boxes.pop(key, None)
+        if box is None:
+            return
+        for cell in self._cells_of(box):
+            keys = self.cells.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.cells[cell]
+
+    def clear(self):
+        self.cells.clear()
+        self.boxes.clear()
+
+    def query_point(self, x, y):
+        """(x, y)를 포함하는 박스 중 가장 안쪽(면적이 가장 작은) 박스의 key 반환. 없으면 None."""
+        keys = self.cells.get((int(x // self.cell_size), int(y // self.cell_size)))
+        if not keys:
+            return None
+        best_key = None
+        best_area = None
+        for key in keys:
+            x1, y1, x2, y2 = self.boxes[key]
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                area = (x2 - x1) * (y2 - y1)
+                if best_area is None or area < best_area:
+                    best_key = key
+                    best_area = area
+        return best_key
+
+    def query_rect(self, x1, y1, x2, y2):
+        """주어진 영역과 겹치는 모든 key 집합 반환."""
+        box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        candidates = set()
+        for cell in self._cells_of(box):
+            candidates.update(self.cells.get(cell, ()))
+
+        found = set()
+        for key in candidates:
+            bx1, by1, bx2, by2 = self.boxes[key]
+            if not (bx2 < box[0] or bx1 > box[2] or by2 < box[1] or by1 > box[3]):
+                found.add(key)
+        return found
+
+
+class PositionIndex:
+    """id -> 리스트 인덱스. 중간에 넣거나 뺄 때 뒤 항목의 번호를 바로 고치지 않고 편집 기록(log)에 남긴다.
+
+    조회할 때 그 항목의 번호를 매긴 뒤의 편집만 반영하고 결과를 다시 저장하므로, 삽입/삭제는 O(1),
+    조회는 O(밀린 편집 수)이다. 편집이 LOG_LIMIT개 쌓이면 전체 번호를 다시 매긴다 (편집당 O(N / LOG_LIMIT)).
+    """
+
+    LOG_LIMIT = 256
+
+    __slots__ = ("items", "positions", "stamps", "log")
+
+    def __init__(self, items):
+        self.items = items    # id 속성이 있는 항목 리스트 (문서의 nodes/connections와 같은 객체)
+        self.positions = {}   # id -> 인덱스 (stamps의 시점 기준)
+        self.stamps = {}      # id -> 번호를 매긴 시점 (len(log)), 없으면 0
+        self.log = []         # (인덱스, +1 삽입 | -1 삭제)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, item_id):
+        return item_id in self.positions
+
+    def __getitem__(self, item_id):
+        position = self.get(item_id)
+        if position is None:
+            raise KeyError(item_id)
+        return position
+
+    def get(self, item_id, default=None):
+        position = self.positions.get(item_id)
+        if position is None:
+            return default
+        stamp = self.stamps.get(item_id, 0)
+        if stamp < len(self.log):
+            for index, delta in self.log[stamp:]:
+                if position >= index + (delta < 0):
+                    position += delta
+            self.positions[item_id] = position
+            self.stamps[item_id] = len(self.log)
+        return position
+
+    def rebuild(self):
+        """리스트 전체로 다시 생성. id가 겹치면 앞 항목이 남는다."""
+        self.positions.clear()
+        self.stamps.clear()
+        self.log.clear()
+        for i in range(len(self.items) - 1, -1, -1):
+            self.positions[self.items[i].id] = i
+
+    def inserted(self, index, item):
+        """items의 index에 item을 넣은 뒤 호출."""
+        if index < len(self.items) - 1:  # 끝에 추가하면 다른 항목의 번호는 그대로
+            self.record(index, 1)
+        self.positions[item.id] = index
+        self.stamps[item.id] = len(self.log)
+
+    def removed(self, index, item):
+        """items의 index에서 item을 뺀 뒤 호출."""
+        self.positions.pop(item.id, None)
+        self.stamps.pop(item.id, None)
+        if index < len(self.items):
+            self.record(index, -1)
+
+    def record(self, index, delta):
+        if len(self.log) >= self.LOG_LIMIT:
+            self.rebuild()
+        else:
+            self.log.append((index, delta))
+
+
+class ContainmentTree:
+    """노드 간 부모-자식(포함) 관계를 공간 인덱스를 이용해 점진적으로 유지.
+
+    부모는 자식 박스를 완전히 포함하는 노드 중 가장 작은 노드이다. 박스가 완전히 같으면
+    노드 목록에서 앞에 있는 노드가 부모가 된다. 노드 하나가 바뀌면 그 노드, 기존 자식들,
+    새 박스와 겹치는 노드만 다시 계산한다.
+    """
+
+    def __init__(self, grid, positions, lookup):
+        self.grid = grid            # SpatialGrid (노드 박스의 원본)
+        self.positions = positions  # node id -> 노드 목록 인덱스 (동일 박스의 순서 결정용)
+        self.lookup = lookup        # node id -> Node (parent_id 필드 동기화용)
+        self.parents = {}           # node id -> parent id 또는 None
+        self.children = {}          # node id -> 자식 id 집합
+
+    def find_parent(self, node_id):
+        """node_id를 포함하는 가장 작은 노드의 id 반환."""
+        box = self.grid.boxes[node_id]
+        x1, y1, x2, y2 = box
+        best_id = None
+        best_area = None
+        for candidate in self.grid.query_rect(x1, y1, x2, y2):
+            if candidate == node_id:
+                continue
+            px1, py1, px2, py2 = cbox = self.grid.boxes[candidate]
+            if not (px1 <= x1 and py1 <= y1 and x2 <= px2 and y2 <= py2):
+                continue
+            if cbox == box and self.positions[candidate] > self.positions[node_id]:
+                continue  # 같은 박스끼리는 앞 노드만 부모가 될 수 있음 (순환 방지)
+            area = (px2 - px1) * (py2 - py1)
+            if best_area is None or area < best_area or (
+                    area == best_area and self.positions[candidate] > self.positions[best_id]):
+                best_id = candidate
+                best_area = area
+        return best_id
+
+    def _set_parent(self, node_id, parent_id):
+        old_parent = self.parents.get(node_id)
+        if node_id in self.parents and old_parent == parent_id:
+            return
+        if old_parent is not None:
+            self.children[old_parent].discard(node_id)
+        if parent_id is not None:
+            self.children.setdefault(parent_id, set()).add(node_id)
+        self.parents[node_id] = parent_id
+        self.lookup(node_id).parent_id = parent_id
+
+    def update(self, node_id):
+        """node_id의 박스가 생성/이동/크기 변경된 뒤 호출 (공간 인덱스는 먼저 갱신되어 있어야 함)."""
+        affected = {node_id}
+        affected.update(self.children.get(node_id, ()))
+        affected.update(self.grid.query_rect(*self.grid.boxes[node_id]))
+        for affected_id in affected:
+            self._set_parent(affected_id, self.find_parent(affected_id))
+
+    def remove(self, node_id):
+        """노드 삭제 (공간 인덱스에서 먼저 제거된 상태여야 함). 자식들은 새 부모를 찾는다."""
+        orphans = self.children.pop(node_id, set())
+        parent_id = self.parents.pop(node_id, None)
+        if parent_id is not None:
+            self.children[parent_id].discard(node_id)
+        for child_id in orphans:
+            self.parents[child_id] = None
+            self.lookup(child_id).parent_id = None
+            self._set_parent(child_id, self.find_parent(child_id))
+
+    def rebuild(self, node_ids):
+        self.parents.clear()
+        self.children.clear()
+        for node_id in node_ids:
+            self._set_parent(node_id, self.find_parent(node_id))
+
+    def restore(self, node_ids):
+        """노드의 parent_id를 그대로 관계로 사용 (이전에 계산해 둔 관계를 사이드카 캐시에서 불러올 때)."""
+        self.parents.clear()
+        self.children.clear()
+        for node_id in node_ids:
+            parent_id = self.lookup(node_id).parent_id
+            self.parents[node_id] = parent_id
+            if parent_id is not None:
+                self.children.setdefault(parent_id, set()).add(node_id)
+
+    def build_components(self, node_ids):
+        """저장용 중첩 "components" 리스트 생성. 형제 순서는 노드 목록 순서를 따른다."""
+        def make_entry(node_id):
+            node = self.lookup(node_id)
+            return {
+                "id": node.id,
+                "coords": node.coords,
+                "text": node.text,
+                "parent_id": self.parents.get(node_id),
+                "node": []
+            }
+
+        components = []
+        stack = []
+        for node_id in node_ids:
+            if self.parents.get(node_id) is None:
+                entry = make_entry(node_id)
+                components.append(entry)
+                stack.append((node_id, entry))
+
+        # 재귀 대신 명시적 스택으로 자식 채우기 (깊은 중첩 대비)
+        while stack:
+            node_id, entry = stack.pop()
+            for child_id in sorted(self.children.get(node_id, ()), key=self.positions.__getitem__):
+                child_entry = make_entry(child_id)
+                entry["node"].append(child_entry)
+                stack.append((child_id, child_entry))
+        return components
+
+
+def iter_nested_nodes(node_list, parent_id=None):
+    """중첩된 "node" 리스트를 전위 순서로 (노드 dict, parent id)로 평탄화. 재귀 대신 명시적 스택 사용."""
+    stack = [(iter(node_list), parent_id)]
+    while stack:
+        nodes, parent = stack[-1]
+        node = next(nodes, _END)
+        if node is _END:
+            stack.pop()
+            continue
+        yield node, parent
+        if isinstance(node.get("node"), list):
+            stack.append((iter(node["node"]), node["id"]))
+
+
+_END = object()
+
+
+LAYOUT_NODE_SIZE = (100, 50)  # 좌표 없는 말단 노드 크기 (원본 이미지 좌표계)
+LAYOUT_GAP = 20               # 배치한 박스 사이 간격
+LAYOUT_MARGIN = 50            # 이미지 가장자리 여백
+LAYOUT_PADDING = 10           # 부모 박스 안쪽 여백 (위쪽은 라벨 자리로 두 배)
+
+
+def shelf_arrange(sizes, max_width, gap):
+    """(폭, 높이) 리스트를 폭 max_width인 선반(shelf)에 차례로 놓음. ([(dx, dy)], 전체 폭, 전체 높이) 반환."""
+    positions = []
+    x = y = row_height = content_width = 0
+    for width, height in sizes:
+        if x > 0 and x + width > max_width:
+            x = 0
+            y += row_height + gap
+            row_height = 0
+        positions.append((x, y))
+        x += width + gap
+        row_height = max(row_height, height)
+        content_width = max(content_width, x - gap)
+    return positions, content_width, y + row_height
+
+
+def place_blocks(blocks, sizes, bounds, grid, gap, allow_overflow, ignore=()):
+    """blocks를 bounds 안에 선반 단위로 놓으면서 grid의 박스와 겹치는 자리는 건너뜀.
+
+    겹치는 박스가 있으면 그 오른쪽 끝으로 이동하고, 선반에 아무 것도 놓지 못했으면 가장 먼저 끝나는 박스
+    아래로 내려간다. 놓은 블록은 grid에 추가한다. ([(노드, x, y)], 놓지 못한 블록 리스트) 반환.
+    allow_overflow가 False이면 bounds를 벗어나는 첫 블록에서 멈춘다.
+    """
+    x1, y1, x2, y2 = bounds
+    x, y = x1, y1
+    row_height = 0
+    blocked_bottom = None  # 현재 선반에서 건너뛴 박스 중 가장 위쪽 아래 변
+    placed = []
+    boxes = grid.boxes
+    for index, node in enumerate(blocks):
+        width, height = sizes[node]
+        while True:
+            if x > x1 and x + width > x2:
+                if row_height:
+                    y += row_height + gap
+                elif blocked_bottom is not None:
+                    y = blocked_bottom + gap
+                x, row_height, blocked_bottom = x1, 0, None
+            if not allow_overflow and (x + width > x2 or y + height > y2):
+                return placed, blocks[index:]
+            hits = [boxes[key] for key in grid.query_rect(x, y, x + width, y + height) if key not in ignore]
+            if not hits:
+                break
+            # 겹친 박스의 오른쪽 끝은 항상 x보다 크므로 매번 앞으로 진행한다
+            x = max(box[2] for box in hits) + gap
+            bottom = min(box[3] for box in hits)
+            blocked_bottom = bottom if blocked_bottom is None else min(blocked_bottom, bottom)
+        placed.append((node, x, y))
+        grid.insert(node, (x, y, x + width, y + height))
+        x += width + gap
+        row_height = max(row_height, height)
+    return placed, []
+
+
+def layout_nodes(pending, fixed, width, height=None):
+    """좌표가 없는 노드(pending, 전위 순서)에 겹치지 않는 좌표를 지정. fixed는 좌표가 있는 노드의 id -> 박스.
+
+    중첩된 노드는 부모 박스 안에 자식들을 선반 배치해서, 좌표로 다시 계산한 포함 관계가 JSON 중첩과 같게 한다.
+    좌표가 있는 부모의 자식은 그 부모 박스 안에, 나머지 최상위 블록은 이미지 영역(width x height) 안에
+    공간 인덱스로 기존 박스를 피해 놓는다. 이미지 높이를 넘으면 크기를 줄여 다시 배치한다.
+    """
+    pending_ids = {node.id for node in pending}
+    children = {}
+    roots = []
+    hosted = {}  # 좌표가 있는 부모 id -> 그 안에 놓을 노드
+    for node in pending:
+        if node.parent_id in pending_ids:
+            children.setdefault(node.parent_id, []).append(node)
+        elif node.parent_id in fixed:
+            hosted.setdefault(node.parent_id, []).append(node)
+        else:
+            roots.append(node)
+
+    grid = SpatialGrid()
+    for node_id, box in fixed.items():
+        grid.insert(("fixed", node_id), box)
+    bottom = height - LAYOUT_MARGIN if height is not None else float("inf")
+    bounds = (LAYOUT_MARGIN, LAYOUT_MARGIN, max(width - LAYOUT_MARGIN, LAYOUT_MARGIN), bottom)
+
+    scale = 1.0
+    for attempt in range(4):
+        last = height is None or attempt == 3
+        sizes, offsets = measure_blocks(pending, children, scale)
+        gap = scaled(LAYOUT_GAP, scale)
+        padding = scaled(LAYOUT_PADDING, scale)
+        placed = []
+        overflow = []
+        for host_id, blocks in hosted.items():
+            host = grid.boxes[("fixed", host_id)]
+            inner = (host[0] + padding, host[1] + 2 * padding, host[2] - padding, host[3] - padding)
+            # 부모 자신과 부모를 감싸는 박스는 장애물이 아님
+            ignore = {key for key in grid.query_rect(*host) if contains(grid.boxes[key], host)}
+            host_placed, rest = place_blocks(blocks, sizes, inner, grid, gap // 2, False, ignore)
+            placed.extend(host_placed)
+            overflow.extend(rest)
+        root_placed, rest = place_blocks(roots + overflow, sizes, bounds, grid, gap, last)
+        placed.extend(root_placed)
+        if not rest:
+            break
+        for node, _, _ in placed:
+            grid.remove(node)
+        scale *= 0.5
+
+    for node, x, y in placed:
+        stack = [(node, x, y)]
+        while stack:
+            node, x, y = stack.pop()
+            node_width, node_height = sizes[node]
+            node.coords = (x, y, x + node_width, y + node_height)
+            for child in children.get(node.id, ()):
+                dx, dy = offsets[child]
+                stack.append((child, x + dx, y + dy))
+
+
+def measure_blocks(pending, children, scale):
+    """자식부터 거꾸로 올라가며 각 노드 블록의 (폭, 높이)와 부모 기준 자식 위치를 계산."""
+    leaf_width, leaf_height = scaled(LAYOUT_NODE_SIZE[0], scale), scaled(LAYOUT_NODE_SIZE[1], scale)
+    gap = scaled(LAYOUT_GAP, scale) // 2
+    padding = scaled(LAYOUT_PADDING, scale)
+    sizes = {}
+    offsets = {}
+    for node in reversed(pending):
+        kids = children.get(node.id)
+        if not kids:
+            sizes[node] = (leaf_width, leaf_height)
+            continue
+        kid_sizes = [sizes[kid] for kid in kids]
+        area = sum(kid_width * kid_height for kid_width, kid_height in kid_sizes)
+        # 자식 묶음이 가로로 조금 긴 직사각형이 되도록 선반 폭을 정함
+        max_width = max(max(kid_width for kid_width, _ in kid_sizes), math.sqrt(area) * 1.5)
+        positions, content_width, content_height = shelf_arrange(kid_sizes, max_width, gap)
+        for kid, (dx, dy) in zip(kids, positions):
+            offsets[kid] = (padding + dx, 2 * padding + dy)
+        sizes[node] = (max(content_width + 2 * padding, leaf_width), content_height + 3 * padding)
+    return sizes, offsets
+
+
+def scaled(value, scale):
+    """배치 크기를 정수 좌표로 축소 (JSON에 정수 좌표로 저장되도록)."""
+    return max(1, int(value * scale))
+
+
+def contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+
+class DocumentBuilder:
+    """JSON 노드/연결 dict를 하나씩 받아 AnnotationDocument를 만듦 (from_data와 스트리밍 로더가 공유).
+
+    노드는 전위 순서(부모가 자식보다 먼저)로 넣는다. 좌표가 없는 노드는 finish에서 layout_nodes로
+    layout_width x layout_height (높이를 모르면 폭만) 영역 안에 한꺼번에 배치한다.
+    """
+
+    def __init__(self, layout_width, layout_height=None):
+        self.layout_width = layout_width
+        self.layout_height = layout_height
+        self.nodes = []
+        self.connections = []
+        self.pending = []          # 좌표를 배치할 노드 (전위 순서)
+        self.pending_data = []     # 배치한 좌표를 돌려줄 JSON dict
+        self.placed = False        # 좌표를 배치한 노드가 있는지 (결과가 배치 영역에 따라 달라짐)
+
+    def add_node(self, node, parent_id=None):
+        coords = node.get("coords")
+        record = Node(node["id"], coords or (0, 0, 0, 0), node["text"], parent_id)
+        if not coords:
+            self.pending.append(record)
+            self.pending_data.append(node)
+            self.placed = True
+        self.nodes.append(record)
+
+    def add_connection(self, connection):
+        self.connections.append(Connection.from_json(connection))
+
+    def finish(self, summary=None, file_name=None):
+        """좌표가 없는 노드를 배치하고, id가 없는 연결에 id를 생성해서 문서 생성."""
+        if self.pending:
+            pending = set(map(id, self.pending))
+            fixed = {node.id: node.coords for node in self.nodes if id(node) not in pending}
+            layout_nodes(self.pending, fixed, self.layout_width, self.layout_height)
+            for record, node in zip(self.pending, self.pending_data):
+                node["coords"] = record.coords
+            self.pending = []
+            self.pending_data = []
+        # 같은 파일은 항상 같은 id를 받도록 고정 시드 사용 (저널 복구 시 id가 일치해야 함)
+        existing_ids = {connection.id for connection in self.connections if connection.id}
+        rng = random.Random(0)
+        for connection in self.connections:
+            if not connection.id:
+                connection.id = generate_unique_id(existing_ids, rng)
+                existing_ids.add(connection.id)
+        return AnnotationDocument(self.nodes, self.connections, summary, file_name)
+
+
+class AnnotationDocument:
+    """노드/연결 목록과 id, 공간, 인접, 포함 관계 인덱스를 함께 유지하는 어노테이션 문서.
+
+    노드/연결 추가, 이동, 삭제, 속성 변경은 이 클래스의 메서드를 통해야 인덱스가 맞게 유지된다.
+    각 편집은 JSON으로 저장 가능한 연산 dict와, 그 편집을 되돌리는 연산 리스트로 observers에 알려진다.
+    연산은 apply_op로 다른 문서에 재생하거나(저널 복구) 되돌리기에 사용한다.
+    """
+
+    def __init__(self, nodes=(), connections=(), summary=None, file_name=None, restore_parents=False):
+        self.nodes = list(nodes)
+        self.connections = list(connections)
+        self.summary = summary
+        self.file_name = file_name  # 불러온 JSON의 file_name (이미지를 찾지 못했을 때 저장용)
+        self.observers = []       # observer(op, inverse_ops) 콜백 (복사본에는 전달되지 않음)
+        self.node_map = {}        # node id -> Node
+        self.node_positions = PositionIndex(self.nodes)  # node id -> self.nodes 인덱스
+        self.adjacency = {}       # node id -> 해당 노드에 연결된 Connection 리스트
+        self.connection_map = {}  # connection id -> Connection
+        self.connection_positions = PositionIndex(self.connections)  # connection id -> self.connections 인덱스
+        self.grid = SpatialGrid()
+        self.containment = ContainmentTree(self.grid, self.node_positions, self.node_map.__getitem__)
+        self.rebuild_indexes(restore_parents)
+
+    @classmethod
+    def from_data(cls, data, layout_width, layout_height=None):
+        """JSON 데이터로 문서 생성.
+
+        중첩된 "node" 리스트는 평탄화하고 parent_id를 기록한다. 좌표가 없는 노드는 layout_width x layout_height
+        영역 안에 겹치지 않게 배치하고, id가 없는 연결에는 id를 생성한다.
+        """
+        builder = DocumentBuilder(layout_width, layout_height)
+        for node, parent_id in iter_nested_nodes(data.get("components", [])):
+            builder.add_node(node, parent_id)
+        for connection in data.get("connections", []):
+            builder.add_connection(connection)
+        return builder.finish(data.get("summary"), data.get("file_name"))
+
+    @classmethod
+    def load(cls, json_path, layout_width, layout_height=None):
+        return cls.from_data(load_annotation_json(json_path), layout_width, layout_height)
+
+    def to_data(self, file_name):
+        """저장할 JSON 데이터 생성. summary가 있으면 맨 앞에 둔다."""
+        data = {
+            "file_name": file_name,                       # 현재 이미지 파일명
+            "node_count": len(self.nodes),                # node 개수
+            "connection_count": len(self.connections),    # connection 개수
+            "components": self.containment.build_components([node.id for node in self.nodes]),
+            "connections": [connection.to_json() for connection in self.connections]
+        }
+
+        # 기존 summary 값을 먼저 추가
+        if self.summary is not None:
+            ordered_data = {"summary": self.summary}
+            ordered_data.update(data)  # 나머지 데이터를 추가
+            return ordered_data
+        return data
+
+    def save(self, json_path, file_name):
+        write_json_atomic(json_path, self.to_data(file_name))
+
+    def copy(self):
+        """노드/연결을 복사한 독립적인 문서 (캐시된 문서를 편집용으로 꺼낼 때 사용)."""
+        return AnnotationDocument([node.copy() for node in self.nodes],
+                                  [connection.copy() for connection in self.connections], self.summary, self.file_name)
+
+    # 인덱스 관리
+
+    def rebuild_indexes(self, restore_parents=False):
+        """노드/연결 전체로 모든 인덱스를 다시 생성 (로드 시). restore_parents이면 노드의 parent_id를 그대로 사용."""
+        self.node_map.clear()
+        self.node_positions.rebuild()
+        self.grid.clear()
+        for node in self.nodes:
+            self.node_map[node.id] = node
+            self.grid.insert(node.id, node.coords)
+        if restore_parents:
+            self.containment.restore([node.id for node in self.nodes])
+        else:
+            self.containment.rebuild([node.id for node in self.nodes])
+
+        self.adjacency.clear()
+        self.connection_map.clear()
+        for connection in self.connections:
+            self.link_connection(connection)
+        self.connection_positions.rebuild()
+
+    def link_connection(self, connection):
+        self.connection_map[connection.id] = connection
+        self.adjacency.setdefault(connection.from_id, []).append(connection)
+        if connection.to_id != connection.from_id:
+            self.adjacency.setdefault(connection.to_id, []).append(connection)
+
+    def unlink_connection(self, connection):
+        if self.connection_map.get(connection.id) is connection:
+            del self.connection_map[connection.id]
+        for node_id in (connection.from_id, connection.to_id):
+            incident = self.adjacency.get(node_id, [])
+            for i, other in enumerate(incident):
+                if other is connection:
+                    del incident[i]
+                    break
+
+    # 조회
+
+    def node_index(self, node_id):
+        return self.node_positions.get(node_id)
+
+    def node_at(self, x, y):
+        """원본 이미지 좌표 (x, y)를 포함하는 가장 안쪽 노드의 인덱스. 없으면 None."""
+        node_id = self.grid.query_point(x, y)
+        if node_id is None:
+            return None
+        return self.node_positions.get(node_id)
+
+    def incident_connections(self, node_id):
+        return self.adjacency.get(node_id, ())
+
+    def new_node_id(self):
+        node_id = str(uuid.uuid4())[:3]
+        while node_id in self.node_map:
+            node_id = str(uuid.uuid4())[:3]
+        return node_id
+
+    def connection_index(self, connection_id):
+        return self.connection_positions.get(connection_id)
+
+    def new_connection_id(self):
+        connection_id = str(uuid.uuid4())[:3]
+        while connection_id in self.connection_map:
+            connection_id = str(uuid.uuid4())[:3]
+        return connection_id
+
+    # 편집
+
+    def notify(self, op, inverse):
+        for observer in self.observers:
+            observer(op, inverse)
+
+    def add_node(self, node, index=None):
+        """노드 추가. index를 주면 그 위치에 삽입 (삭제 되돌리기용)."""
+        if index is None or index >= len(self.nodes):
+            index = len(self.nodes)
+            self.nodes.append(node)
+        else:
+            self.nodes.insert(index, node)
+        self.node_positions.inserted(index, node)
+        self.node_map[node.id] = node
+        self.grid.insert(node.id, node.coords)
+        self.containment.update(node.id)
+        if self.observers:
+            self.notify({"op": "add_node", "index": index, "node": {"id": node.id, "coords": node.coords, "text": node.text}},
+                        [{"op": "remove_node", "id": node.id}])
+
+    def set_node_coords(self, node, coords):
+        """노드 이동/크기 변경. 공간 인덱스와 부모-자식 관계를 점진적으로 갱신."""
+        old_coords = node.coords
+        node.coords = coords
+        self.grid.insert(node.id, coords)
+        self.containment.update(node.id)
+        if self.observers:
+            self.notify({"op": "set_node_coords", "id": node.id, "coords": node.coords},
+                        [{"op": "set_node_coords", "id": node.id, "coords": old_coords}])
+
+    def set_node_text(self, node, text):
+        old_text = node.text
+        node.text = text
+        if self.observers:
+            self.notify({"op": "set_node_text", "id": node.id, "text": text},
+                        [{"op": "set_node_text", "id": node.id, "text": old_text}])
+
+    def scale_nodes(self, scale_factor):
+        """모든 노드를 각자의 중심 기준으로 확대/축소. 관계는 전체 재계산."""
+        old_coords = [[node.id, node.coords] for node in self.nodes] if self.observers else None
+        for node in self.nodes:
+            x1, y1, x2, y2 = node.coords
+            center_x = (x1 + x2) / 2
+            center_y = (y1 + y2) / 2
+            width = (x2 - x1) * scale_factor
+            height = (y2 - y1) * scale_factor
+            node.coords = (
+                center_x - width / 2,
+                center_y - height / 2,
+                center_x + width / 2,
+                center_y + height / 2,
+            )
+            self.grid.insert(node.id, node.coords)
+        self.containment.rebuild([node.id for node in self.nodes])
+        if self.observers:
+            # 배율을 역으로 곱하면 부동소수 오차가 남으므로 원래 좌표를 그대로 복원
+            self.notify({"op": "scale_nodes", "factor": scale_factor}, [{"op": "set_coords", "coords": old_coords}])
+
+    def set_coords(self, coords):
+        """[(node id, 좌표), ...]로 여러 노드 좌표를 한 번에 변경. 관계는 전체 재계산."""
+        old_coords = []
+        for node_id, node_coords in coords:
+            node = self.node_map[node_id]
+            old_coords.append([node_id, node.coords])
+            node.coords = node_coords
+            self.grid.insert(node_id, node.coords)
+        self.containment.rebuild([node.id for node in self.nodes])
+        if self.observers:
+            self.notify({"op": "set_coords", "coords": [[node_id, tuple(c)] for node_id, c in coords]},
+                        [{"op": "set_coords", "coords": old_coords}])
+
+    def remove_node_at(self, index):
+        """노드와 연결된 선들을 삭제하고 (노드, 삭제된 연결 리스트)를 반환.
+
+        연결은 인접 리스트로 찾아 connection_positions의 위치로 지우고, 뒤 항목의 인덱스는 PositionIndex가
+        조회할 때 고치므로 O(차수)이다 (리스트 원소를 당기는 memmove는 남는다).
+        """
+        node = self.nodes.pop(index)
+        del self.node_map[node.id]
+        self.node_positions.removed(index, node)
+        self.grid.remove(node.id)
+        self.containment.remove(node.id)
+
+        incident = self.adjacency.pop(node.id, [])
+        removed_indices = []
+        for connection in incident:
+            self.unlink_connection(connection)
+            i = self.connection_positions.get(connection.id)
+            if i is None or self.connections[i] is not connection:
+                # id가 겹치는 연결 (파일에 같은 id가 두 번 있는 경우)
+                i = next(j for j, other in enumerate(self.connections) if other is connection)
+            removed_indices.append((i, connection))
+        removed_indices.sort(key=lambda entry: entry[0])
+        for i, conn in reversed(removed_indices):
+            del self.connections[i]
+            self.connection_positions.removed(i, conn)
+        if self.observers:
+            # 되돌리기: 노드를 원래 위치에 넣고, 함께 지운 연결을 원래 순서대로 다시 삽입
+            inverse = [{"op": "add_node", "index": index, "node": {"id": node.id, "coords": node.coords, "text": node.text}}]
+            inverse.extend({"op": "add_connection", "index": i, "connection": conn.to_json()} for i, conn in removed_indices)
+            self.notify({"op": "remove_node", "id": node.id, "connections": [conn.id for conn in incident]}, inverse)
+        return node, incident
+
+    def add_connection(self, connection, index=None):
+        """연결 추가. index를 주면 그 위치에 삽입 (삭제 되돌리기용)."""
+        if index is None or index >= len(self.connections):
+            index = len(self.connections)
+            self.connections.append(connection)
+        else:
+            self.connections.insert(index, connection)
+        self.connection_positions.inserted(index, connection)
+        self.link_connection(connection)
+        if self.observers:
+            self.notify({"op": "add_connection", "index": index, "connection": connection.to_json()},
+                        [{"op": "remove_connection", "index": index, "id": connection.id}])
+
+    def update_connection(self, connection, **fields):
+        """연결 속성(text, type, direction, color) 변경."""
+        old_fields = {name: getattr(connection, name) for name in fields}
+        for name, value in fields.items():
+            setattr(connection, name, value)
+        if self.observers:
+            self.notify({"op": "update_connection", "id": connection.id, "fields": fields},
+                        [{"op": "update_connection", "id": connection.id, "fields": old_fields}])
+
+    def remove_connection_at(self, index):
+        connection = self.connections.pop(index)
+        self.connection_positions.removed(index, connection)
+        self.unlink_connection(connection)
+        if self.observers:
+            self.notify({"op": "remove_connection", "index": index, "id": connection.id},
+                        [{"op": "add_connection", "index": index, "connection": connection.to_json()}])
+        return connection
+
+    def apply_op(self, op):
+        """notify로 전달된 연산 dict를 이 문서에 재생 (저널 복구, 백그라운드 저장용 사본 갱신, 되돌리기)."""
+        kind = op["op"]
+        if kind == "add_node":
+            node = op["node"]
+            self.add_node(Node(node["id"], node["coords"], node["text"]), op.get("index"))
+        elif kind == "set_node_coords":
+            self.set_node_coords(self.node_map[op["id"]], op["coords"])
+        elif kind == "set_node_text":
+            self.set_node_text(self.node_map[op["id"]], op["text"])
+        elif kind == "scale_nodes":
+            self.scale_nodes(op["factor"])
+        elif kind == "set_coords":
+            self.set_coords(op["coords"])
+        elif kind == "remove_node":
+            self.remove_node_at(self.node_positions[op["id"]])
+        elif kind == "add_connection":
+            self.add_connection(Connection.from_json(op["connection"]), op.get("index"))
+        elif kind == "update_connection":
+            connection = self.connection_map.get(op["id"])
+            if connection is None:
+                connection = self.connections[self.connection_index(op["id"])]
+            self.update_connection(connection, **op["fields"])
+        elif kind == "remove_connection":
+            index = op["index"]
+            if index >= len(self.connections) or self.connections[index].id != op["id"]:
+                index = self.connection_index(op["id"])
+            self.remove_connection_at(index)
+        else:
+            raise ValueError(f"unknown operation: {kind}")
@@ -0,0 +1,170 @@
+"""AnT 프레임 스케줄러 (Tk 없이 사용 가능, root는 after/after_cancel만 있으면 된다).
+
+핸들러는 캔버스를 직접 다시 그리지 않고 바뀐 것(뷰, 노드/연결 id, 목록, 이름 붙은 작업)을 표시만 한다.
+스케줄러는 표시가 처음 생길 때 after 타이머를 하나 걸고, 다음 프레임 시각에 모인 변경을 render 콜백으로
+한 번에 넘긴다. 그래서 마우스 이동 이벤트가 몰려도 프레임마다 최대 한 번만 그린다.
+늦게 실행된 프레임과 건너뛴 프레임 수, 요청부터 그릴 때까지의 지연 시간을 FrameStats에 기록한다.
+"""
+import time
+
+from ant_metrics import FRAME_BUDGET
+
+
+class FrameUpdate:
+    """한 프레임에 반영할 변경 표시.
+
+    view는 뷰 변환(이동/확대/창 크기/이미지), full은 모든 아이템, nodes/connections는 해당 id의 아이템,
+    rows는 목록 전체 갱신, tasks는 이름 -> 콜백 (같은 이름은 마지막 콜백만 실행).
+    """
+
+    __slots__ = ("view", "full", "nodes", "connections", "rows", "tasks")
+
+    def __init__(self):
+        self.view = False
+        self.full = False
+        self.nodes = set()
+        self.connections = set()
+        self.rows = False
+        self.tasks = {}
+
+
+class FrameStats:
+    """프레임 요청/실행 횟수. late는 예정보다 한 프레임 이상 늦게 시작한 프레임, dropped는 그 때문에 또는
+    렌더링이 길어져서 건너뛴 프레임 수."""
+
+    __slots__ = ("requests", "coalesced", "frames", "late", "dropped", "total_latency", "max_latency")
+
+    def __init__(self):
+        self.requests = 0
+        self.coalesced = 0
+        self.frames = 0
+        self.late = 0
+        self.dropped = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "frames": self.frames,
+            "late": self.late,
+            "dropped": self.dropped,
+            "mean_latency_ms": self.total_latency * 1000 / self.frames if self.frames else 0.0,
+            "max_latency_ms": self.max_latency * 1000
+        }
+
+
+class FrameScheduler:
+    """변경 표시를 모아 프레임(interval초)당 최대 한 번 render(FrameUpdate)를 호출.
+
+    metrics(Instrumentation)가 켜져 있으면 요청부터 렌더링 완료까지의 지연 시간을 "frame_latency"로 기록한다.
+    """
+
+    def __init__(self, root, render, interval=FRAME_BUDGET, metrics=None):
+        self.root = root
+        self.render = render
+        self.interval = interval
+        self.metrics = metrics
+        self.pending = FrameUpdate()
+        self.stats = FrameStats()
+        self.timer = None
+        self.requested_at = None  # 현재 프레임에 첫 변경이 표시된 시각
+        self.due = None           # 현재 프레임 예정 시각
+        self.last_frame = None    # 마지막 프레임 시작 시각
+        self.rendering = False
+
+    # 변경 표시
+
+    def mark_view(self):
+        self.pending.view = True
+        self.request()
+
+    def mark_all(self):
+        self.pending.full = True
+        self.request()
+
+    def mark_nodes(self, node_ids):
+        self.pending.nodes.update(node_ids)
+        self.request()
+
+    def mark_connections(self, connection_ids):
+        self.pending.connections.update(connection_ids)
+        self.request()
+
+    def mark_rows(self):
+        self.pending.rows = True
+        self.request()
+
+    def mark_task(self, name, callback):
+        """다음 프레임에 callback() 실행. 프레임 전에 같은 이름으로 다시 표시하면 마지막 callback만 실행."""
+        self.pending.tasks[name] = callback
+        self.request()
+
+    def reset_stats(self):
+        self.stats = FrameStats()
+
+    # 타이머
+
+    @property
+    def scheduled(self):
+        return self.timer is not None
+
+    def request(self):
+        """다음 프레임 타이머를 건다. 이미 걸려 있으면 이번 요청은 그 프레임에 합쳐진다."""
+        self.stats.requests += 1
+        if self.timer is not None or self.rendering:
+            self.stats.coalesced += 1
+            return
+        self.schedule()
+
+    def schedule(self):
+        now = time.perf_counter()
+        self.requested_at = now
+        # 직전 프레임에서 한 프레임 간격이 지나기 전에는 그리지 않음
+        self.due = now if self.last_frame is None else max(now, self.last_frame + self.interval)
+        self.timer = self.root.after(int(round((self.due - now) * 1000)), self.run)
+
+    def cancel(self):
+        """예약된 프레임과 표시된 변경을 버림 (창을 닫을 때)."""
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+        self.pending = FrameUpdate()
+
+    def flush(self):
+        """예약된 프레임을 기다리지 않고 바로 실행 (드래그 종료처럼 결과를 즉시 보여야 할 때)."""
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.run()
+
+    def run(self):
+        self.timer = None
+        start = time.perf_counter()
+        stats = self.stats
+        lateness = start - self.due
+        if lateness > self.interval:
+            stats.late += 1
+            stats.dropped += int(lateness // self.interval)
+
+        update, self.pending = self.pending, FrameUpdate()
+        self.rendering = True
+        try:
+            self.render(update)
+        finally:
+            self.rendering = False
+            end = time.perf_counter()
+            self.last_frame = start
+            stats.frames += 1
+            stats.dropped += int((end - start) // self.interval)  # 렌더링이 길어서 지나간 프레임
+            latency = end - self.requested_at
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+            if self.metrics is not None and self.metrics.enabled:
+                self.metrics.record("frame_latency", latency)
+            if has_changes(self.pending):
+                self.schedule()  # 렌더링 중에 표시된 변경은 다음 프레임에 반영
+
+
+def has_changes(update):
+    return update.view or update.full or update.rows or bool(update.nodes or update.connections or update.tasks)
@@ -0,0 +1,244 @@
+"""AnT 데이터셋 전문 검색 색인 (Tk/PIL 없이 사용 가능, SQLite FTS5 필요).
+
+디렉터리마다 .ant_search.sqlite에 노드 텍스트, 연결 텍스트/타입, 문서의 file_name을 FTS5로 색인한다.
+refresh는 JSON의 mtime/크기가 바뀐 파일만 다시 색인하고, 편집기는 파일을 저장할 때마다 update_file로 그 파일만 갱신한다.
+색인은 JSON에서 언제든 다시 만들 수 있는 캐시이므로 지워도 안전하다.
+
+검색어는 공백으로 나눈 단어를 모두 포함(접두어 일치)하는 항목을 찾는다. "type:dashed"처럼 열 이름을 붙이면
+그 열(text, type, file_name)에서만 찾는다.
+"""
+import os
+import sqlite3
+
+from ant_stream import iter_annotation
+
+
+INDEX_NAME = ".ant_search.sqlite"
+SCHEMA_VERSION = 1
+COLUMNS = ("text", "type", "file_name")
+
+SCHEMA = """
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE items (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    item_id TEXT,
+    position INTEGER,
+    text TEXT,
+    type TEXT,
+    file_name TEXT
+);
+CREATE INDEX items_file ON items(file_id);
+CREATE VIRTUAL TABLE items_fts USING fts5(
+    text, type, file_name, content='items', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+# items_fts는 items를 내용으로 쓰는 외부 콘텐츠 테이블. 행마다 트리거로 갱신하는 대신 파일 단위로 한 번에
+# 추가/삭제한다 (행 트리거보다 약 3배 빠름).
+INSERT_FTS = ("INSERT INTO items_fts(rowid, text, type, file_name) "
+              "SELECT id, text, type, file_name FROM items WHERE file_id = ?")
+DELETE_FTS = ("INSERT INTO items_fts(items_fts, rowid, text, type, file_name) "
+              "SELECT 'delete', id, text, type, file_name FROM items WHERE file_id = ?")
+
+
+class SearchHit:
+    """검색 결과 한 건. kind는 "node", "connection", "file" (file_name 일치).
+
+    item_id는 노드/연결 id이고, id가 없는 연결은 position(파일 안의 연결 순서)으로 찾는다.
+    """
+
+    __slots__ = ("name", "kind", "item_id", "position", "text", "type", "file_name")
+
+    def __init__(self, name, kind, item_id, position, text, type, file_name):
+        self.name = name
+        self.kind = kind
+        self.item_id = item_id
+        self.position = position
+        self.text = text
+        self.type = type
+        self.file_name = file_name
+
+    def __repr__(self):
+        return f"SearchHit({self.name!r}, {self.kind!r}, {self.item_id!r})"
+
+
+def match_expression(query):
+    """검색어를 FTS5 MATCH 식으로 변환. 단어마다 접두어 일치, 모든 단어를 AND로 결합 (단어가 없으면 None)."""
+    terms = []
+    for word in query.split():
+        column, separator, value = word.partition(":")
+        if separator and column in COLUMNS and value:
+            terms.append(f'{column} : "{value.replace(chr(34), chr(34) * 2)}"*')
+        else:
+            terms.append(f'"{word.replace(chr(34), chr(34) * 2)}"*')
+    return " AND ".join(terms) if terms else None
+
+
+def read_items(path):
+    """JSON 하나의 색인 행 (kind, item_id, position, text, type, file_name) 리스트. 스트리밍으로 읽는다."""
+    rows = []
+    file_name = None
+    node_count = 0
+    connection_count = 0
+    with open(path, 'rb') as f:
+        for event in iter_annotation(f):
+            kind = event[0]
+            if kind == "node":
+                node = event[1]
+                rows.append(("node", node.get("id"), node_count, text_value(node.get("text")), None, None))
+                node_count += 1
+            elif kind == "connection":
+                connection = event[1]
+                rows.append(("connection", connection.get("id"), connection_count, text_value(connection.get("text")),
+                             text_value(connection.get("type", "line")), None))
+                connection_count += 1
+            elif event[1] == "file_name":
+                file_name = text_value(event[2])
+    rows.append(("file", None, None, None, None, file_name or os.path.splitext(os.path.basename(path))[0]))
+    return rows
+
+
+def text_value(value):
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+class SearchIndex:
+    """디렉터리 하나의 검색 색인. SQLite 연결은 만든 스레드에서만 사용한다 (스레드마다 따로 열기).
+
+    WAL 모드이므로 백그라운드 스레드가 refresh하는 동안에도 다른 연결에서 검색할 수 있다.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, INDEX_NAME)
+        self.connection = sqlite3.connect(self.path, timeout=10.0)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.create_schema()
+
+    def create_schema(self):
+        with self.connection:
+            for table in ("items_fts", "items", "files"):
+                self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def transaction(self):
+        """쓰기 트랜잭션 시작 (with 문으로 사용). 쓰기 잠금을 먼저 잡으므로 다른 연결의 쓰기와 겹치지 않는다."""
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def close(self):
+        self.connection.close()
+
+    def scan(self):
+        """디렉터리의 JSON 파일명 -> (mtime_ns, size). DatasetManifest와 같은 파일을 대상으로 한다."""
+        files = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.json') and not entry.name.startswith('.') and entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def refresh(self, batch_size=200, cancelled=None):
+        """바뀐 JSON만 다시 색인하고 사라진 JSON은 제거. 다시 색인한 파일 수를 반환.
+
+        batch_size개 파일마다 커밋하므로 중간에 멈춰도(cancelled()가 True) 그때까지 색인한 파일은 남는다.
+        """
+        files = self.scan()
+        known = {name: (file_id, mtime_ns, size)
+                 for file_id, name, mtime_ns, size in self.connection.execute("SELECT id, name, mtime_ns, size FROM files")}
+        with self.transaction():
+            for name in known.keys() - files.keys():
+                self.remove_file(known[name][0])
+
+        changed = sorted(name for name, signature in files.items()
+                         if name not in known or known[name][1:] != signature)
+        for start in range(0, len(changed), batch_size):
+            if cancelled is not None and cancelled():
+                return start
+            with self.transaction():
+                for name in changed[start:start + batch_size]:
+                    self.index_file(name, files[name])
+        return len(changed)
+
+    def update_file(self, name):
+        """파일 하나가 저장된 뒤 호출. 그 파일만 다시 색인 (파일이 없어졌으면 제거)."""
+        try:
+            stat = os.stat(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            with self.transaction():
+                row = self.connection.execute("SELECT id FROM files WHERE name = ?", (name,)).fetchone()
+                if row is not None:
+                    self.remove_file(row[0])
+            return
+        with self.transaction():
+            self.index_file(name, (stat.st_mtime_ns, stat.st_size))
+
+    def index_file(self, name, signature):
+        """트랜잭션 안에서 호출. 읽을 수 없는 JSON은 항목 없이 기록한다 (바뀌기 전에는 다시 읽지 않음).
+
+        파일 행은 트랜잭션 안에서 다시 찾으므로 다른 연결이 그 사이에 같은 파일을 색인했어도 중복되지 않는다.
+        """
+        try:
+            rows = read_items(os.path.join(self.directory, name))
+        except (OSError, ValueError, AttributeError, TypeError, KeyError):
+            rows = []
+        row = self.connection.execute("SELECT id FROM files WHERE name = ?", (name,)).fetchone()
+        file_id = row[0] if row else None
+        if file_id is None:
+            file_id = self.connection.execute("INSERT INTO files (name, mtime_ns, size) VALUES (?, ?, ?)",
+                                              (name, *signature)).lastrowid
+        else:
+            self.remove_items(file_id)
+            self.connection.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?", (*signature, file_id))
+        self.connection.executemany(
+            "INSERT INTO items (file_id, kind, item_id, position, text, type, file_name) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(file_id, *row) for row in rows])
+        self.connection.execute(INSERT_FTS, (file_id,))
+
+    def remove_items(self, file_id):
+        self.connection.execute(DELETE_FTS, (file_id,))
+        self.connection.execute("DELETE FROM items WHERE file_id = ?", (file_id,))
+
+    def remove_file(self, file_id):
+        self.remove_items(file_id)
+        self.connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def file_count(self):
+        return self.connection.execute("SELECT count(*) FROM files").fetchone()[0]
+
+    def search(self, query, limit=200):
+        """query와 일치하는 항목을 최대 limit개 반환 (색인 순서). 검색어 문법이 잘못되면 빈 리스트."""
+        match = match_expression(query)
+        if match is None:
+            return []
+        try:
+            rows = self.connection.execute(
+                "SELECT files.name, items.kind, items.item_id, items.position, items.text, items.type, items.file_name "
+                "FROM (SELECT rowid FROM items_fts WHERE items_fts MATCH ? LIMIT ?) AS hits "
+                "JOIN items ON items.id = hits.rowid JOIN files ON files.id = items.file_id",
+                (match, limit)).fetchall()
+        except sqlite3.OperationalError:
+            return []
+        return [SearchHit(*row) for row in rows]
+
+
+def refresh_index(directory, cancelled=None):
+    """백그라운드 스레드용: 그 스레드에서 색인을 열어 refresh하고 닫음. (다시 색인한 파일 수, 전체 파일 수)."""
+    index = SearchIndex(directory)
+    try:
+        return index.refresh(cancelled=cancelled), index.file_count()
+    finally:
+        index.close()
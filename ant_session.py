@@ -0,0 +1,136 @@
+"""AnT 다중 문서 세션 (Tk 없이 사용 가능).
+
+편집기는 한 번에 문서 하나만 화면에 보여 주지만, 세션은 최근에 연 문서 여러 개의 편집기 상태(파싱된 모델,
+되돌리기 기록, 확대/이동, 캔버스 아이템, 이미지 타일/피라미드)를 DocumentState에 그대로 보관한다.
+다시 그 문서로 전환하면 보관한 상태를 편집기에 되돌려 놓기만 하므로 JSON 파싱이나 이미지 리샘플링이 없다.
+열린 문서의 추정 메모리가 max_bytes를 넘거나 문서 수가 max_documents를 넘으면 오래 보지 않은 문서부터 닫는다.
+"""
+from collections import OrderedDict
+
+
+DEFAULT_MAX_BYTES = 1024 ** 3
+DEFAULT_MAX_DOCUMENTS = 8
+
+
+def model_nbytes(document):
+    """AnnotationDocument의 대략적인 메모리 크기(byte, 노드/연결과 인덱스 포함)."""
+    return 200 * (len(document.nodes) + len(document.connections))
+
+
+class DocumentState:
+    """문서 하나의 편집기 상태. key는 문서의 JSON 절대 경로 (새 문서는 None).
+
+    serial은 연 순서 (탭 표시 순서), tag는 이 문서의 캔버스 아이템에 붙이는 태그.
+    values는 편집기 속성 이름 -> 값으로, 비활성 문서일 때만 채워진다 (활성 문서의 상태는 편집기에 있음).
+    """
+
+    def __init__(self, key, serial):
+        self.key = key
+        self.serial = serial
+        self.tag = f"document{serial}"
+        self.values = {}
+
+    def __repr__(self):
+        return f"DocumentState({self.key!r})"
+
+
+class DocumentSession:
+    """열린 문서의 LRU 목록. documents는 최근에 활성화한 문서가 뒤에 오는 순서.
+
+    measure(state)는 문서의 추정 메모리 크기(byte)를 반환하는 콜백이다.
+    """
+
+    def __init__(self, measure, max_bytes=DEFAULT_MAX_BYTES, max_documents=DEFAULT_MAX_DOCUMENTS):
+        self.measure = measure
+        self.max_bytes = max_bytes
+        self.max_documents = max_documents
+        self.documents = OrderedDict()  # key -> DocumentState
+        self.active = None
+        self.next_serial = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __contains__(self, key):
+        return key in self.documents
+
+    def get(self, key):
+        return self.documents.get(key)
+
+    def new_state(self, key=None):
+        """아직 목록에 넣지 않은 새 문서 상태."""
+        self.next_serial += 1
+        return DocumentState(key, self.next_serial)
+
+    def add(self, state):
+        """state를 목록에 넣음 (key가 None인 새 문서는 목록에 넣지 않는다)."""
+        if state.key is not None:
+            self.documents[state.key] = state
+            self.documents.move_to_end(state.key)
+
+    def rekey(self, state, key):
+        """state의 문서가 바뀌었을 때 목록의 키도 바꿈 (비어 있는 새 문서 탭에 파일을 연 경우)."""
+        if state.key is not None and self.documents.get(state.key) is state:
+            del self.documents[state.key]
+        state.key = key
+        self.add(state)
+
+    def activate(self, state):
+        self.active = state
+        if state.key in self.documents:
+            self.documents.move_to_end(state.key)
+
+    def remove(self, state):
+        if state.key is not None and self.documents.get(state.key) is state:
+            del self.documents[state.key]
+        if state is self.active:
+            self.active = None
+
+    def tabs(self):
+        """탭으로 표시할 문서 (연 순서). 목록에 없는 새 문서가 활성이면 마지막에 포함."""
+        states = sorted(self.documents.values(), key=lambda state: state.serial)
+        if self.active is not None and self.active.key is None:
+            states.append(self.active)
+        return states
+
+    def most_recent(self, exclude=None):
+        """exclude를 제외하고 가장 최근에 활성화한 문서 (없으면 None)."""
+        for state in reversed(self.documents.values()):
+            if state is not exclude:
+                return state
+        return None
+
+    def sizes(self):
+        return {key: self.measure(state) for key, state in self.documents.items()}
+
+    def nbytes(self):
+        return sum(self.sizes().values())
+
+    def evict(self):
+        """한도를 넘으면 활성 문서를 제외하고 오래된 문서부터 목록에서 빼서 반환 (닫는 것은 호출하는 쪽)."""
+        sizes = self.sizes()
+        total = sum(sizes.values())
+        count = len(self.documents)
+        evicted = []
+        for key, state in list(self.documents.items()):
+            if total <= self.max_bytes and count <= self.max_documents:
+                break
+            if state is self.active:
+                continue
+            del self.documents[key]
+            total -= sizes[key]
+            count -= 1
+            evicted.append(state)
+        self.evictions += len(evicted)
+        return evicted
+
+    def stats(self):
+        sizes = self.sizes()
+        return {
+            "documents": len(sizes),
+            "bytes": sum(sizes.values()),
+            "max_bytes": self.max_bytes,
+            "max_documents": self.max_documents,
+            "evictions": self.evictions
+        }
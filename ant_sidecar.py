@@ -0,0 +1,235 @@
+"""AnT 이진 사이드카 캐시 (Tk/PIL 없이 사용 가능).
+
+JSON 옆에 <이름>.json.antc로, 파싱과 부모-자식 관계 계산이 끝난 문서를 고정 레이아웃 배열로 저장한다.
+다시 열 때는 파일을 한 번 읽어서 배열을 그대로 복원하므로 json.load, 중첩 파싱, id 생성, 포함 관계 계산을 건너뛴다.
+JSON이 항상 원본이며, 사이드카는 JSON의 mtime/크기가 같거나 내용 해시가 같을 때만 사용하고 아니면 무시한다.
+
+파일 구성 (리틀 엔디언):
+    헤더 (HEADER)
+    노드 좌표     float64 x 4 x 노드 수
+    좌표 정수 여부 uint8 x 노드 수 (1이면 int로 복원)
+    노드 문자열   int32 x 3 x 노드 수 (id, text, parent id; 없으면 -1)
+    연결 문자열   int32 x 7 x 연결 수 (id, from, to, text, type, color, extra JSON)
+    연결 방향     uint8 x 연결 수
+    문자열 테이블 UTF-8, "\\0"으로 구분
+"""
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+
+import ant_stream
+from ant_io import atomic_write
+from ant_model import AnnotationDocument, Connection, Node
+
+
+SIDECAR_SUFFIX = ".antc"
+MAGIC = b"ANTC"
+VERSION = 2
+
+# magic, version, json mtime_ns, json size, json 해시, 노드 수, 연결 수, 문자열 수, 문자열 테이블 크기,
+# summary(JSON 문자열 인덱스), file_name 인덱스, 배치 폭(좌표 없는 노드가 없었으면 -1), 배치 높이(모르면 -1)
+HEADER = struct.Struct("<4sIqq16sIIIIiiii")
+
+
+def sidecar_path(json_path):
+    return f"{json_path}{SIDECAR_SUFFIX}"
+
+
+def little_endian(values):
+    """array를 파일 바이트 순서(리틀 엔디언)로 변환 (제자리, 빅 엔디언 시스템에서만 바뀜)."""
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def content_hash(raw):
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def load_document(json_path, layout_width, layout_height=None, write=True):
+    """사이드카가 유효하면 사이드카로, 아니면 JSON으로 문서를 생성. write=True이면 JSON을 읽은 뒤 사이드카를 갱신."""
+    document = read_sidecar(json_path, layout_width, layout_height)
+    if document is not None:
+        return document
+
+    # 스트리밍으로 읽으면서 같은 바이트로 해시 계산
+    stat = os.stat(json_path)
+    hasher = hashlib.blake2b(digest_size=16)
+    document, builder = ant_stream.load_document(json_path, layout_width, layout_height, hasher=hasher)
+    if write:
+        try:
+            layout = (layout_width, -1 if layout_height is None else layout_height) if builder.placed else (-1, -1)
+            write_sidecar(json_path, document, stat, hasher.digest(), layout)
+        except (OSError, ValueError):
+            pass  # 읽기 전용 디렉터리이거나 저장할 수 없는 값이 있으면 JSON만 사용
+    return document
+
+
+def refresh_sidecar(json_path, document, file_name):
+    """document.to_data(file_name)을 JSON으로 저장한 직후 호출. 저장된 파일을 기준으로 사이드카를 다시 씀.
+
+    실패하면 오래된 사이드카가 남지 않게 삭제한다.
+    """
+    try:
+        with open(json_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            digest = content_hash(f.read())
+        write_sidecar(json_path, document, stat, digest, file_name=file_name)
+    except (OSError, ValueError):
+        try:
+            os.remove(sidecar_path(json_path))
+        except OSError:
+            pass
+
+
+def write_sidecar(json_path, document, stat, digest, layout=(-1, -1), file_name=None):
+    """document를 사이드카로 저장. stat/digest는 document를 만든 JSON 파일의 os.stat 결과와 content_hash.
+
+    layout은 좌표 없는 노드를 배치한 영역 (폭, 높이). file_name은 JSON에 기록된 file_name (None이면 document.file_name).
+
+    문자열이 아닌 노드 텍스트처럼 배열로 표현할 수 없는 값이 있으면 ValueError.
+    """
+    strings = []
+    string_ids = {}
+
+    def intern(value):
+        if value is None:
+            return -1
+        if not isinstance(value, str) or "\0" in value:
+            raise ValueError("unsupported value for sidecar")
+        index = string_ids.get(value)
+        if index is None:
+            index = string_ids[value] = len(strings)
+            strings.append(value)
+        return index
+
+    coords = array('d')
+    int_flags = bytearray()
+    node_strings = array('i')
+    for node in document.nodes:
+        values = node.coords
+        coords.extend(values)
+        int_flags.append(all(type(value) is int for value in values))
+        node_strings.extend((intern(node.id), intern(node.text), intern(node.parent_id)))
+
+    connection_strings = array('i')
+    directions = bytearray()
+    for connection in document.connections:
+        if type(connection.direction) is not bool:
+            raise ValueError("unsupported direction for sidecar")
+        extra = json.dumps(connection.extra, ensure_ascii=False) if connection.extra else None
+        connection_strings.extend((intern(connection.id), intern(connection.from_id), intern(connection.to_id),
+                                   intern(connection.text), intern(connection.type), intern(connection.color),
+                                   intern(extra)))
+        directions.append(connection.direction)
+
+    summary = intern(json.dumps(document.summary, ensure_ascii=False)) if document.summary is not None else -1
+    file_name = intern(file_name if file_name is not None else document.file_name)
+    table = "\0".join(strings).encode('utf-8')
+
+    header = HEADER.pack(MAGIC, VERSION, stat.st_mtime_ns, stat.st_size, digest, len(document.nodes),
+                         len(document.connections), len(strings), len(table), summary, file_name, *layout)
+    path = sidecar_path(json_path)
+    with atomic_write(path, 'wb') as f:
+        f.write(header)
+        f.write(little_endian(coords).tobytes())
+        f.write(int_flags)
+        f.write(little_endian(node_strings).tobytes())
+        f.write(little_endian(connection_strings).tobytes())
+        f.write(directions)
+        f.write(table)
+
+
+def read_header(json_path, verify=False, header_only=False):
+    """(헤더 필드 튜플, 사이드카 bytes). 사이드카가 없거나 JSON과 맞지 않으면 None.
+
+    JSON의 mtime과 크기가 기록된 값과 같으면 그대로 믿는다. mtime만 다르면(복사, touch 등) 내용 해시를 비교한다.
+    verify=True이면 항상 해시를 비교한다.
+    """
+    try:
+        with open(sidecar_path(json_path), 'rb') as f:
+            raw = f.read(HEADER.size if header_only else -1)
+        stat = os.stat(json_path)
+    except OSError:
+        return None
+    if len(raw) < HEADER.size:
+        return None
+    header = HEADER.unpack_from(raw)
+    magic, version, mtime_ns, size, digest = header[:5]
+    if magic != MAGIC or version != VERSION or size != stat.st_size:
+        return None
+    if verify or mtime_ns != stat.st_mtime_ns:
+        try:
+            with open(json_path, 'rb') as f:
+                if content_hash(f.read()) != digest:
+                    return None
+        except OSError:
+            return None
+    return header, raw
+
+
+def read_counts(json_path):
+    """사이드카 헤더에 기록된 (노드 수, 연결 수). 유효한 사이드카가 없으면 None (데이터셋 스캔용)."""
+    result = read_header(json_path, header_only=True)
+    if result is None:
+        return None
+    header, _ = result
+    return header[5], header[6]
+
+
+def read_sidecar(json_path, layout_width=None, layout_height=None, verify=False):
+    """유효한 사이드카에서 AnnotationDocument 생성. 사용할 수 없으면 None.
+
+    사이드카를 쓸 때 좌표 없는 노드를 배치했다면 같은 배치 영역(layout_width, layout_height)일 때만 사용한다.
+    """
+    result = read_header(json_path, verify)
+    if result is None:
+        return None
+    header, raw = result
+    node_count, connection_count, string_count, table_size, summary, file_name, placed_width, placed_height = header[5:]
+    if placed_width != -1 and (placed_width, placed_height) != (layout_width, -1 if layout_height is None else layout_height):
+        return None
+
+    try:
+        offset = HEADER.size
+        coords = array('d')
+        coords.frombytes(raw[offset:offset + 32 * node_count])
+        offset += 32 * node_count
+        int_flags = raw[offset:offset + node_count]
+        offset += node_count
+        node_strings = array('i')
+        node_strings.frombytes(raw[offset:offset + 12 * node_count])
+        offset += 12 * node_count
+        connection_strings = array('i')
+        connection_strings.frombytes(raw[offset:offset + 28 * connection_count])
+        offset += 28 * connection_count
+        directions = raw[offset:offset + connection_count]
+        offset += connection_count
+        strings = raw[offset:offset + table_size].decode('utf-8').split("\0") if string_count else []
+    except (ValueError, UnicodeDecodeError):
+        return None
+    for values in (coords, node_strings, connection_strings):
+        little_endian(values)
+    if len(strings) != string_count or len(directions) != connection_count:
+        return None
+    strings.append(None)  # 인덱스 -1은 None
+
+    nodes = []
+    for i, node_id, text, parent_id in zip(range(node_count), node_strings[0::3], node_strings[1::3], node_strings[2::3]):
+        values = coords[4 * i:4 * i + 4]
+        if int_flags[i]:
+            values = [int(value) for value in values]
+        nodes.append(Node(strings[node_id], values, strings[text], strings[parent_id]))
+
+    columns = [connection_strings[field::7] for field in range(7)]
+    connections = [
+        Connection(strings[connection_id], strings[from_id], strings[to_id], strings[text], strings[connection_type],
+                   bool(direction), strings[color], json.loads(strings[extra]) if extra != -1 else None)
+        for connection_id, from_id, to_id, text, connection_type, color, extra, direction in zip(*columns, directions)
+    ]
+
+    return AnnotationDocument(nodes, connections, json.loads(strings[summary]) if summary != -1 else None,
+                              strings[file_name], restore_parents=True)
@@ -0,0 +1,475 @@
+"""AnT 어노테이션 저장소 (Tk/PIL 없이 사용 가능, 명령줄 import만 PIL 사용).
+
+문서를 읽고 저장하는 방법을 저장소 객체로 분리한다. 기본은 JSONStore(이미지마다 JSON 파일, 지금까지와 같은 형식)이고,
+데이터셋 폴더에 annotations.sqlite가 있으면 SQLiteStore를 사용한다 (store_for).
+
+SQLiteStore는 이미지 이름(JSON 파일명에서 확장자를 뺀 것)을 키로 문서, 노드, 연결을 행으로 저장한다. 자동 저장은
+마지막 저장 이후의 편집 연산이 건드린 노드/연결 행만 WAL 트랜잭션 하나로 기록하므로 저장 비용이 바뀐 행 수에 비례한다.
+저장소에 아직 없는 문서는 JSON에서 읽고, 처음 저장할 때 저장소에 들어간다. 저장소를 쓰는 폴더에서는 저장소가 원본이고
+JSON은 가져오기/내보내기 형식이다.
+
+사용법:
+    python ant_store.py import DATASET_DIR [--layout-width W]    JSON을 저장소로 가져오기 (저장소가 없으면 생성)
+    python ant_store.py export DATASET_DIR [--output-dir OUT]    저장소의 문서를 JSON으로 내보내기
+    python ant_store.py stats DATASET_DIR                        데이터셋 통계
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import ant_sidecar
+from ant_io import file_signature, find_image_for_json, write_json_atomic
+from ant_model import AnnotationDocument, Connection, Node
+from ant_stream import count_nodes
+
+
+STORE_NAME = "annotations.sqlite"
+SCHEMA_VERSION = 1
+
+# 좌표와 텍스트 열은 타입을 지정하지 않아 int/float/str을 저장한 그대로 돌려받는다.
+# position은 문서 안의 순서를 나타내는 실수로, 중간에 삽입할 때 앞뒤 행의 중간값을 써서 다른 행을 고치지 않는다.
+SCHEMA = """
+CREATE TABLE documents (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    file_name TEXT,
+    summary TEXT,
+    revision INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL
+);
+CREATE TABLE nodes (
+    document_id INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    position REAL NOT NULL,
+    x1, y1, x2, y2,
+    text,
+    PRIMARY KEY (document_id, id)
+) WITHOUT ROWID;
+CREATE INDEX nodes_order ON nodes(document_id, position);
+CREATE TABLE connections (
+    document_id INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    position REAL NOT NULL,
+    from_id TEXT,
+    to_id TEXT,
+    text,
+    type TEXT,
+    direction,
+    color TEXT,
+    extra TEXT,
+    PRIMARY KEY (document_id, id)
+) WITHOUT ROWID;
+CREATE INDEX connections_order ON connections(document_id, position);
+"""
+
+NODE_COLUMNS = ("x1", "y1", "x2", "y2", "text")
+CONNECTION_COLUMNS = ("from_id", "to_id", "text", "type", "direction", "color", "extra")
+SQL_VARIABLES = 500  # IN (...) 한 번에 넣는 값 수
+
+
+def document_key(json_path):
+    """저장소 키: JSON 파일명에서 확장자를 뺀 이미지 이름."""
+    return os.path.splitext(os.path.basename(json_path))[0]
+
+
+def node_row(node):
+    return (*node.coords, node.text)
+
+
+def connection_row(connection):
+    extra = json.dumps(connection.extra, ensure_ascii=False) if connection.extra else None
+    return (connection.from_id, connection.to_id, connection.text, connection.type, connection.direction,
+            connection.color, extra)
+
+
+def changed_ids(ops, document):
+    """편집 연산 리스트가 건드린 (노드 id 집합, 연결 id 집합)."""
+    nodes = set()
+    connections = set()
+    for op in ops:
+        kind = op["op"]
+        if kind == "add_node":
+            nodes.add(op["node"]["id"])
+        elif kind in ("set_node_coords", "set_node_text"):
+            nodes.add(op["id"])
+        elif kind == "remove_node":
+            nodes.add(op["id"])
+            connections.update(op["connections"])
+        elif kind == "set_coords":
+            nodes.update(node_id for node_id, _ in op["coords"])
+        elif kind == "scale_nodes":
+            nodes.update(node.id for node in document.nodes)
+        elif kind == "add_connection":
+            connections.add(op["connection"]["id"])
+        elif kind in ("update_connection", "remove_connection"):
+            connections.add(op["id"])
+        else:
+            raise ValueError(f"unknown operation: {kind}")
+    return nodes, connections
+
+
+def between(before, after):
+    """before와 after 사이의 position (없는 쪽은 1 간격). 사이에 값이 없으면 None."""
+    if before is None and after is None:
+        return 0.0
+    if before is None:
+        return after - 1.0
+    if after is None:
+        return before + 1.0
+    position = (before + after) / 2
+    return position if before < position < after else None
+
+
+class JSONStore:
+    """이미지마다 JSON 파일 하나 (기본 저장소). 저장할 때마다 파일 전체를 다시 쓰고 사이드카를 갱신한다."""
+
+    incremental = False  # save에 편집 연산을 넘겨도 전체를 저장
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def contains(self, json_path):
+        return os.path.exists(json_path)
+
+    def load_document(self, json_path, layout_width, layout_height=None):
+        return ant_sidecar.load_document(json_path, layout_width, layout_height)
+
+    def save(self, json_path, document, file_name, ops=None):
+        write_json_atomic(json_path, document.to_data(file_name), fsync=True)
+        ant_sidecar.refresh_sidecar(json_path, document, file_name)
+
+    def signature(self, json_path):
+        """저널 기준 확인용 값. 저장하거나 외부에서 바꾸면 달라진다."""
+        return file_signature(json_path)
+
+    def counts(self, json_path):
+        """(노드 수, 연결 수). 사이드카가 없으면 None."""
+        return ant_sidecar.read_counts(json_path)
+
+    def revision(self, json_path):
+        return None
+
+    def revisions(self):
+        """키 -> 저장 횟수 (JSON 파일은 mtime/크기로 바뀐 것을 알 수 있으므로 비어 있음)."""
+        return {}
+
+    def state(self):
+        """저장소 전체가 바뀌었는지 확인하는 값 (JSON 저장소는 항상 None)."""
+        return None
+
+    def statistics(self):
+        """폴더의 JSON 전체 통계 (사이드카 헤더를 우선 사용하고, 없으면 노드만 스트리밍으로 셈)."""
+        stats = {"documents": 0, "annotated_documents": 0, "nodes": 0, "connections": None}
+        connections = 0
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json') or name.startswith('.'):
+                continue
+            path = os.path.join(self.directory, name)
+            counts = self.counts(path)
+            if counts is None:
+                try:
+                    counts = (count_nodes(path), None)
+                except (OSError, ValueError, AttributeError, TypeError, KeyError):
+                    continue
+            stats["documents"] += 1
+            stats["annotated_documents"] += counts[0] > 0
+            stats["nodes"] += counts[0]
+            if counts[1] is not None and connections is not None:
+                connections += counts[1]
+            else:
+                connections = None  # 사이드카가 없는 파일이 있으면 연결 수는 모름
+        stats["connections"] = connections
+        return stats
+
+
+class SQLiteStore:
+    """폴더 하나의 SQLite 저장소. 스레드마다 연결을 따로 연다 (UI, 자동 저장, 미리 읽기 스레드가 함께 사용)."""
+
+    incremental = True
+
+    def __init__(self, path):
+        self.path = path
+        self.directory = os.path.dirname(path)
+        self.local = threading.local()
+
+    @classmethod
+    def create(cls, directory):
+        store = cls(os.path.join(directory, STORE_NAME))
+        store.connection()
+        return store
+
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version == 0:
+                with connection:
+                    connection.executescript(SCHEMA)
+                    connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            elif version != SCHEMA_VERSION:
+                connection.close()
+                raise ValueError(f"unsupported store version {version}: {self.path}")
+            self.local.connection = connection
+        return connection
+
+    def transaction(self):
+        """쓰기 트랜잭션 시작 (with 문으로 사용). 쓰기 잠금을 먼저 잡아 다른 연결의 저장과 겹치지 않게 한다."""
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        return connection
+
+    def document_id(self, json_path):
+        row = self.connection().execute("SELECT id FROM documents WHERE key = ?", (document_key(json_path),)).fetchone()
+        return row[0] if row else None
+
+    def contains(self, json_path):
+        return self.document_id(json_path) is not None
+
+    def load_document(self, json_path, layout_width, layout_height=None):
+        """저장소의 문서를 생성. 아직 저장소에 없으면 JSON(사이드카)에서 읽는다."""
+        connection = self.connection()
+        row = connection.execute("SELECT id, file_name, summary FROM documents WHERE key = ?",
+                                 (document_key(json_path),)).fetchone()
+        if row is None:
+            return ant_sidecar.load_document(json_path, layout_width, layout_height)
+        document_id, file_name, summary = row
+        nodes = [Node(node_id, (x1, y1, x2, y2), text) for node_id, x1, y1, x2, y2, text in connection.execute(
+            "SELECT id, x1, y1, x2, y2, text FROM nodes WHERE document_id = ? ORDER BY position", (document_id,))]
+        connections = [
+            Connection(connection_id, from_id, to_id, text, connection_type,
+                       bool(direction) if direction in (0, 1) else direction, color,
+                       json.loads(extra) if extra is not None else None)
+            for connection_id, from_id, to_id, text, connection_type, direction, color, extra in connection.execute(
+                "SELECT id, from_id, to_id, text, type, direction, color, extra FROM connections "
+                "WHERE document_id = ? ORDER BY position", (document_id,))
+        ]
+        return AnnotationDocument(nodes, connections, json.loads(summary) if summary is not None else None, file_name)
+
+    def save(self, json_path, document, file_name, ops=None):
+        """document를 저장. ops(마지막 저장 이후의 편집 연산)가 있고 문서가 이미 저장소에 있으면 바뀐 행만 기록한다."""
+        key = document_key(json_path)
+        summary = json.dumps(document.summary, ensure_ascii=False) if document.summary is not None else None
+        with self.transaction() as connection:
+            row = connection.execute("SELECT id FROM documents WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                document_id = connection.execute("INSERT INTO documents (key) VALUES (?)", (key,)).lastrowid
+                ops = None
+            else:
+                document_id = row[0]
+            if ops is None:
+                self.write_all(connection, document_id, document)
+            else:
+                node_ids, connection_ids = changed_ids(ops, document)
+                self.write_rows(connection, "nodes", NODE_COLUMNS, document_id, document.nodes, node_ids, node_row)
+                self.write_rows(connection, "connections", CONNECTION_COLUMNS, document_id, document.connections,
+                                connection_ids, connection_row)
+            connection.execute("UPDATE documents SET file_name = ?, summary = ?, revision = revision + 1, updated_at = ? "
+                               "WHERE id = ?", (file_name, summary, time.time(), document_id))
+
+    def write_all(self, connection, document_id, document):
+        connection.execute("DELETE FROM nodes WHERE document_id = ?", (document_id,))
+        connection.execute("DELETE FROM connections WHERE document_id = ?", (document_id,))
+        connection.executemany("INSERT INTO nodes (document_id, id, position, x1, y1, x2, y2, text) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               [(document_id, node.id, i, *node_row(node)) for i, node in enumerate(document.nodes)])
+        connection.executemany("INSERT INTO connections (document_id, id, position, from_id, to_id, text, type, direction, "
+                               "color, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               [(document_id, item.id, i, *connection_row(item))
+                                for i, item in enumerate(document.connections)])
+
+    def write_rows(self, connection, table, columns, document_id, items, changed, row_of):
+        """items(문서 순서의 노드 또는 연결) 중 changed id의 행만 갱신. 문서에 없으면 삭제하고, 새 행은 앞뒤 행의
+        position 사이에 넣는다. 사이에 넣을 값이 없을 때만 문서 전체의 position을 다시 매긴다."""
+        if not changed:
+            return
+        existing = {}
+        changed_list = list(changed)
+        for start in range(0, len(changed_list), SQL_VARIABLES):
+            chunk = changed_list[start:start + SQL_VARIABLES]
+            existing.update(connection.execute(
+                f"SELECT id, position FROM {table} WHERE document_id = ? AND id IN ({','.join('?' * len(chunk))})",
+                (document_id, *chunk)))
+
+        indices = {}
+        for i, item in enumerate(items):
+            if item.id in changed:
+                indices[item.id] = i
+        connection.executemany(f"DELETE FROM {table} WHERE document_id = ? AND id = ?",
+                               [(document_id, item_id) for item_id in changed if item_id not in indices])
+
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        connection.executemany(f"UPDATE {table} SET {assignments} WHERE document_id = ? AND id = ?",
+                               [(*row_of(items[i]), document_id, item_id)
+                                for item_id, i in indices.items() if item_id in existing])
+
+        new = sorted(i for item_id, i in indices.items() if item_id not in existing)
+        new_ids = {items[i].id for i in new}
+        positions = dict(existing)
+
+        def position_of(item_id):
+            if item_id not in positions:
+                positions[item_id] = connection.execute(f"SELECT position FROM {table} WHERE document_id = ? AND id = ?",
+                                                        (document_id, item_id)).fetchone()[0]
+            return positions[item_id]
+
+        renumber = False
+        rows = []
+        for i in new:
+            before = position_of(items[i - 1].id) if i > 0 else None
+            after = None
+            for j in range(i + 1, len(items)):
+                if items[j].id not in new_ids or items[j].id in positions:
+                    after = position_of(items[j].id)
+                    break
+            position = between(before, after)
+            if position is None:
+                renumber = True
+                position = before
+            positions[items[i].id] = position
+            rows.append((document_id, items[i].id, position, *row_of(items[i])))
+        placeholders = ", ".join("?" * (3 + len(columns)))
+        connection.executemany(f"INSERT INTO {table} (document_id, id, position, {', '.join(columns)}) "
+                               f"VALUES ({placeholders})", rows)
+        if renumber:
+            connection.executemany(f"UPDATE {table} SET position = ? WHERE document_id = ? AND id = ?",
+                                   [(i, document_id, item.id) for i, item in enumerate(items)])
+
+    def signature(self, json_path):
+        """저널 기준 확인용 값. 저장소에 있으면 문서의 저장 횟수, 아직 없으면 JSON 파일의 (mtime_ns, size)."""
+        revision = self.revision(json_path)
+        return ["store", revision] if revision is not None else file_signature(json_path)
+
+    def counts(self, json_path):
+        """(노드 수, 연결 수). 저장소에 없는 문서는 None."""
+        document_id = self.document_id(json_path)
+        if document_id is None:
+            return None
+        return self.connection().execute(
+            "SELECT (SELECT count(*) FROM nodes WHERE document_id = ?), "
+            "(SELECT count(*) FROM connections WHERE document_id = ?)", (document_id, document_id)).fetchone()
+
+    def revision(self, json_path):
+        """문서의 저장 횟수 (저장소에 없으면 None)."""
+        row = self.connection().execute("SELECT revision FROM documents WHERE key = ?",
+                                        (document_key(json_path),)).fetchone()
+        return row[0] if row else None
+
+    def revisions(self):
+        """키 -> 저장 횟수. DatasetManifest가 캐시한 노드 수가 저장소와 맞는지 확인하는 데 쓴다."""
+        return dict(self.connection().execute("SELECT key, revision FROM documents"))
+
+    def state(self):
+        """저장소 전체가 바뀌었는지 확인하는 [문서 수, 저장 횟수 합]. 문서를 저장할 때마다 달라진다."""
+        return list(self.connection().execute("SELECT count(*), total(revision) FROM documents").fetchone())
+
+    def statistics(self):
+        """저장소 전체 통계 (쿼리 한 번)."""
+        documents, annotated, nodes, connections, updated_at = self.connection().execute("""
+            SELECT (SELECT count(*) FROM documents),
+                   (SELECT count(DISTINCT document_id) FROM nodes),
+                   (SELECT count(*) FROM nodes),
+                   (SELECT count(*) FROM connections),
+                   (SELECT max(updated_at) FROM documents)
+        """).fetchone()
+        return {"documents": documents, "annotated_documents": annotated, "nodes": nodes, "connections": connections,
+                "updated_at": updated_at}
+
+    def keys(self):
+        return [key for key, in self.connection().execute("SELECT key FROM documents ORDER BY key")]
+
+    def export_json(self, key, json_path):
+        """저장소의 key 문서를 기존 JSON 형식으로 저장."""
+        document = self.load_document(f"{key}.json", 0)
+        write_json_atomic(json_path, document.to_data(document.file_name))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def store_for(directory):
+    """directory의 저장소. annotations.sqlite가 있으면 SQLiteStore, 없으면 JSONStore (폴더마다 하나를 재사용)."""
+    directory = os.path.abspath(directory)
+    path = os.path.join(directory, STORE_NAME)
+    kind = SQLiteStore if os.path.exists(path) else JSONStore
+    with _stores_lock:
+        store = _stores.get(directory)
+        if type(store) is not kind:
+            store = _stores[directory] = SQLiteStore(path) if kind is SQLiteStore else JSONStore(directory)
+        return store
+
+
+def import_directory(directory, layout_width=1280, log=sys.stderr):
+    """폴더의 JSON을 모두 저장소로 가져옴 (이미 있는 문서는 JSON 내용으로 덮어씀). (가져온 수, 실패 수)."""
+    from PIL import Image  # 좌표 없는 노드를 배치할 이미지 크기 (헤더만 읽음)
+
+    store = SQLiteStore.create(directory)
+    imported = failed = 0
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json') or name.startswith('.'):
+            continue
+        json_path = os.path.join(directory, name)
+        try:
+            image_path = find_image_for_json(json_path)
+            width, height = layout_width, None
+            if image_path:
+                with Image.open(image_path) as image:
+                    width, height = image.size
+            document = ant_sidecar.load_document(json_path, width, height, write=False)
+            file_name = os.path.basename(image_path) if image_path else document.file_name
+            store.save(json_path, document, file_name)
+            imported += 1
+        except Exception as e:
+            print(f"ERROR {json_path}: {type(e).__name__}: {e}", file=log)
+            failed += 1
+    return imported, failed
+
+
+def export_directory(directory, output_dir=None):
+    """저장소의 문서를 모두 JSON으로 내보냄 (output_dir가 없으면 원래 폴더). 내보낸 수."""
+    store = SQLiteStore(os.path.join(directory, STORE_NAME))
+    output_dir = output_dir or directory
+    os.makedirs(output_dir, exist_ok=True)
+    keys = store.keys()
+    for key in keys:
+        store.export_json(key, os.path.join(output_dir, f"{key}.json"))
+    return len(keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AnT annotation store: JSON <-> SQLite import/export and statistics.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="import the JSON files of DATASET_DIR into its SQLite store")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--layout-width", type=int, default=1280,
+                               help="width used to place nodes without coordinates when there is no image (default: 1280)")
+    export_parser = subparsers.add_parser("export", help="export every document in the store to JSON")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--output-dir", help="write JSON files here instead of DATASET_DIR")
+    stats_parser = subparsers.add_parser("stats", help="print dataset statistics as JSON")
+    stats_parser.add_argument("directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        start = time.perf_counter()
+        imported, failed = import_directory(args.directory, args.layout_width)
+        print(f"imported {imported} documents ({failed} failed) in {time.perf_counter() - start:.2f}s")
+        return 1 if failed else 0
+    if args.command == "export":
+        if not os.path.exists(os.path.join(args.directory, STORE_NAME)):
+            parser.error(f"no {STORE_NAME} in {args.directory}")
+        print(f"exported {export_directory(args.directory, args.output_dir)} documents")
+        return 0
+    print(json.dumps(store_for(args.directory).statistics(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""AnT 어노테이션 JSON 스트리밍 로더 (Tk/PIL 없이 사용 가능).
+
+파일을 일정 크기씩 읽으면서 최상위 객체를 훑고, "components"의 중첩 "node" 트리는 명시적 스택으로 따라 내려가며
+노드를 하나씩 내보낸다. 연결은 "connections" 배열의 원소 하나씩 디코딩한다. 파일 전체나 트리 전체를 한꺼번에
+메모리에 올리지 않으므로 아주 깊은 중첩에서도 재귀 한도에 걸리지 않고, 필요한 필드만 쓰는 도구는 메모리가 제한된다.
+
+이벤트:
+    ("node", 노드 dict ("node" 키 제외), parent id)   전위 순서 (부모가 자식보다 먼저)
+    ("connection", 연결 dict)
+    ("field", 키, 값)                                  그 밖의 최상위 키 (summary, file_name 등)
+"""
+import codecs
+import json
+import re
+
+from ant_model import DocumentBuilder, iter_nested_nodes
+
+
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_KEY = re.compile(r'"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+_SEPARATOR = re.compile(r"[ \t\n\r]*([,}\]])[ \t\n\r]*")
+# 버퍼 끝에서 잘린 숫자의 나머지 ("1." / "1e" / "1e-"): raw_decode는 앞의 정수 부분만 돌려준다
+_NUMBER_TAIL = re.compile(r"\.|[eE][+-]?")
+
+
+class JSONStreamReader:
+    """파일에서 필요한 만큼만 읽어 JSON 토큰/값을 꺼내는 읽기 도구. hasher가 있으면 읽은 바이트를 넣는다."""
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE, hasher=None):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.hasher = hasher
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.scan = self.json_decoder.scan_once
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=None):
+        """버퍼에 더 읽어 붙임. 파일 끝이면 False."""
+        if self.eof:
+            return False
+        raw = self.file.read(size or self.chunk_size)
+        if self.hasher is not None:
+            self.hasher.update(raw)
+        self.eof = not raw
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(raw, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """공백을 건너뛴 다음 문자 (파일 끝이면 빈 문자열)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def next(self):
+        char = self.peek()
+        if not char:
+            raise ValueError("unexpected end of JSON")
+        self.pos += 1
+        return char
+
+    def expect(self, char):
+        found = self.next()
+        if found != char:
+            raise ValueError(f"expected {char!r} but found {found!r} at offset {self.pos - 1}")
+
+    def value(self):
+        """다음 JSON 값 하나를 디코딩. 값이 버퍼 끝에 걸치면 더 읽고 다시 시도 (읽는 양은 두 배씩 늘림)."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill(size):
+                    raise
+                size *= 2
+                continue
+            if (end == len(self.buffer) or self.truncated_number(value, end)) and self.fill(size):
+                size *= 2
+                continue  # 숫자/리터럴이 버퍼 끝에서 잘렸을 수 있음
+            self.pos = end
+            return value
+
+    def truncated_number(self, value, end):
+        """숫자 뒤에 소수점/지수 일부만 남고 버퍼가 끝났으면 True."""
+        return (isinstance(value, (int, float)) and not isinstance(value, bool)
+                and _NUMBER_TAIL.fullmatch(self.buffer, end) is not None)
+
+    def key(self):
+        """객체 키와 뒤의 ":"를 읽음. 이스케이프 없는 키가 버퍼 안에 있으면 정규식 하나로 처리."""
+        match = _KEY.match(self.buffer, self.pos)
+        if match is not None and match.end() < len(self.buffer):
+            self.pos = match.end()
+            return match.group(1)
+        key = self.value()
+        self.expect(":")
+        return key
+
+    def value_then(self, closing):
+        """값과 뒤따르는 구분자("," 또는 closing)를 함께 읽어 (값, 구분자) 반환.
+
+        값과 구분자가 모두 버퍼 안에 있으면 바로 디코딩하고, 버퍼 끝에 걸치면 value()로 더 읽는다.
+        """
+        buffer = self.buffer
+        pos = _WHITESPACE.match(buffer, self.pos).end()
+        try:
+            value, end = self.scan(buffer, pos)
+            match = _SEPARATOR.match(buffer, end)
+        except (StopIteration, json.JSONDecodeError):
+            match = None
+        if match is not None:
+            separator = match.group(1)
+            if separator == "," or separator == closing:
+                self.pos = match.end()
+                return value, separator
+        self.pos = pos
+        value = self.value()
+        separator = self.next()
+        if separator not in (",", closing):
+            raise ValueError(f"expected ',' or {closing!r} at offset {self.pos - 1}")
+        return value, separator
+
+    def items(self):
+        """배열 원소를 하나씩 디코딩해서 yield ("["는 아직 읽지 않은 상태)."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            value, separator = self.value_then("]")
+            yield value
+            if separator == "]":
+                return
+
+
+def iter_nodes(reader):
+    """components 배열에서 ("node", 노드 dict, parent id)를 전위 순서로 yield. 중첩은 명시적 스택으로 처리.
+
+    노드 객체에서 "node" 키가 나올 때 id/coords/text를 이미 읽었으면 노드를 먼저 내보내고 자식 배열을 스트리밍한다.
+    키 순서가 달라 그럴 수 없으면 그 노드의 자식 배열만 한 번에 디코딩한다.
+    """
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+
+    stack = []  # 열려 있는 노드 객체: [노드 dict, parent id, 내보냈는지, 한 번에 읽은 자식 리스트]
+    state = "element"
+    while True:
+        if state == "element":
+            if reader.next() != "{":
+                raise ValueError("components entries must be objects")
+            stack.append([{}, stack[-1][0].get("id") if stack else None, False, None])
+            state = "key" if reader.peek() != "}" else "close"
+            if state == "close":
+                reader.pos += 1
+
+        elif state == "key":
+            frame = stack[-1]
+            node = frame[0]
+            key = reader.key()
+            if key == "node" and reader.peek() == "[" and all(field in node for field in ("id", "coords", "text")):
+                if not frame[2]:
+                    frame[2] = True
+                    yield "node", node, frame[1]
+                reader.pos += 1
+                if reader.peek() == "]":
+                    reader.pos += 1
+                    state = "after_value"
+                else:
+                    state = "element"
+                continue
+            value, separator = reader.value_then("}")
+            node[key] = value
+            if key == "node" and isinstance(value, list):
+                frame[3] = value
+            state = "key" if separator == "," else "close"
+
+        elif state == "after_value":
+            state = {",": "key", "}": "close"}.get(reader.next())
+            if state is None:
+                raise ValueError(f"expected ',' or '}}' at offset {reader.pos - 1}")
+
+        elif state == "close":
+            node, parent_id, emitted, children = stack.pop()
+            if not emitted:
+                yield "node", node, parent_id
+            if children is not None:
+                for child, child_parent in iter_nested_nodes(children, node["id"]):
+                    yield "node", child, child_parent
+            # 객체가 끝났으면 배열의 다음 원소 또는 배열 끝
+            separator = reader.next()
+            if separator == ",":
+                state = "element"
+            elif separator != "]":
+                raise ValueError(f"expected ',' or ']' at offset {reader.pos - 1}")
+            elif stack:
+                state = "after_value"
+            else:
+                return
+
+
+def iter_annotation(file, chunk_size=CHUNK_SIZE, hasher=None, connections=True):
+    """바이너리 파일 객체에서 어노테이션 이벤트를 순서대로 yield. connections=False이면 연결 이벤트를 생략."""
+    reader = JSONStreamReader(file, chunk_size, hasher)
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+    else:
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key == "components" and reader.peek() == "[":
+                yield from iter_nodes(reader)
+            elif key == "connections" and reader.peek() == "[":
+                for connection in reader.items():
+                    if connections:
+                        yield "connection", connection
+            else:
+                yield "field", key, reader.value()
+            separator = reader.next()
+            if separator == "}":
+                break
+            if separator != ",":
+                raise ValueError(f"expected ',' or '}}' at offset {reader.pos - 1}")
+    if reader.peek():
+        raise ValueError("extra data after JSON document")
+    while reader.fill():
+        pass  # hasher가 파일 전체를 보도록 남은 바이트 읽기
+
+
+def load_document(json_path, layout_width, layout_height=None, hasher=None, progress=None, progress_every=1000):
+    """JSON을 스트리밍으로 읽어 (AnnotationDocument, DocumentBuilder) 반환.
+
+    progress(builder)는 노드/연결이 progress_every개 들어올 때마다 호출되므로, 읽는 중에 builder.nodes를
+    미리 표시할 수 있다.
+    """
+    builder = DocumentBuilder(layout_width, layout_height)
+    fields = {}
+    count = 0
+    with open(json_path, 'rb') as f:
+        for event in iter_annotation(f, hasher=hasher):
+            kind = event[0]
+            if kind == "node":
+                builder.add_node(event[1], event[2])
+            elif kind == "connection":
+                builder.add_connection(event[1])
+            else:
+                fields[event[1]] = event[2]
+                continue
+            count += 1
+            if progress is not None and count % progress_every == 0:
+                progress(builder)
+    return builder.finish(fields.get("summary"), fields.get("file_name")), builder
+
+
+def count_nodes(json_path):
+    """연결을 디코딩하지 않고 노드 수만 셈 (데이터셋 스캔용)."""
+    with open(json_path, 'rb') as f:
+        return sum(1 for event in iter_annotation(f, connections=False) if event[0] == "node")
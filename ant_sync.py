@@ -0,0 +1,510 @@
+"""AnT 동시 편집 동기화 서버/클라이언트 (Tk/PIL 없이 사용 가능, asyncio).
+
+여러 편집기가 같은 문서를 열면 서버가 문서마다 편집 연산의 순서를 정하고 모든 참여자에게 전달한다.
+연산은 AnnotationDocument.notify가 만드는 dict 그대로이고, 메시지는 한 줄에 JSON 하나(TCP)이다.
+
+- 처음 join한 클라이언트의 문서가 서버의 문서가 되고, 이후 join하는 클라이언트는 서버의 현재 문서를 받는다.
+- 클라이언트는 편집을 바로 자기 문서에 적용하고 (마지막으로 받은 서버 순번, 연산)을 보낸다.
+- 서버는 그 순번 이후에 다른 클라이언트가 같은 노드/연결 id를 바꿨으면 연산을 거절한다 (먼저 도착한 편집이 이김).
+  거절된 편집은 보낸 클라이언트에서 되돌려지므로 다른 사람의 편집을 조용히 덮어쓰지 않는다.
+- 클라이언트는 다른 사람의 연산을 받으면 아직 확인받지 못한 자기 연산을 되돌린 뒤 받은 연산을 적용하고 다시 적용한다.
+  서버도 같은 순서로 적용하므로 모든 클라이언트의 문서가 같아진다.
+
+문서는 이미지 이름(JSON 파일명에서 확장자를 뺀 것)으로 구분하므로 작업자마다 데이터셋 폴더 경로가 달라도 된다.
+서버는 문서를 메모리에만 두고, 저장은 각 편집기의 자동 저장이 한다. 마지막 참여자가 나가면 서버는 문서를 버린다.
+
+사용법:
+    python ant_sync.py serve [--host 127.0.0.1] [--port 8765]
+"""
+import argparse
+import asyncio
+import json
+import queue
+import sys
+import threading
+import uuid
+
+from ant_model import AnnotationDocument
+from ant_store import changed_ids, document_key
+
+
+PROTOCOL_VERSION = 1
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+LINE_LIMIT = 256 * 1024 * 1024  # join 메시지에 문서 전체가 들어가므로 큰 줄을 허용
+SEND_BUFFER_LIMIT = 64 * 1024 * 1024  # 받지 못하고 쌓인 전달 연산이 이보다 많은 클라이언트는 연결을 끊음
+
+
+class SyncError(Exception):
+    """서버에 연결할 수 없거나 프로토콜이 맞지 않음."""
+
+
+def encode(message):
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def touched_keys(op, document):
+    """op가 바꾸거나 의존하는 ("node" | "connection", id) 집합. 충돌 판정에 사용한다.
+
+    연결 추가는 양 끝 노드에 의존하므로, 다른 사람이 그 노드를 지운 뒤에 만든 연결은 충돌로 처리된다.
+    """
+    nodes, connections = changed_ids([op], document)
+    if op["op"] == "add_connection":
+        nodes.update((op["connection"]["from"], op["connection"]["to"]))
+    elif op["op"] == "update_connection":
+        nodes.update(op["fields"][field] for field in ("from_id", "to_id") if field in op["fields"])
+    return {("node", node_id) for node_id in nodes} | {("connection", connection_id) for connection_id in connections}
+
+
+def check_op(document, op):
+    """apply_op 전에 확인. 이미 있는 id를 추가하는 연산이면 ValueError (두 사람이 같은 id를 만든 경우)."""
+    kind = op["op"]
+    if kind == "add_node" and op["node"]["id"] in document.node_map:
+        raise ValueError(f"node {op['node']['id']} already exists")
+    if kind == "add_connection" and op["connection"]["id"] in document.connection_map:
+        raise ValueError(f"connection {op['connection']['id']} already exists")
+
+
+class SyncDocument:
+    """서버의 문서 하나: 현재 문서, 적용한 연산 수(seq), id별로 마지막에 바꾼 (seq, 클라이언트)."""
+
+    def __init__(self, key, document):
+        self.key = key
+        self.document = document
+        self.seq = 0
+        self.touched = {}     # ("node" | "connection", id) -> (seq, client id)
+        self.members = set()  # 참여 중인 ClientConnection
+        self.applied = []
+        document.observers.append(lambda op, inverse: self.applied.append(op))
+
+    def submit(self, client_id, base, op):
+        """base 순번을 본 client_id의 op를 적용하고 (seq, 실제로 적용된 연산 리스트)를 반환. 충돌하면 ValueError."""
+        keys = touched_keys(op, self.document)
+        for key in keys:
+            last = self.touched.get(key)
+            if last is not None and last[0] > base and last[1] != client_id:
+                raise ValueError(f"{key[0]} {key[1]} was changed by another client")
+        check_op(self.document, op)
+        self.applied = []
+        self.document.apply_op(op)
+        self.seq += 1
+        for key in keys:
+            self.touched[key] = (self.seq, client_id)
+        return self.seq, self.applied
+
+
+class ClientConnection:
+    """서버에 연결된 클라이언트 하나."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.client_id = None
+        self.documents = set()  # 참여 중인 문서 키
+        self.dropped = False
+
+    def send(self, message):
+        if not self.dropped:
+            self.writer.write(encode(message))
+
+    def backlog(self):
+        """아직 보내지 못한 바이트 수."""
+        return self.writer.transport.get_write_buffer_size()
+
+    def drop(self):
+        """연결을 바로 끊음. 이 클라이언트의 handle이 연결 종료를 받아 문서에서 나간다."""
+        self.dropped = True
+        self.writer.transport.abort()
+
+
+class SyncServer:
+    """asyncio 동기화 서버. 모든 처리가 이벤트 루프 스레드 하나에서 일어나므로 문서마다 연산 순서가 하나로 정해진다."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.documents = {}  # 문서 키 -> SyncDocument
+        self.server = None
+        self.accepted = 0
+        self.rejected = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, limit=LINE_LIMIT)
+        self.port = self.server.sockets[0].getsockname()[1]  # port=0이면 운영체제가 고른 포트
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        client = ClientConnection(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    self.dispatch(client, message)
+                except (ValueError, KeyError, TypeError) as e:
+                    client.send({"type": "error", "reason": f"{type(e).__name__}: {e}"})
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for key in list(client.documents):
+                self.leave(client, key)
+            writer.close()
+
+    def dispatch(self, client, message):
+        kind = message["type"]
+        if kind == "hello":
+            if message.get("version") != PROTOCOL_VERSION:
+                raise ValueError(f"unsupported protocol version {message.get('version')}")
+            if not isinstance(message["client"], str) or not message["client"]:
+                raise ValueError("client id must be a non-empty string")
+            client.client_id = message["client"]
+            client.send({"type": "welcome", "version": PROTOCOL_VERSION})
+        elif client.client_id is None:
+            # 충돌 판정이 클라이언트 id로 이루어지므로 hello 전의 메시지는 받지 않음
+            raise ValueError(f"{kind} before hello")
+        elif kind == "join":
+            self.join(client, message["document"], message["data"])
+        elif kind == "leave":
+            self.leave(client, message["document"])
+        elif kind == "op":
+            self.submit(client, message)
+        else:
+            raise ValueError(f"unknown message type: {kind}")
+
+    def join(self, client, key, data):
+        """문서에 참여. 처음 참여하는 클라이언트의 data로 서버 문서를 만들고, 아니면 서버 문서를 돌려준다."""
+        sync_document = self.documents.get(key)
+        if sync_document is None:
+            document = AnnotationDocument.from_data(data, 0)
+            sync_document = self.documents[key] = SyncDocument(key, document)
+            reply = None
+        else:
+            reply = sync_document.document.to_data(sync_document.document.file_name)
+        sync_document.members.add(client)
+        client.documents.add(key)
+        client.send({"type": "joined", "document": key, "seq": sync_document.seq, "data": reply})
+
+    def leave(self, client, key):
+        sync_document = self.documents.get(key)
+        client.documents.discard(key)
+        if sync_document is None:
+            return
+        sync_document.members.discard(client)
+        if not sync_document.members:
+            del self.documents[key]
+
+    def submit(self, client, message):
+        key = message["document"]
+        sync_document = self.documents.get(key)
+        if sync_document is None or client not in sync_document.members:
+            client.send({"type": "reject", "document": key, "ref": message["ref"], "reason": "not joined"})
+            return
+        try:
+            seq, ops = sync_document.submit(client.client_id, message["base"], message["op"])
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            self.rejected += 1
+            client.send({"type": "reject", "document": key, "ref": message["ref"], "reason": str(e)})
+            return
+        self.accepted += 1
+        update = {"type": "op", "document": key, "seq": seq, "client": client.client_id, "ref": message["ref"],
+                  "ops": ops}
+        # 보낸 클라이언트는 handle에서 drain한다. 다른 참여자를 기다리면 느린 한 명이 모두를 멈추므로,
+        # 전달 연산이 쌓이기만 하는 참여자는 끊는다 (다시 연결하면 서버 문서를 새로 받음).
+        for member in list(sync_document.members):
+            member.send(update)
+            if member is not client and member.backlog() > SEND_BUFFER_LIMIT:
+                member.drop()
+
+
+class DocumentReplica:
+    """클라이언트 쪽 문서 하나. document의 편집을 서버로 보내고, 서버의 연산을 받아 적용한다 (UI 스레드 전용).
+
+    pending은 보냈지만 아직 서버에서 순서를 받지 못한 [ref, 연산, 되돌리기 연산] 리스트이고,
+    unsent는 join 응답을 받기 전에 만든 편집이다.
+    """
+
+    def __init__(self, client, key, json_path, document):
+        self.client = client
+        self.key = key
+        self.json_path = json_path
+        self.document = None
+        self.seq = None        # 마지막으로 적용한 서버 순번 (join 전에는 None)
+        self.pending = []
+        self.unsent = []
+        self.next_ref = 0
+        self.capture = None    # 서버 연산을 적용하는 동안 문서가 알린 연산
+        self.rejected = 0
+        self.attach(document)
+
+    def attach(self, document):
+        if self.document is not None and self.record in self.document.observers:
+            self.document.observers.remove(self.record)
+        self.document = document
+        document.observers.append(self.record)
+
+    def detach(self):
+        if self.record in self.document.observers:
+            self.document.observers.remove(self.record)
+
+    def record(self, op, inverse):
+        """AnnotationDocument.observers 콜백: 로컬 편집을 서버로 보냄."""
+        if self.capture is not None:
+            self.capture.append((op, inverse))
+            return
+        if self.seq is None:
+            self.unsent.append((op, inverse))
+            return
+        self.send(op, inverse)
+
+    def send(self, op, inverse):
+        self.next_ref += 1
+        self.pending.append([self.next_ref, op, inverse])
+        self.client.send({"type": "op", "document": self.key, "base": self.seq, "ref": self.next_ref, "op": op})
+
+    def joined(self, seq, data):
+        """join 응답 처리. 서버에 이미 다른 문서가 있었으면(data) 로컬 문서를 서버 문서로 바꾼다.
+
+        join 응답 전에 만든 편집(unsent)은 서버 문서 위에 다시 적용해 보내고, 적용할 수 없는 편집은 버린다.
+        (바뀌었는지, 버린 편집의 사유 리스트)를 반환.
+        """
+        self.seq = seq
+        unsent, self.unsent = self.unsent, []
+        if data is not None:
+            # 비교는 unsent 이전 상태로, JSON을 거친 형태끼리 (to_data의 좌표는 튜플, 받은 data는 리스트)
+            base = self.document.copy()
+            for _, inverse in reversed(unsent):
+                for inverse_op in inverse:
+                    base.apply_op(inverse_op)
+            if json.loads(json.dumps(base.to_data(data.get("file_name")))) != data:
+                self.attach(AnnotationDocument.from_data(data, 0))
+                return True, self.replay(op for op, _ in unsent)
+        for op, inverse in unsent:
+            self.send(op, inverse)
+        return False, []
+
+    def replay(self, ops):
+        """ops를 현재 문서에 적용하고 서버로 보냄. 적용할 수 없는 연산은 버리고 그 사유 리스트를 반환."""
+        reasons = []
+        for op in ops:
+            self.capture = []
+            try:
+                check_op(self.document, op)
+                self.document.apply_op(op)
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                self.rejected += 1
+                reasons.append(f"{type(e).__name__}: {e}")
+                continue
+            finally:
+                capture, self.capture = self.capture, None
+            self.send(op, [inverse_op for _, inverses in capture for inverse_op in inverses])
+        return reasons
+
+    def receive(self, message):
+        """서버의 op/reject 메시지를 적용하고 그 때문에 문서에 적용된 연산 리스트를 반환."""
+        if message["type"] == "op":
+            self.seq = message["seq"]
+            if message["client"] == self.client.client_id and self.pending and self.pending[0][0] == message["ref"]:
+                self.pending.pop(0)  # 내 편집의 확인: 이미 적용되어 있음
+                return []
+            return self.rebase(message["ops"])
+        if message["type"] == "reject":
+            self.rejected += 1
+            if any(entry[0] == message["ref"] for entry in self.pending):
+                return self.rebase((), drop=message["ref"])
+        return []
+
+    def rebase(self, ops, drop=None):
+        """확인받지 못한 편집을 되돌리고 ops를 적용한 뒤 편집을 다시 적용 (drop ref의 편집은 버림).
+
+        다시 적용할 수 없는 편집(지워진 노드를 고치는 등)은 버린다. 서버도 같은 상태에서 적용하므로 거절한다.
+        """
+        self.capture = []
+        try:
+            for _, _, inverse in reversed(self.pending):
+                for inverse_op in inverse:
+                    self.document.apply_op(inverse_op)
+            for op in ops:
+                self.document.apply_op(op)
+            pending, self.pending = self.pending, []
+            for ref, op, _ in pending:
+                if ref == drop:
+                    continue
+                mark = len(self.capture)
+                try:
+                    check_op(self.document, op)
+                    self.document.apply_op(op)
+                except (ValueError, KeyError, IndexError, TypeError):
+                    continue
+                inverse = [inverse_op for _, inverses in self.capture[mark:] for inverse_op in inverses]
+                self.pending.append([ref, op, inverse])
+            return [op for op, _ in self.capture]
+        finally:
+            self.capture = None
+
+
+class SyncClient:
+    """동기화 서버 연결. 네트워크는 백그라운드 스레드의 asyncio 루프에서 처리하고,
+    받은 메시지는 poll로 UI 스레드에서 꺼내 문서에 적용한다 (문서는 UI 스레드에서만 바뀜).
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, client_id=None):
+        self.host = host
+        self.port = port
+        self.client_id = client_id or uuid.uuid4().hex[:12]
+        self.replicas = {}   # 문서 키 -> DocumentReplica
+        self.incoming = queue.Queue()
+        self.loop = asyncio.new_event_loop()
+        self.writer = None
+        self.ready = threading.Event()
+        self.error = None
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="ant-sync", daemon=True)
+
+    def start(self, timeout=5.0):
+        """서버에 연결하고 인사 응답을 기다림. 실패하면 SyncError."""
+        self.thread.start()
+        if not self.ready.wait(timeout):
+            self.close()
+            raise SyncError(f"no response from {self.host}:{self.port}")
+        if self.error is not None:
+            raise SyncError(self.error)
+        return self
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.main())
+        finally:
+            self.loop.close()
+
+    async def main(self):
+        try:
+            reader, self.writer = await asyncio.open_connection(self.host, self.port, limit=LINE_LIMIT)
+            self.writer.write(encode({"type": "hello", "client": self.client_id, "version": PROTOCOL_VERSION}))
+            welcome = json.loads(await reader.readline() or b"null")
+            if not welcome or welcome.get("type") != "welcome":
+                raise SyncError(welcome.get("reason") if welcome else "connection closed")
+        except (OSError, ValueError, SyncError) as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.ready.set()
+            return
+        self.ready.set()
+        reason = "connection closed"
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.incoming.put(json.loads(line))
+        except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+            reason = f"{type(e).__name__}: {e}"
+        self.incoming.put({"type": "closed", "reason": reason})
+        self.writer.close()
+
+    def send(self, message):
+        """아무 스레드에서나 호출. 연결이 끊겼으면 무시."""
+        if self.writer is not None and not self.loop.is_closed():
+            line = encode(message)
+            try:
+                self.loop.call_soon_threadsafe(self.writer.write, line)
+            except RuntimeError:
+                pass  # 루프가 이미 끝남
+
+    def close(self):
+        if self.writer is not None and not self.loop.is_closed():
+            try:
+                self.loop.call_soon_threadsafe(self.writer.close)
+            except RuntimeError:
+                pass
+        self.closed = True
+        for replica in self.replicas.values():
+            replica.detach()
+        self.replicas.clear()
+
+    # UI 스레드
+
+    def join(self, json_path, document):
+        """document(json_path의 문서) 동기화 시작. 결과는 poll의 "joined"/"replaced" 이벤트로 알린다."""
+        key = document_key(json_path)
+        replica = self.replicas.get(key)
+        if replica is not None:
+            if replica.document is document:
+                return replica
+            self.leave(key)
+        replica = self.replicas[key] = DocumentReplica(self, key, json_path, document)
+        self.send({"type": "join", "document": key, "data": document.to_data(document.file_name)})
+        return replica
+
+    def leave(self, key):
+        replica = self.replicas.pop(key, None)
+        if replica is not None:
+            replica.detach()
+            self.send({"type": "leave", "document": key})
+
+    def poll(self):
+        """받은 메시지를 처리하고 (이벤트, replica, 내용) 리스트를 반환.
+
+        이벤트는 "joined", "replaced"(서버 문서로 바뀜, replica.document가 새 문서), "changed"(적용된 연산 리스트),
+        "rejected"(거절 사유), "closed"(연결 종료 사유, replica는 None).
+        """
+        events = []
+        while True:
+            try:
+                message = self.incoming.get_nowait()
+            except queue.Empty:
+                return events
+            kind = message["type"]
+            if kind == "closed":
+                self.closed = True
+                events.append(("closed", None, message["reason"]))
+                continue
+            if kind == "error":
+                events.append(("error", None, message["reason"]))
+                continue
+            replica = self.replicas.get(message.get("document"))
+            if replica is None:
+                continue  # 이미 나간 문서
+            if kind == "joined":
+                replaced, dropped = replica.joined(message["seq"], message["data"])
+                events.append(("replaced" if replaced else "joined", replica, None))
+                events.extend(("rejected", replica, reason) for reason in dropped)
+            elif kind in ("op", "reject"):
+                ops = replica.receive(message)
+                if ops:
+                    events.append(("changed", replica, ops))
+                if kind == "reject":
+                    events.append(("rejected", replica, message["reason"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AnT annotation sync server.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="run a sync server")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT}, 0: any)")
+    args = parser.parse_args(argv)
+
+    server = SyncServer(args.host, args.port)
+
+    async def serve():
+        await server.start()
+        print(f"listening on {server.host}:{server.port}", flush=True)
+        async with server.server:
+            await server.server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    print(f"accepted {server.accepted} operations, rejected {server.rejected}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""SpatialGrid 점 질의와 기존 선형 탐색(get_node_at)의 성능 비교.
+
+사용법: python benchmarks/bench_spatial_index.py [--nodes 10000] [--queries 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ant_model import SpatialGrid
+
+
+def make_nodes(count, seed=0):
+    """부모 박스 안에 자식 박스 3x3이 들어 있는 중첩 레이아웃 생성."""
+    rng = random.Random(seed)
+    nodes = []
+    per_row = 40
+    while len(nodes) < count:
+        group = len(nodes) // 10
+        gx = (group % per_row) * 250
+        gy = (group // per_row) * 250
+        nodes.append({"id": f"P{group}", "coords": (gx, gy, gx + 240, gy + 240)})
+        for i in range(9):
+            if len(nodes) >= count:
+                break
+            cx = gx + 10 + (i % 3) * 75 + rng.randint(0, 5)
+            cy = gy + 10 + (i // 3) * 75 + rng.randint(0, 5)
+            nodes.append({"id": f"C{group}_{i}", "coords": (cx, cy, cx + 60, cy + 60)})
+    return nodes
+
+
+def linear_first(nodes, x, y):
+    """기존 get_node_at과 같은 방식: 첫 번째로 포함하는 노드."""
+    for i, node in enumerate(nodes):
+        x1, y1, x2, y2 = node['coords']
+        if x1 <= x <= x2 and y1 <= y <= y2:
+            return i
+    return None
+
+
+def linear_innermost(nodes, x, y):
+    """선형 탐색으로 가장 안쪽 노드를 찾는 기준 구현."""
+    best, best_area = None, None
+    for i, node in enumerate(nodes):
+        x1, y1, x2, y2 = node['coords']
+        if x1 <= x <= x2 and y1 <= y <= y2:
+            area = (x2 - x1) * (y2 - y1)
+            if best_area is None or area < best_area:
+                best, best_area = i, area
+    return best
+
+
+def timed(label, func, points):
+    start = time.perf_counter()
+    results = [func(x, y) for x, y in points]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed * 1000:10.1f} ms total  {elapsed / len(points) * 1e6:10.2f} us/query")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    nodes = make_nodes(args.nodes)
+    max_x = max(node['coords'][2] for node in nodes)
+    max_y = max(node['coords'][3] for node in nodes)
+    rng = random.Random(1)
+    points = [(rng.uniform(0, max_x), rng.uniform(0, max_y)) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    grid = SpatialGrid()
+    positions = {}
+    for i, node in enumerate(nodes):
+        grid.insert(node['id'], node['coords'])
+        positions[node['id']] = i
+    print(f"nodes={len(nodes)} queries={len(points)} build={(time.perf_counter() - start) * 1000:.1f} ms")
+
+    timed("linear (first match)", lambda x, y: linear_first(nodes, x, y), points)
+    expected = timed("linear (innermost)", lambda x, y: linear_innermost(nodes, x, y), points)
+    actual = timed("SpatialGrid", lambda x, y: positions.get(grid.query_point(x, y)), points)
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    print(f"mismatches vs innermost linear scan: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
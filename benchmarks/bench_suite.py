@@ -0,0 +1,435 @@
+"""합성 인포그래픽 문서로 AnT의 주요 경로를 측정하는 벤치마크 모음.
+
+노드 수/연결 수/중첩 깊이/이미지 크기를 바꿔 가며 어노테이션 JSON과 이미지를 만들고,
+문서 모델(Tk 불필요)과 편집기(Tk 필요) 작업 시간을 측정해 JSON으로 출력한다.
+DISPLAY가 없으면 Xvfb 가상 디스플레이를 띄워 Tk 벤치마크를 실행하고, Xvfb도 없으면 Tk 항목만 건너뛴다.
+
+사용법:
+    python benchmarks/bench_suite.py [--nodes 10,100,1000,10000] [--connections-per-node 2]
+                                     [--depth 3] [--image-size 1600x4000] [--repeat 5]
+                                     [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PIL
+from PIL import Image
+
+from ant_model import AnnotationDocument
+
+
+MAX_CONNECTIONS = 50000
+CHILDREN_PER_NODE = 3
+HIT_TEST_QUERIES = 1000
+
+
+def inset(box):
+    """박스 안쪽으로 여백을 둔 박스 (작은 박스는 뒤집히지 않도록 크기의 10%까지만)."""
+    x1, y1, x2, y2 = box
+    dx = min(4, (x2 - x1) * 0.1)
+    dy = min(4, (y2 - y1) * 0.1)
+    return (x1 + dx, y1 + dy, x2 - dx, y2 - dy)
+
+
+def make_annotation(node_count, connection_count, depth, image_size, seed=0):
+    """중첩 깊이 depth의 노드 트리와 임의 연결로 이루어진 어노테이션 JSON 데이터 생성.
+
+    최상위 노드는 이미지 위에 격자로 놓고, 자식은 부모 박스를 가로로 나눈 띠 안에 놓는다.
+    """
+    rng = random.Random(seed)
+    width, height = image_size
+    subtree_size = sum(CHILDREN_PER_NODE ** level for level in range(depth))
+    root_count = max(1, -(-node_count // subtree_size))
+    columns = max(1, int(root_count ** 0.5 * width / max(width, height) + 0.5))
+    rows = -(-root_count // columns)
+    cell_width = width / columns
+    cell_height = height / rows
+
+    components = []
+    node_ids = []
+    stack = []  # (부모의 "node" 리스트, 박스, 남은 깊이)
+    for i in range(root_count):
+        x = (i % columns) * cell_width
+        y = (i // columns) * cell_height
+        stack.append((components, inset((x, y, x + cell_width, y + cell_height)), depth))
+    stack.reverse()
+
+    while stack and len(node_ids) < node_count:
+        siblings, box, remaining = stack.pop()
+        node_id = f"N{len(node_ids)}"
+        node_ids.append(node_id)
+        node = {"id": node_id, "coords": [round(v, 1) for v in box], "text": f"text {node_id}", "node": []}
+        siblings.append(node)
+        if remaining > 1:
+            x1, y1, x2, y2 = box
+            band = (y2 - y1) / CHILDREN_PER_NODE
+            for k in reversed(range(CHILDREN_PER_NODE)):
+                stack.append((node["node"], inset((x1, y1 + k * band, x2, y1 + (k + 1) * band)), remaining - 1))
+
+    connections = []
+    for i in range(connection_count):
+        from_id, to_id = rng.sample(node_ids, 2) if len(node_ids) > 1 else (node_ids[0], node_ids[0])
+        connections.append({
+            "id": f"C{i}",
+            "from": from_id,
+            "to": to_id,
+            "text": f"rel {i}" if i % 3 == 0 else None,
+            "type": ("line", "dashed", "dotted")[i % 3],
+            "direction": i % 2 == 0,
+            "color": "#000000"
+        })
+
+    return {
+        "file_name": "bench.png",
+        "node_count": len(node_ids),
+        "connection_count": len(connections),
+        "components": components,
+        "connections": connections
+    }
+
+
+def make_image(image_size):
+    """압축이 잘 되는 그라데이션 RGB 이미지 (큰 이미지도 빠르게 저장/디코딩 가능)."""
+    gradient = Image.linear_gradient("L").resize(image_size)
+    return Image.merge("RGB", (gradient, gradient.transpose(Image.FLIP_LEFT_RIGHT), gradient))
+
+
+def write_case(directory, data, image_size):
+    """케이스 디렉터리에 bench.json과 bench.png 저장. JSON 경로 반환."""
+    os.makedirs(directory, exist_ok=True)
+    json_path = os.path.join(directory, "bench.json")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    make_image(image_size).save(os.path.join(directory, "bench.png"), compress_level=1)
+    return json_path
+
+
+def measure(func, repeat, setup=None):
+    """func를 repeat번 실행한 시간(초) 리스트. setup은 매 실행 전에 호출되며 측정에서 제외."""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(case, op, timings, calls=1):
+    """측정 결과 한 항목. calls > 1이면 호출 한 번당 시간으로 환산."""
+    timings = [t / calls for t in timings]
+    return dict(case, op=op, repeat=len(timings), calls=calls, min=min(timings), median=statistics.median(timings),
+                mean=statistics.fmean(timings), max=max(timings))
+
+
+def query_points(image_size, count, seed=1):
+    rng = random.Random(seed)
+    width, height = image_size
+    return [(rng.uniform(0, width), rng.uniform(0, height)) for _ in range(count)]
+
+
+def bench_model(case, json_path, image_size, repeat, layout_width):
+    """문서 모델 경로 (Tk 없이 실행)."""
+    results = []
+    documents = []
+    results.append(summarize(case, "model.load", measure(
+        lambda: documents.append(AnnotationDocument.load(json_path, layout_width)), repeat)))
+    document = documents[-1]
+
+    points = query_points(image_size, HIT_TEST_QUERIES)
+
+    def hit_test():
+        for x, y in points:
+            document.node_at(x, y)
+    results.append(summarize(case, "model.node_at", measure(hit_test, repeat), calls=len(points)))
+
+    node_ids = [node.id for node in document.nodes]
+    results.append(summarize(case, "model.containment_rebuild",
+                             measure(lambda: document.containment.rebuild(node_ids), repeat)))
+
+    node = document.nodes[len(document.nodes) // 2]
+    offsets = iter(range(10 ** 9))
+
+    def move_node():
+        dx = 1 if next(offsets) % 2 == 0 else -1
+        x1, y1, x2, y2 = node.coords
+        document.set_node_coords(node, (x1 + dx, y1, x2 + dx, y2))
+    results.append(summarize(case, "model.move_node", measure(move_node, repeat)))
+
+    # 같은 중첩 구조에서 좌표만 지운 문서를 자동 배치
+    components = json.dumps(document.to_data("bench.png")["components"])
+    layout_inputs = []
+
+    def strip_coords():
+        nodes = json.loads(components)
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            del node["coords"]
+            stack.extend(node.get("node", ()))
+        layout_inputs.append({"components": nodes})
+    results.append(summarize(case, "model.auto_layout", measure(
+        lambda: AnnotationDocument.from_data(layout_inputs.pop(), *image_size), repeat, strip_coords)))
+
+    results.append(summarize(case, "model.to_data", measure(lambda: document.to_data("bench.png"), repeat)))
+    output_path = os.path.join(os.path.dirname(json_path), "bench_out.json")
+    results.append(summarize(case, "model.save", measure(lambda: document.save(output_path, "bench.png"), repeat)))
+    return results
+
+
+def start_virtual_display():
+    """DISPLAY가 없는 Linux에서 Xvfb 실행. (Popen 또는 None, 사용할 수 없는 이유 또는 None) 반환."""
+    if not sys.platform.startswith("linux") or os.environ.get("DISPLAY"):
+        return None, None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        return None, "no DISPLAY and Xvfb not found"
+    for number in range(99, 120):
+        if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            continue
+        process = subprocess.Popen([xvfb, f":{number}", "-screen", "0", "1920x1080x24", "-nolisten", "tcp"],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and process.poll() is None:
+            if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+                os.environ["DISPLAY"] = f":{number}"
+                return process, None
+            time.sleep(0.05)
+        process.kill()
+    return None, "failed to start Xvfb"
+
+
+class ZoomEvent:
+    def __init__(self, delta):
+        self.delta = delta
+
+
+def bench_editor(case, json_path, image_size, repeat):
+    """편집기 경로 (Tk 필요). 모달 대화상자는 측정 동안 아무 것도 하지 않게 바꾼다."""
+    import tkinter as tk
+    import AnT
+
+    silent = lambda *args, **kwargs: None
+    for name in ("showinfo", "showwarning", "showerror"):
+        setattr(AnT.messagebox, name, silent)
+    AnT.messagebox.askokcancel = lambda *args, **kwargs: True  # on_closing 종료 확인
+
+    root = tk.Tk()
+    root.geometry("1600x1000")
+    editor = AnT.ImageEditor(root)
+    root.update()
+
+    def wait_for_pyramid():
+        while editor.image_pyramid is not None and editor.image_pyramid.pending:
+            root.update()
+            time.sleep(0.005)
+        root.update()
+
+    # 탭 전환 측정용 두 번째 문서 (같은 내용의 복사본)
+    directory = os.path.dirname(json_path)
+    other_json_path = os.path.join(directory, "bench_other.json")
+    shutil.copyfile(json_path, other_json_path)
+    shutil.copyfile(os.path.join(directory, "bench.png"), os.path.join(directory, "bench_other.png"))
+
+    results = []
+    try:
+        def load():
+            editor.load_json_file(json_path)
+            editor.frame_scheduler.flush()
+            root.update_idletasks()
+
+        def close_and_wait(invalidate):
+            # 이미 열린 문서는 탭 전환만 하므로 매번 닫고 다시 연다
+            editor.close_tab()
+            if invalidate:
+                editor.document_cache.invalidate(json_path)
+            wait_for_pyramid()
+        results.append(summarize(case, "editor.load_json_file", measure(
+            load, repeat, setup=lambda: close_and_wait(True))))
+        results.append(summarize(case, "editor.load_json_file_cached", measure(
+            load, repeat, setup=lambda: close_and_wait(False))))
+        wait_for_pyramid()
+
+        editor.load_json_file(other_json_path)
+        wait_for_pyramid()
+        paths = iter(range(10 ** 9))
+
+        def switch():
+            editor.load_json_file(json_path if next(paths) % 2 == 0 else other_json_path)
+            editor.frame_scheduler.flush()
+            root.update_idletasks()
+        results.append(summarize(case, "editor.switch_document", measure(switch, repeat)))
+        editor.load_json_file(json_path)
+        wait_for_pyramid()
+
+        def redraw():
+            editor.update_canvas()
+            root.update_idletasks()
+        results.append(summarize(case, "editor.update_canvas", measure(redraw, repeat)))
+
+        def pan():
+            editor.img_x += 3
+            redraw()
+        results.append(summarize(case, "editor.update_canvas_pan", measure(pan, repeat)))
+
+        deltas = iter(range(10 ** 9))
+
+        def zoom():
+            editor.zoom(ZoomEvent(120 if next(deltas) % 2 == 0 else -120))
+            editor.frame_scheduler.flush()
+            root.update_idletasks()
+        results.append(summarize(case, "editor.zoom", measure(zoom, repeat)))
+
+        canvas_width, canvas_height = editor.canvas.winfo_width(), editor.canvas.winfo_height()
+        points = query_points((canvas_width, canvas_height), HIT_TEST_QUERIES)
+
+        def hit_test():
+            for x, y in points:
+                editor.get_node_at(x, y)
+        results.append(summarize(case, "editor.get_node_at", measure(hit_test, repeat), calls=len(points)))
+
+        results.append(summarize(case, "editor.assign_parent_child_relationship",
+                                 measure(editor.assign_parent_child_relationship, repeat)))
+
+        alphas = iter(range(10 ** 9))
+
+        def opacity():
+            editor.opacity_slider.set(64 + next(alphas) % 2 * 128)
+            editor.apply_opacity()
+            root.update_idletasks()
+        results.append(summarize(case, "editor.adjust_opacity", measure(opacity, repeat)))
+
+        results.append(summarize(case, "editor.save_nodes_as_json", measure(editor.save_nodes_as_json, repeat)))
+    finally:
+        editor.on_closing()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """baseline 대비 중앙값이 threshold 비율 이상 느려진 항목 리스트."""
+    previous = {(entry["case"], entry["op"]): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        old = previous.get((entry["case"], entry["op"]))
+        if old and old["median"] > 0 and entry["median"] > old["median"] * (1 + threshold):
+            regressions.append({"case": entry["case"], "op": entry["op"], "baseline": old["median"],
+                                "current": entry["median"], "ratio": entry["median"] / old["median"]})
+    return regressions
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark AnT hot paths on synthetic annotation documents.")
+    parser.add_argument("--nodes", default="10,100,1000,10000", help="comma separated node counts")
+    parser.add_argument("--connections-per-node", type=float, default=2.0,
+                        help=f"connections per node, capped at {MAX_CONNECTIONS} (default: 2)")
+    parser.add_argument("--depth", type=int, default=3, help="nesting depth of the node tree (default: 3)")
+    parser.add_argument("--image-size", type=parse_size, default=(1600, 4000), help="WIDTHxHEIGHT (default: 1600x4000)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (default: 5)")
+    parser.add_argument("--layout-width", type=int, default=1280, help="layout width passed to the model loader")
+    parser.add_argument("--no-tk", action="store_true", help="skip editor (Tk) benchmarks")
+    parser.add_argument("--output", help="write JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON; exit 1 if any median regressed")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative slowdown counted as a regression (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    tk_status = "disabled" if args.no_tk else None
+    display = None
+    if tk_status is None:
+        display, tk_status = start_virtual_display()
+
+    node_counts = [int(value) for value in args.nodes.split(",")]
+    results = []
+    work_dir = tempfile.mkdtemp(prefix="ant_bench_")
+    try:
+        for node_count in node_counts:
+            connection_count = min(MAX_CONNECTIONS, int(node_count * args.connections_per_node))
+            data = make_annotation(node_count, connection_count, args.depth, args.image_size)
+            width, height = args.image_size
+            case = {
+                "case": f"n{node_count}_c{connection_count}_d{args.depth}_{width}x{height}",
+                "nodes": data["node_count"],
+                "connections": connection_count,
+                "depth": args.depth,
+                "image_size": [width, height]
+            }
+            json_path = write_case(os.path.join(work_dir, case["case"]), data, args.image_size)
+            print(f"running {case['case']}", file=sys.stderr)
+
+            results.extend(bench_model(case, json_path, args.image_size, args.repeat, args.layout_width))
+            if tk_status is None:
+                try:
+                    results.extend(bench_editor(case, json_path, args.image_size, args.repeat))
+                except Exception as e:  # TclError 등: 디스플레이를 열 수 없으면 이후 Tk 항목 건너뜀
+                    tk_status = f"{type(e).__name__}: {e}"
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if display is not None:
+            display.terminate()
+
+    report = {
+        "suite": "ant-bench",
+        "format": 1,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pillow": PIL.__version__,
+        "tk": {"ran": tk_status is None, "skipped_reason": tk_status},
+        "params": {
+            "nodes": node_counts,
+            "connections_per_node": args.connections_per_node,
+            "depth": args.depth,
+            "image_size": list(args.image_size),
+            "repeat": args.repeat
+        },
+        "results": results
+    }
+
+    status = 0
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            report["regressions"] = compare(results, json.load(f), args.threshold)
+        for regression in report["regressions"]:
+            print(f"REGRESSION {regression['case']} {regression['op']}: "
+                  f"{regression['baseline'] * 1000:.3f}ms -> {regression['current'] * 1000:.3f}ms "
+                  f"({regression['ratio']:.2f}x)", file=sys.stderr)
+        status = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, ensure_ascii=False, indent=4)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
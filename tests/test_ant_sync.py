@@ -0,0 +1,192 @@
+"""ant_sync 헤드리스 테스트: 로컬 서버 프로세스 하나에 SyncClient 여러 개를 붙여 동시 편집을 확인한다.
+
+    python -m pytest tests/test_ant_sync.py
+"""
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ant_model import AnnotationDocument, Connection, Node  # noqa: E402
+from ant_sync import PROTOCOL_VERSION, SyncClient, encode  # noqa: E402
+
+
+def make_data(node_count=30, connection_count=15):
+    document = AnnotationDocument([Node(f"n{i}", [i * 10, 0, i * 10 + 8, 8], f"t{i}") for i in range(node_count)],
+                                  [Connection(f"c{i}", f"n{i}", f"n{i + 1}") for i in range(connection_count)],
+                                  None, "doc.png")
+    return json.loads(json.dumps(document.to_data("doc.png")))
+
+
+def snapshot(document):
+    return json.dumps(document.to_data("doc.png"), sort_keys=True)
+
+
+class SyncServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = subprocess.Popen([sys.executable, os.path.join(ROOT, "ant_sync.py"), "serve", "--port", "0"],
+                                      stdout=subprocess.PIPE, text=True)
+        cls.port = int(cls.server.stdout.readline().rsplit(":", 1)[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait()
+        cls.server.stdout.close()
+
+    def setUp(self):
+        self.clients = []
+        self.events = {}
+        self.json_path = f"/data/{self.id().rsplit('.', 1)[1]}.json"  # 테스트마다 다른 문서
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+
+    def connect(self, name, document=None):
+        client = SyncClient("127.0.0.1", self.port, client_id=name).start()
+        self.clients.append(client)
+        self.events[name] = []
+        replica = client.join(self.json_path, document or AnnotationDocument.from_data(make_data(), 0))
+        return client, replica
+
+    def pump(self, until=None, timeout=5.0):
+        """모든 클라이언트의 poll 이벤트를 모으며 until()이 참이 될 때까지 (없으면 잠시) 기다림."""
+        deadline = time.monotonic() + (timeout if until else 0.3)
+        while time.monotonic() < deadline:
+            for client in self.clients:
+                self.events[client.client_id].extend(client.poll())
+            if until is not None and until():
+                return
+            time.sleep(0.01)
+        if until is not None:
+            self.fail("timed out waiting for sync")
+
+    def kinds(self, name):
+        return [event for event, _, _ in self.events[name]]
+
+    def settled(self, replicas):
+        return lambda: all(replica.seq is not None and not replica.pending and not replica.unsent
+                           for replica in replicas)
+
+    def test_identical_documents_are_not_replaced(self):
+        first, _ = self.connect("first")
+        self.pump(lambda: "joined" in self.kinds("first"))
+        second, replica = self.connect("second")
+        document = replica.document
+        self.pump(lambda: self.kinds("second"))
+        self.assertEqual(self.kinds("second"), ["joined"])
+        self.assertIs(replica.document, document)
+
+    def test_stale_copy_is_replaced_and_early_edits_are_replayed(self):
+        _, first = self.connect("first")
+        self.pump(self.settled([first]))
+        first.document.set_node_text(first.document.node_map["n0"], "server text")
+        self.pump(self.settled([first]))
+
+        stale = AnnotationDocument.from_data(make_data(), 0)
+        stale.set_node_text(stale.node_map["n0"], "stale text")
+        _, second = self.connect("second", stale)
+        # join 응답 전의 편집: 서버 문서 위에 다시 적용되어야 함
+        stale.set_node_text(stale.node_map["n5"], "early edit")
+        stale.add_node(Node("early", [0, 100, 10, 110], "added before join"))
+        self.pump(lambda: self.settled([first, second])() and first.document.node_map.get("early") is not None)
+
+        self.assertIn("replaced", self.kinds("second"))
+        self.assertIsNot(second.document, stale)
+        for replica in (first, second):
+            self.assertEqual(replica.document.node_map["n0"].text, "server text")
+            self.assertEqual(replica.document.node_map["n5"].text, "early edit")
+        self.assertEqual(snapshot(first.document), snapshot(second.document))
+
+    def test_early_edit_that_no_longer_applies_is_rejected(self):
+        _, first = self.connect("first")
+        self.pump(self.settled([first]))
+        first.document.remove_node_at(first.document.node_positions["n3"])
+        self.pump(self.settled([first]))
+
+        stale = AnnotationDocument.from_data(make_data(), 0)
+        _, second = self.connect("second", stale)
+        stale.set_node_text(stale.node_map["n3"], "edited a deleted node")
+        self.pump(lambda: "rejected" in self.kinds("second"))
+
+        self.assertIn("replaced", self.kinds("second"))
+        self.assertNotIn("n3", second.document.node_map)
+        self.assertEqual(snapshot(first.document), snapshot(second.document))
+
+    def test_conflicting_edits_keep_the_first(self):
+        _, first = self.connect("first")
+        _, second = self.connect("second")
+        self.pump(self.settled([first, second]))
+        first.document.set_node_text(first.document.node_map["n1"], "from first")
+        second.document.set_node_text(second.document.node_map["n1"], "from second")
+        self.pump(self.settled([first, second]))
+
+        rejected = self.kinds("first").count("rejected") + self.kinds("second").count("rejected")
+        self.assertEqual(rejected, 1)
+        self.assertIn(first.document.node_map["n1"].text, ("from first", "from second"))
+        self.assertEqual(first.document.node_map["n1"].text, second.document.node_map["n1"].text)
+
+    def test_concurrent_random_edits_converge(self):
+        replicas = [self.connect(f"client{k}")[1] for k in range(4)]
+        self.pump(self.settled(replicas))
+        rng = random.Random(7)
+        counter = 0
+        for step in range(300):
+            replica = rng.choice(replicas)
+            document = replica.document
+            name = replica.client.client_id
+            roll = rng.random()
+            if roll < 0.3:
+                document.set_node_text(rng.choice(document.nodes), f"{name}-{step}")
+            elif roll < 0.5:
+                x = rng.randint(0, 600)
+                document.set_node_coords(rng.choice(document.nodes), [x, 20, x + 9, 29])
+            elif roll < 0.65:
+                counter += 1
+                document.add_node(Node(f"{name}x{counter}", [rng.randint(0, 600), 40, 700, 60], "new"),
+                                  index=rng.randint(0, len(document.nodes)))
+            elif roll < 0.75 and len(document.nodes) > 5:
+                document.remove_node_at(rng.randrange(len(document.nodes)))
+            elif roll < 0.88 and len(document.nodes) > 2:
+                a, b = rng.sample(document.nodes, 2)
+                counter += 1
+                document.add_connection(Connection(f"{name}c{counter}", a.id, b.id))
+            elif document.connections:
+                connection = rng.choice(document.connections)
+                if rng.random() < 0.5:
+                    document.update_connection(connection, text=f"{name}-{step}")
+                else:
+                    document.remove_connection_at(document.connection_index(connection.id))
+            if rng.random() < 0.3:
+                self.pump(lambda: True)
+        self.pump(self.settled(replicas), timeout=10.0)
+
+        self.assertEqual(len({snapshot(replica.document) for replica in replicas}), 1)
+        late, replica = self.connect("late")
+        self.pump(lambda: self.kinds("late"))
+        self.assertEqual(snapshot(replica.document), snapshot(replicas[0].document))
+
+    def test_messages_before_hello_are_rejected(self):
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(encode({"type": "join", "document": "doc", "data": make_data()}))
+            sock.sendall(encode({"type": "hello", "client": "raw", "version": PROTOCOL_VERSION}))
+            replies = sock.makefile("rb")
+            error = json.loads(replies.readline())
+            welcome = json.loads(replies.readline())
+        self.assertEqual(error["type"], "error")
+        self.assertIn("before hello", error["reason"])
+        self.assertEqual(welcome["type"], "welcome")
+
+
+if __name__ == "__main__":
+    unittest.main()